@@ -0,0 +1,62 @@
+"""
+Асинхронные представления API только для чтения.
+
+Запрос обслуживается корутиной целиком: аутентификация
+(users.authentication.aauthenticate) и чтение из базы идут через
+асинхронный ORM, так что под ASGI медленные клиенты не занимают поток.
+Представление получает DRF Request (query_params, build_absolute_uri для
+сериализаторов и пагинации) и возвращает данные для JSON; ошибки API
+отдаются в том же виде, что и у синхронных представлений DRF.
+"""
+from functools import wraps
+
+from django.http import Http404, HttpResponse
+from django.http.response import HttpResponseBase
+from rest_framework import exceptions
+from rest_framework.request import Request
+from users.authentication import aauthenticate
+from .renderers import dumps
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status,
+                        content_type='application/json')
+
+
+def error_response(exc):
+    """Ответ на APIException, как у rest_framework.views.exception_handler"""
+    detail = exc.detail
+    if not isinstance(detail, (list, dict)):
+        detail = {'detail': detail}
+    response = json_response(detail, status=exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+def async_api_view(view):
+    """
+    GET-представление для аутентифицированных пользователей (как
+    IsAuthenticated). view — корутина view(request, *args, **kwargs),
+    возвращающая данные ответа или готовый ответ (в том числе потоковый).
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            if request.method not in ('GET', 'HEAD'):
+                raise exceptions.MethodNotAllowed(request.method)
+            user = await aauthenticate(request)
+            if user is None:
+                raise exceptions.NotAuthenticated()
+            request = Request(request)
+            request.user = user
+            data = await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return error_response(exc)
+        except Http404:
+            return error_response(exceptions.NotFound())
+        if isinstance(data, HttpResponseBase):
+            return data
+        return json_response(data)
+    return wrapper
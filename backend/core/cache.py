@@ -0,0 +1,37 @@
+"""
+Свойства настроенного кэша.
+
+Кэш в памяти процесса (LocMemCache) у каждого воркера свой: сброс записи
+в одном процессе не доходит до остальных. Решения о доступе и ответы,
+зависящие от прав, между запросами кэшируются только в кэше, общем для
+всех процессов.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+
+def is_shared(alias='default'):
+    """
+    Видят ли все процессы одни и те же записи кэша. CACHE_SHARED в
+    настройках задаёт ответ явно, например для единственного процесса
+    """
+    shared = getattr(settings, 'CACHE_SHARED', None)
+    if shared is not None:
+        return shared
+    return not isinstance(caches[alias], LocMemCache)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Профиль production рассчитан на несколько воркеров: кэш должен быть общим"""
+    if getattr(settings, 'DB_PROFILE', None) != 'production' or is_shared():
+        return []
+    return [Error(
+        'Профиль DB_PROFILE=production использует кэш в памяти процесса: '
+        'сброс ролей, ответов и сводок не дойдёт до других воркеров',
+        hint='Укажите общий CACHE_BACKEND (FileBasedCache, RedisCache) или '
+             'CACHE_SHARED=1 для единственного процесса',
+        id='core.E001',
+    )]
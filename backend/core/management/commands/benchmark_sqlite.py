@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import tempfile
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+ALIAS = 'sqlite-benchmark'
+
+
+def profiles():
+    """Настройки базы для сравнения: как в разработке и профиль production"""
+    return {
+        'default': {'ENGINE': 'django.db.backends.sqlite3'},
+        'production': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'CONN_MAX_AGE': 600,
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+            'PRAGMAS': settings.SQLITE_PRODUCTION_PRAGMAS,
+        },
+    }
+
+
+def use_database(settings_dict):
+    if ALIAS in connections.settings:
+        connections[ALIAS].close()
+        del connections[ALIAS]
+    # configure_settings дополняет значениями по умолчанию только 'default'
+    connections.settings[ALIAS] = connections.configure_settings(
+        {'default': dict(settings_dict)})['default']
+
+
+def worker(settings_dict, number, operations, results):
+    """
+    Процесс, имитирующий воркер WSGI: короткие транзакции, которые читают
+    строку, а затем пишут, — как сохранение модели с сигналами.
+    """
+    use_database(settings_dict)
+    latencies, errors = [], 0
+    for index in range(operations):
+        started = perf_counter()
+        try:
+            with transaction.atomic(using=ALIAS):
+                with connections[ALIAS].cursor() as cursor:
+                    cursor.execute(
+                        'SELECT value FROM benchmark_counter WHERE id = 1')
+                    value = cursor.fetchone()[0]
+                    cursor.execute(
+                        'UPDATE benchmark_counter SET value = %s WHERE id = 1',
+                        [value + 1])
+                    cursor.execute(
+                        'INSERT INTO benchmark_item (worker, payload) '
+                        'VALUES (%s, %s)', [number, 'x' * 200])
+            if index % 5 == 0:
+                with connections[ALIAS].cursor() as cursor:
+                    cursor.execute('SELECT COUNT(*) FROM benchmark_item')
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            errors += 1
+        latencies.append(perf_counter() - started)
+    connections[ALIAS].close()
+    results.put((errors, latencies))
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает временную базу SQLite записями из нескольких процессов и '
+        'сравнивает ошибки «database is locked» и задержки в обычном профиле '
+        'и в профиле production (WAL, IMMEDIATE, настроенные PRAGMA)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument(
+            '--operations', type=int, default=200,
+            help='Транзакций записи на процесс')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"профиль":<12}{"успешно":>9}{"ошибок":>8}{"оп/с":>9}'
+            f'{"p50, мс":>10}{"p99, мс":>10}{"счётчик":>9}')
+        for name, settings_dict in profiles().items():
+            with tempfile.TemporaryDirectory() as directory:
+                settings_dict['NAME'] = os.path.join(directory, 'benchmark.db')
+                self.run_profile(name, settings_dict, options)
+
+    def run_profile(self, name, settings_dict, options):
+        use_database(settings_dict)
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE benchmark_counter '
+                '(id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+            cursor.execute(
+                'CREATE TABLE benchmark_item (id INTEGER PRIMARY KEY, '
+                'worker INTEGER NOT NULL, payload TEXT NOT NULL)')
+            cursor.execute('INSERT INTO benchmark_counter VALUES (1, 0)')
+        # Соединения не должны переживать fork
+        connections.close_all()
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=worker,
+                args=(settings_dict, number, options['operations'], results))
+            for number in range(options['workers'])
+        ]
+        started = perf_counter()
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = perf_counter() - started
+
+        errors = sum(item[0] for item in collected)
+        latencies = sorted(
+            latency for item in collected for latency in item[1])
+        total = options['workers'] * options['operations']
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute('SELECT value FROM benchmark_counter WHERE id = 1')
+            counter = cursor.fetchone()[0]
+        connections[ALIAS].close()
+
+        def percentile(share):
+            return latencies[min(len(latencies) - 1,
+                                 int(len(latencies) * share))] * 1000
+
+        self.stdout.write(
+            f'{name:<12}{total - errors:>9}{errors:>8}'
+            f'{(total - errors) / elapsed:>9.0f}'
+            f'{percentile(0.5):>10.1f}{percentile(0.99):>10.1f}{counter:>9}')
+        if counter != total - errors:
+            self.stderr.write(
+                f'{name}: счётчик {counter} не совпадает с числом успешных '
+                f'транзакций {total - errors}')
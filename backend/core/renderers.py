@@ -0,0 +1,95 @@
+"""
+JSON-рендерер на orjson, если он установлен, и потоковая выдача больших
+списков. Без orjson используется стандартный json с кодировщиком DRF.
+"""
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_default = encoders.JSONEncoder().default
+
+
+def dumps(data):
+    """
+    Закодировать data в компактный JSON (bytes). datetime, date, UUID
+    кодируются нативно, Decimal и прочие типы — как в JSONEncoder DRF.
+    """
+    if orjson is not None:
+        try:
+            content = orjson.dumps(
+                data, default=_default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:
+            # Числа за пределами 64 бит и прочее, что orjson не берёт
+            content = None
+        if content is not None:
+            # Как и JSONRenderer, экранируем разделители строк для JS
+            return content.replace(
+                b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    content = json.dumps(
+        data, cls=encoders.JSONEncoder, ensure_ascii=False,
+        allow_nan=False, separators=(',', ':'))
+    return content.replace(
+        '\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer, кодирующий через orjson; отступы — через json"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class JSONStream:
+    """Массив JSON, элементы которого приходят пачками (списками)"""
+
+    def __init__(self, batches):
+        self.batches = batches
+
+
+def iter_json(data):
+    """
+    Кодировать data по частям: JSONStream — по пачке за раз, словари —
+    по ключу, остальное — целиком
+    """
+    if isinstance(data, JSONStream):
+        yield b'['
+        first = True
+        for batch in data.batches:
+            if not batch:
+                continue
+            chunk = dumps(list(batch))[1:-1]
+            yield chunk if first else b',' + chunk
+            first = False
+        yield b']'
+    elif isinstance(data, dict):
+        yield b'{'
+        for index, (key, value) in enumerate(data.items()):
+            yield (b',' if index else b'') + dumps(str(key)) + b':'
+            yield from iter_json(value)
+        yield b'}'
+    else:
+        yield dumps(data)
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """
+    Ответ, который кодируется и отправляется по мере чтения из базы:
+    тело целиком в памяти не держится
+    """
+
+    def __init__(self, data, status=None, headers=None):
+        super().__init__(
+            iter_json(data), status=status, headers=headers,
+            content_type='application/json')
@@ -0,0 +1,92 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+class SparseFieldsMixin:
+    """
+    Разреженные наборы полей для ответов на GET-запросы.
+
+    ?fields=id,title,owner.username — оставить только указанные поля
+    ?omit=description,owner.bio     — исключить поля
+    ?expand=owner                   — вложенные объекты раскрываются только
+                                      для перечисленных полей, остальные
+                                      отдаются как id
+
+    Вложенные сериализаторы адресуются через точку от корня ответа.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+        params = getattr(request, 'query_params', request.GET)
+
+        keep = self.sparse_entries(params.get('fields'))
+        if keep:
+            names = {entry.split('.')[0] for entry in keep}
+            fields = {name: field for name, field in fields.items()
+                      if name in names}
+
+        for entry in self.sparse_entries(params.get('omit')):
+            if '.' not in entry:
+                fields.pop(entry, None)
+
+        if 'expand' in params:
+            # Запрошенные подполя вложенного объекта тоже раскрывают его
+            expand = {
+                entry.split('.')[0]
+                for entry in self.sparse_entries(params['expand']) + [
+                    entry for entry in keep if '.' in entry]
+            }
+            for name, field in list(fields.items()):
+                if name not in expand and is_nested(field):
+                    fields[name] = collapse(field)
+        return fields
+
+    def sparse_path(self):
+        """Путь сериализатора от корня ответа, например 'assignees'"""
+        parts = []
+        node = self
+        while getattr(node, 'parent', None) is not None:
+            if node.field_name:
+                parts.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(parts))
+
+    def sparse_entries(self, value):
+        """Пути из списка через запятую относительно этого сериализатора"""
+        if not value:
+            return []
+        prefix = self.sparse_path()
+        entries = []
+        for entry in value.split(','):
+            entry = entry.strip()
+            if prefix:
+                if not entry.startswith(prefix + '.'):
+                    continue
+                entry = entry[len(prefix) + 1:]
+            if entry:
+                entries.append(entry)
+        return entries
+
+
+def is_nested(field):
+    return isinstance(getattr(field, 'child', field), serializers.BaseSerializer)
+
+
+def collapse(field):
+    """Заменить вложенный сериализатор на список/значение первичных ключей"""
+    kwargs = {'read_only': True}
+    if field.source:
+        kwargs['source'] = field.source
+    if isinstance(field, serializers.ListSerializer):
+        kwargs['many'] = True
+    return serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+def rendered_fields(serializer):
+    """Имена отдаваемых полей и тех из них, что раскрыты вложенными объектами"""
+    fields = serializer.fields
+    nested = {name for name, field in fields.items() if is_nested(field)}
+    return set(fields), nested
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'corsheaders',
+    'core',
     'users',
     'task_planner',
     'calendar_events',
@@ -75,11 +76,16 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'if-none-match',
+    'if-modified-since',
 ]
 
 CORS_EXPOSE_HEADERS = [
     'content-type',
     'x-csrftoken',
+    'etag',
+    'last-modified',
+    'x-cache',
 ]
 
 CSRF_TRUSTED_ORIGINS = [
@@ -92,13 +98,60 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # orjson is used when installed, otherwise the stdlib json module
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'task_planner.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
 }
 
+# Periodic jobs (task_planner/jobs.py) never start on import. Run them in a
+# dedicated process with `manage.py run_jobs`, or list job names here to run
+# them inside each server worker, started on its first request. The
+# notification-digest job only makes sense in workers (see below).
+BACKGROUND_JOBS = [
+    name for name in os.environ.get('BACKGROUND_JOBS', '').split(',') if name
+]
+
+# Interval (seconds) of the "overdue" job that marks overdue tasks and prunes
+# sync tombstones; 0 disables it (use the mark_overdue_tasks and
+# prune_tombstones commands from cron instead). Only the process holding the
+# TASK_OVERDUE_SWEEP_LOCK file lock sweeps, so N workers on one host still
+# run a single sweep.
+TASK_OVERDUE_SWEEP_INTERVAL = int(
+    os.environ.get('TASK_OVERDUE_SWEEP_INTERVAL', 60 * 60)) or None
+TASK_OVERDUE_SWEEP_LOCK = os.environ.get(
+    'TASK_OVERDUE_SWEEP_LOCK', str(BASE_DIR / 'overdue-sweeper.lock'))
+
+# Days deletion tombstones are kept for delta sync (task_planner/sync.py).
+# Older ones are pruned by the overdue sweep or the prune_tombstones command;
+# /sync/ answers cursors older than this with a full resync.
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
+# Notification digest (notifications/digest.py): events for the same user and
+# workspace (or personal task) within WINDOW seconds become one notification.
+# The buffer lives in worker memory and is flushed every FLUSH_INTERVAL
+# seconds, in batches of BATCH_SIZE, by the notification-digest job; it is
+# only active in workers that list that job in BACKGROUND_JOBS, elsewhere
+# notifications are written immediately. A graceful shutdown flushes the rest,
+# but events still buffered when a worker is killed (SIGKILL, OOM, crash) are
+# lost. WINDOW None disables coalescing.
+NOTIFICATION_DIGEST = {
+    'WINDOW': 60,
+    'FLUSH_INTERVAL': 10,
+    'BATCH_SIZE': 1000,
+}
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -129,6 +182,85 @@ DATABASES = {
     }
 }
 
+# Applied to every new SQLite connection by core/sqlite.py
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
+# DB_PROFILE=production for several worker processes: WAL and tuned
+# pragmas, connections kept across requests, and write transactions that
+# take the write lock up front (BEGIN IMMEDIATE) so concurrent writers queue
+# on busy_timeout instead of failing with "database is locked".
+DB_PROFILE = os.environ.get('DB_PROFILE')
+
+if DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+        'PRAGMAS': SQLITE_PRODUCTION_PRAGMAS,
+    })
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default. The production profile runs several worker
+# processes and defaults to FileBasedCache so that invalidations reach every
+# process; CACHE_BACKEND can point at another shared backend (RedisCache,
+# PyMemcacheCache). A process-local cache under that profile fails the
+# system check (core/cache.py).
+
+if DB_PROFILE == 'production':
+    CACHE_BACKEND = os.environ.get(
+        'CACHE_BACKEND',
+        'django.core.cache.backends.filebased.FileBasedCache')
+    CACHE_LOCATION = os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache'))
+else:
+    CACHE_BACKEND = os.environ.get(
+        'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+    CACHE_LOCATION = os.environ.get('CACHE_LOCATION', 'task-planner')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+        'TIMEOUT': 60 * 5,
+        'KEY_PREFIX': 'task-planner',
+    }
+}
+
+if CACHE_BACKEND.endswith(('LocMemCache', 'FileBasedCache')):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+
+# Whether every worker process sees the same cache entries (core/cache.py).
+# Unset: detected from the backend, LocMemCache is per process. Workspace
+# roles and API responses are cached across requests only in a shared
+# cache; CACHE_SHARED=1 opts a single-process deployment on LocMemCache
+# back in.
+CACHE_SHARED = {'1': True, '0': False}.get(os.environ.get('CACHE_SHARED'))
+
+# Seconds a cached API response lives (task_planner/response_cache.py)
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+
+# Real-time change push over SSE (task_planner/realtime.py, requires ASGI).
+# LocalBackend only reaches clients of the same process; with several ASGI
+# workers use task_planner.realtime.RedisBackend (needs the redis package).
+# QUEUE_SIZE bounds the events buffered per client before it is told to
+# resync; HEARTBEAT is the keep-alive interval in seconds.
+REALTIME = {
+    'BACKEND': os.environ.get(
+        'REALTIME_BACKEND', 'task_planner.realtime.LocalBackend'),
+    'REDIS_URL': os.environ.get(
+        'REALTIME_REDIS_URL', 'redis://localhost:6379/0'),
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT': 15,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -173,5 +305,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
+# Session users and API tokens are resolved from cached snapshots
+# (users/authentication.py) when the cache is shared by all processes
+AUTHENTICATION_BACKENDS = ['users.authentication.CachedModelBackend']
+
+AUTH_CACHE = {
+    'TTL': 60,
+}
+
+# Sessions are read from the cache first only when logouts can reach every
+# process through it; a process-local cache would keep ended sessions alive
+# in the other workers
+_cache_shared = (CACHE_SHARED if CACHE_SHARED is not None
+                 else not CACHE_BACKEND.endswith('LocMemCache'))
+SESSION_ENGINE = ('django.contrib.sessions.backends.cached_db'
+                  if _cache_shared else 'django.contrib.sessions.backends.db')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
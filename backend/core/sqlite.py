@@ -0,0 +1,20 @@
+"""
+Настройка соединений SQLite.
+
+PRAGMA из ключа PRAGMAS настроек базы применяются к каждому новому
+соединению. Профиль production (core/settings.py) включает WAL: читатели
+не блокируют писателя и друг друга. Записи идут транзакциями IMMEDIATE:
+блокировка записи берётся в начале транзакции и ожидает своей очереди
+через busy_timeout, вместо того чтобы падать с «database is locked» при
+повышении блокировки чтения до записи.
+"""
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in connection.settings_dict.get('PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
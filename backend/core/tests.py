@@ -0,0 +1,76 @@
+import io
+import json
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from . import renderers
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer, JSONStream, iter_json
+
+
+class RendererTests(SimpleTestCase):
+    """FastJSONRenderer и потоковая выдача совпадают с JSONRenderer DRF"""
+    data = {
+        'id': 1,
+        'title': 'Задача\u2028строка',
+        'created_at': datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        'due_date': date(2030, 1, 2),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'amount': Decimal('1.5'),
+        'big': 2 ** 70,
+        'nested': [{'a': None, 'b': True}],
+        7: 'нестроковый ключ',
+    }
+
+    def assertSameAsDRF(self, content):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(json.loads(content), json.loads(expected))
+        # Компактно и с экранированным разделителем строк, как в DRF
+        self.assertNotIn(b', ', content)
+        self.assertIn(b'\\u2028', content)
+        self.assertNotIn('\u2028'.encode(), content)
+
+    def test_render(self):
+        self.assertSameAsDRF(FastJSONRenderer().render(self.data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_render_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertSameAsDRF(FastJSONRenderer().render(self.data))
+
+    def test_indent(self):
+        content = FastJSONRenderer().render(
+            {'a': [1]}, 'application/json; indent=2', {})
+        self.assertEqual(content, b'{\n  "a": [\n    1\n  ]\n}')
+
+    def test_stream(self):
+        batches = ([{'id': n} for n in range(start, start + 2)]
+                   for start in (0, 2, 4))
+        data = {'next': None, 'results': JSONStream(
+            batch for batch in [[], *batches, []])}
+        content = b''.join(iter_json(data))
+        self.assertEqual(json.loads(content), {
+            'next': None, 'results': [{'id': n} for n in range(6)]})
+        self.assertEqual(b''.join(iter_json(JSONStream([]))), b'[]')
+
+
+class ParserTests(SimpleTestCase):
+    def parse(self, content, encoding='utf-8'):
+        return FastJSONParser().parse(
+            io.BytesIO(content), parser_context={'encoding': encoding})
+
+    def test_parse(self):
+        self.assertEqual(self.parse('{"title": "Задача"}'.encode()),
+                         {'title': 'Задача'})
+        self.assertEqual(
+            self.parse('{"title": "Задача"}'.encode('cp1251'), 'cp1251'),
+            {'title': 'Задача'})
+
+    def test_invalid(self):
+        with self.assertRaises(ParseError):
+            self.parse(b'{"title": ')
@@ -7,6 +7,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('users.urls')),
     path('api/tasks/', include('task_planner.urls')),
+    path('api/notifications/', include('notifications.urls')),
 ]
 
 if settings.DEBUG:
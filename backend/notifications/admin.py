@@ -1,3 +1,20 @@
 from django.contrib import admin
+from .models import Notification, UnreadCounter
 
-# Register your models here.
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['recipient', 'kind', 'task', 'workspace', 'events_count',
+                    'is_read', 'created_at']
+    list_filter = ['kind', 'is_read']
+    search_fields = ['recipient__username', 'task__title']
+    raw_id_fields = ['recipient', 'task', 'workspace', 'actor']
+    list_per_page = 20
+
+
+@admin.register(UnreadCounter)
+class UnreadCounterAdmin(admin.ModelAdmin):
+    list_display = ['user', 'unread']
+    search_fields = ['user__username']
+    raw_id_fields = ['user']
+    readonly_fields = ['unread']
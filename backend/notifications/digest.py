@@ -0,0 +1,86 @@
+"""
+Буфер сводок уведомлений.
+
+События для одного пользователя и одного рабочего пространства (для
+личных задач — одной задачи) в пределах окна NOTIFICATION_DIGEST['WINDOW']
+копятся в памяти процесса и записываются одним уведомлением с числом
+событий. Так массовая правка 300 задач даёт каждому участнику одну строку,
+а не 300: число записей растёт с числом пользователей, а не с
+произведением пользователей на события.
+
+Буфер работает только там, где запущен периодический сброс (задача
+notification-digest из notifications/jobs.py в BACKGROUND_JOBS); в
+командах управления, тестах и без этой настройки fanout пишет уведомления
+сразу.
+
+Буфер не сохраняется: при штатном завершении процесса остаток
+записывается через atexit, но события, ждущие сброса в момент аварийного
+завершения воркера (SIGKILL, нехватка памяти), теряются. Это не больше
+FLUSH_INTERVAL + WINDOW секунд уведомлений одного процесса; задачи и
+события SSE при этом не теряются.
+"""
+import threading
+import time
+
+
+class Entry:
+    """Накопленные события одного ключа (пользователь, пространство/задача)"""
+    __slots__ = ('opened', 'workspace_id', 'kinds', 'task_ids', 'actor_ids',
+                 'count')
+
+    def __init__(self, opened, workspace_id):
+        self.opened = opened
+        self.workspace_id = workspace_id
+        self.kinds = set()
+        self.task_ids = set()
+        self.actor_ids = set()
+        self.count = 0
+
+
+class DigestBuffer:
+    def __init__(self):
+        self.window = None
+        # Порядок вставки совпадает с порядком открытия окон
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.window is not None
+
+    def start(self, window):
+        self.window = window
+
+    def add(self, kind, rows, actor_id=None):
+        """Учесть событие kind для строк (id задачи, id пространства, id пользователя)"""
+        now = time.monotonic()
+        with self.lock:
+            for task_id, workspace_id, user_id in rows:
+                if workspace_id is not None:
+                    key = (user_id, 'workspace', workspace_id)
+                else:
+                    key = (user_id, 'task', task_id)
+                entry = self.entries.get(key)
+                if entry is None:
+                    entry = self.entries[key] = Entry(now, workspace_id)
+                entry.kinds.add(kind)
+                entry.task_ids.add(task_id)
+                entry.actor_ids.add(actor_id)
+                entry.count += 1
+
+    def drain(self, force=False):
+        """
+        Забрать записи с истёкшим окном (все при force) как список
+        (id пользователя, Entry)
+        """
+        deadline = time.monotonic() - (self.window or 0)
+        with self.lock:
+            ready = []
+            for key, entry in self.entries.items():
+                if not force and entry.opened > deadline:
+                    break
+                ready.append(key)
+            return [(key[0], self.entries.pop(key)) for key in ready]
+
+    def __len__(self):
+        return len(self.entries)
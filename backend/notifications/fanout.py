@@ -0,0 +1,223 @@
+"""
+Рассылка уведомлений о задачах.
+
+Получатели — исполнители задачи, участники её рабочего пространства и
+владелец личной задачи — выбираются одним запросом по индексу доступа
+(realtime.audience, тот же, что для каналов событий); о назначении
+узнают только новые исполнители (notify_assigned). Уведомления пишутся bulk_create пачками. Счётчик
+непрочитанных (UnreadCounter) меняется одним UPDATE на каждое различное
+приращение, поэтому значку не нужен COUNT по уведомлениям.
+
+Если в процессе запущен сброс сводок, события после фиксации транзакции
+уходят в буфер (digest.py) и записываются сводками в flush_digest().
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from task_planner import realtime
+from task_planner.models import Task, TaskAccess, Workspace
+from users.models import User
+from .digest import DigestBuffer
+from .models import Notification, UnreadCounter
+
+BATCH_SIZE = 1000
+
+buffer = DigestBuffer()
+
+
+def recipients(task_ids, exclude_user_id=None, instance=None):
+    """
+    Тройки (id задачи, id пространства, id пользователя) без повторов.
+    Владелец задачи в пространстве получает уведомления как его участник
+    """
+    rows = set()
+    for task_id, (workspace_id, users) in realtime.audience(
+            task_ids, instance).items():
+        for user_id, reason in users:
+            if user_id == exclude_user_id:
+                continue
+            if reason != TaskAccess.Reason.OWNER or workspace_id is None:
+                rows.add((task_id, workspace_id, user_id))
+    return rows
+
+
+def notify(kind, task_ids, actor_id=None, instance=None):
+    """
+    Уведомить исполнителей и участников пространств задач task_ids;
+    автор события (actor_id) уведомления не получает. Получатели
+    выбираются сразу (с instance — из аудитории этого сохранения),
+    запись — сразу или сводкой из буфера.
+    """
+    task_ids = set(task_ids) - {None}
+    if not task_ids:
+        return 0
+    return deliver(
+        kind, list(recipients(task_ids, actor_id, instance)), actor_id)
+
+
+def notify_assigned(pairs, actor_id=None):
+    """
+    Уведомить о назначении только что добавленных исполнителей: пары
+    (id задачи, id пользователя); назначивший уведомления не получает
+    """
+    pairs = {(task_id, user_id) for task_id, user_id in pairs
+             if user_id != actor_id}
+    if not pairs:
+        return 0
+    workspaces = dict(Task.objects.filter(
+        pk__in={task_id for task_id, user_id in pairs}
+    ).values_list('id', 'workspace_id'))
+    return deliver(Notification.Kind.ASSIGNED, [
+        (task_id, workspaces[task_id], user_id)
+        for task_id, user_id in pairs if task_id in workspaces
+    ], actor_id)
+
+
+def deliver(kind, rows, actor_id=None):
+    """Записать уведомления по тройкам (задача, пространство, получатель)"""
+    if buffer.active:
+        # Откат транзакции не должен оставлять событий в буфере
+        transaction.on_commit(lambda: buffer.add(kind, rows, actor_id))
+    else:
+        write([
+            Notification(recipient_id=user_id, task_id=task_id,
+                         workspace_id=workspace_id, kind=kind,
+                         actor_id=actor_id)
+            for task_id, workspace_id, user_id in rows
+        ])
+    return len(rows)
+
+
+def write(notifications):
+    """Записать уведомления пачками и увеличить счётчики получателей"""
+    if not notifications:
+        return
+    with transaction.atomic():
+        Notification.objects.bulk_create(
+            notifications, batch_size=BATCH_SIZE)
+        counts = Counter(item.recipient_id for item in notifications)
+        add_unread(counts)
+        for user_id, count in counts.items():
+            realtime.publish([f'user:{user_id}'],
+                             {'type': 'notification.created', 'count': count})
+
+
+def flush_digest(force=False):
+    """
+    Записать сводки с истёкшим окном (все при force): по одному
+    уведомлению на ключ буфера, пачками по NOTIFICATION_DIGEST['BATCH_SIZE']
+    """
+    batch_size = settings.NOTIFICATION_DIGEST.get('BATCH_SIZE', BATCH_SIZE)
+    drained = buffer.drain(force)
+    for start in range(0, len(drained), batch_size):
+        write(_digests(drained[start:start + batch_size]))
+    return len(drained)
+
+
+def _digests(entries):
+    """
+    Уведомления-сводки по записям буфера. Задачи, пространства и
+    пользователи могли быть удалены, пока события ждали сброса
+    """
+    task_ids = set().union(*(entry.task_ids for user_id, entry in entries))
+    workspace_ids = {entry.workspace_id for user_id, entry in entries}
+    user_ids = {user_id for user_id, entry in entries}
+    tasks = set(Task.objects.filter(
+        pk__in=task_ids).values_list('id', flat=True))
+    workspaces = set(Workspace.objects.filter(
+        pk__in=workspace_ids - {None}).values_list('id', flat=True))
+    users = set(User.objects.filter(
+        pk__in=user_ids).values_list('id', flat=True))
+
+    notifications = []
+    for user_id, entry in entries:
+        entry_tasks = entry.task_ids & tasks
+        if user_id not in users or not entry_tasks:
+            continue
+        if entry.workspace_id is not None and entry.workspace_id not in workspaces:
+            continue
+        notifications.append(Notification(
+            recipient_id=user_id,
+            kind=(next(iter(entry.kinds)) if len(entry.kinds) == 1
+                  else Notification.Kind.DIGEST),
+            task_id=next(iter(entry_tasks)) if len(entry_tasks) == 1 else None,
+            workspace_id=entry.workspace_id,
+            actor_id=(next(iter(entry.actor_ids))
+                      if len(entry.actor_ids) == 1 else None),
+            events_count=entry.count,
+        ))
+    return notifications
+
+
+def add_unread(counts):
+    """
+    Изменить счётчики на {user_id: приращение}: строки счётчиков
+    создаются при первом уведомлении, затем одно UPDATE на каждое
+    различное приращение
+    """
+    counts = {user_id: delta for user_id, delta in counts.items() if delta}
+    if not counts:
+        return
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id) for user_id in counts],
+        batch_size=BATCH_SIZE, ignore_conflicts=True)
+    by_delta = defaultdict(list)
+    for user_id, delta in counts.items():
+        by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        UnreadCounter.objects.filter(user_id__in=user_ids).update(
+            unread=F('unread') + delta)
+
+
+def unread_count(user):
+    return UnreadCounter.objects.filter(user=user).values_list(
+        'unread', flat=True).first() or 0
+
+
+@transaction.atomic
+def mark_read(user, notification_ids=None):
+    """
+    Пометить прочитанными уведомления пользователя (None — все) одним
+    UPDATE; счётчик уменьшается на число действительно изменённых строк,
+    так что параллельно пришедшие уведомления не теряются
+    """
+    unread = Notification.objects.filter(recipient=user, is_read=False)
+    if notification_ids is not None:
+        unread = unread.filter(pk__in=notification_ids)
+    updated = unread.update(is_read=True)
+    if updated:
+        UnreadCounter.objects.filter(user=user).update(
+            unread=F('unread') - updated)
+    return updated
+
+
+def discard_unread(notifications):
+    """Вычесть из счётчиков непрочитанные уведомления перед их удалением"""
+    unread = notifications.filter(is_read=False).values(
+        'recipient_id').annotate(count=Count('id')).values_list(
+        'recipient_id', 'count')
+    add_unread({user_id: -count for user_id, count in unread})
+
+
+def _actual_unread():
+    unread = Notification.objects.filter(
+        recipient=OuterRef('user_id'), is_read=False
+    ).order_by().values('recipient').annotate(count=Count('id')).values('count')
+    return Coalesce(Subquery(unread), 0)
+
+
+def refresh_unread(user_ids=None):
+    """Пересчитать счётчики пользователей user_ids (None — всех)"""
+    counters = UnreadCounter.objects.all()
+    if user_ids is not None:
+        counters = counters.filter(user_id__in=user_ids)
+    return counters.update(unread=_actual_unread())
+
+
+def drifted_unread():
+    """id пользователей, чей счётчик расходится с уведомлениями"""
+    return UnreadCounter.objects.annotate(actual=_actual_unread()).exclude(
+        unread=F('actual')).values_list('user_id', flat=True)
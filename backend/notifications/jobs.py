@@ -0,0 +1,34 @@
+"""
+Периодический сброс буфера сводок уведомлений (digest.py).
+
+Буфер живёт в памяти процесса-воркера, поэтому задача регистрируется как
+worker_only и запускается в самих воркерах настройкой BACKGROUND_JOBS.
+"""
+import atexit
+
+from django.conf import settings
+from task_planner import jobs
+from . import fanout
+
+
+def _options():
+    return getattr(settings, 'NOTIFICATION_DIGEST', {})
+
+
+def _interval():
+    # Без окна сводки выключены: уведомления пишутся сразу
+    options = _options()
+    return options.get('FLUSH_INTERVAL', 10) if options.get('WINDOW') else None
+
+
+def start_digest():
+    """
+    Включить буфер в текущем процессе; остаток записывается при штатном
+    завершении процесса
+    """
+    fanout.buffer.start(_options()['WINDOW'])
+    atexit.register(fanout.flush_digest, force=True)
+
+
+jobs.register('notification-digest', fanout.flush_digest, _interval,
+              setup=start_digest, worker_only=True)
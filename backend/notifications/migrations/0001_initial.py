@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('task_planner', '0009_denormalized_counters'),
+        ('users', '0002_alter_user_options_alter_user_bio_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+                ('unread', models.IntegerField(default=0, verbose_name='непрочитанных')),
+            ],
+            options={
+                'verbose_name': 'счётчик уведомлений',
+                'verbose_name_plural': 'счётчики уведомлений',
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.IntegerField(choices=[(1, 'Назначены исполнители'), (2, 'Новый комментарий'), (3, 'Задача просрочена')], verbose_name='тип')),
+                ('is_read', models.BooleanField(default=False, verbose_name='прочитано')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата создания')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='автор события')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='получатель')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='task_planner.task', verbose_name='задача')),
+            ],
+            options={
+                'verbose_name': 'уведомление',
+                'verbose_name_plural': 'уведомления',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['recipient', '-id'], name='notification_recipient_idx'), models.Index(condition=models.Q(('is_read', False)), fields=['recipient', '-id'], name='notification_unread_idx')],
+            },
+        ),
+    ]
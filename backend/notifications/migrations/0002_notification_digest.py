@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_workspaces(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    Task = apps.get_model('task_planner', 'Task')
+    Notification.objects.filter(task__workspace__isnull=False).update(
+        workspace=Subquery(Task.objects.filter(
+            pk=OuterRef('task_id')).values('workspace_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        ('task_planner', '0009_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='events_count',
+            field=models.PositiveIntegerField(default=1, verbose_name='событий'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='workspace',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='task_planner.workspace', verbose_name='рабочее пространство'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='kind',
+            field=models.IntegerField(choices=[(1, 'Назначены исполнители'), (2, 'Новый комментарий'), (3, 'Задача просрочена'), (4, 'Изменения в задачах')], verbose_name='тип'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='task',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='task_planner.task', verbose_name='задача'),
+        ),
+        migrations.RunPython(populate_workspaces, migrations.RunPython.noop),
+    ]
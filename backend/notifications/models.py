@@ -1,3 +1,92 @@
 from django.db import models
+from django.db.models import Q
+from users.models import User
+from task_planner.models import Task, Workspace
 
-# Create your models here.
+
+class Notification(models.Model):
+    """Уведомление пользователя о событии задачи"""
+    class Kind(models.IntegerChoices):
+        ASSIGNED = 1, 'Назначены исполнители'
+        COMMENTED = 2, 'Новый комментарий'
+        OVERDUE = 3, 'Задача просрочена'
+        DIGEST = 4, 'Изменения в задачах'
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='получатель'
+    )
+    kind = models.IntegerField('тип', choices=Kind.choices)
+    # В сводке по нескольким задачам пространства задача не указывается
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notifications',
+        verbose_name='задача'
+    )
+    workspace = models.ForeignKey(
+        Workspace,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notifications',
+        verbose_name='рабочее пространство'
+    )
+    events_count = models.PositiveIntegerField('событий', default=1)
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='автор события'
+    )
+    is_read = models.BooleanField('прочитано', default=False)
+    created_at = models.DateTimeField('дата создания', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'уведомление'
+        verbose_name_plural = 'уведомления'
+        ordering = ['-id']
+        indexes = [
+            models.Index(
+                fields=['recipient', '-id'],
+                name='notification_recipient_idx'
+            ),
+            # Непрочитанные: фильтр ?unread=1 и «прочитать все»
+            models.Index(
+                fields=['recipient', '-id'],
+                condition=Q(is_read=False),
+                name='notification_unread_idx'
+            ),
+        ]
+
+    def __str__(self):
+        target = self.task_id or f'пространство {self.workspace_id}'
+        return f'{self.get_kind_display()}: {target} для {self.recipient_id}'
+
+
+class UnreadCounter(models.Model):
+    """
+    Число непрочитанных уведомлений пользователя для значка без COUNT.
+    Поддерживается fanout.py; расхождения правит fanout.refresh_unread
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter',
+        verbose_name='пользователь'
+    )
+    unread = models.IntegerField('непрочитанных', default=0)
+
+    class Meta:
+        verbose_name = 'счётчик уведомлений'
+        verbose_name_plural = 'счётчики уведомлений'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.unread}'
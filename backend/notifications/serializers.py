@@ -0,0 +1,16 @@
+from rest_framework import serializers
+from core.serializers import SparseFieldsMixin
+from .models import Notification
+
+
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    task_title = serializers.CharField(
+        source='task.title', read_only=True, default=None)
+
+    class Meta:
+        model = Notification
+        fields = [
+            'id', 'kind', 'task', 'task_title', 'workspace', 'events_count',
+            'actor', 'is_read', 'created_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,54 @@
+from collections import defaultdict
+
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+from task_planner.models import Comment, Task, Workspace
+from task_planner.signals import tasks_marked_overdue
+from . import fanout
+from .models import Notification
+
+Kind = Notification.Kind
+
+
+@receiver(m2m_changed, sender=Task.assignees.through)
+def notify_assigned(sender, instance, action, reverse, pk_set, **kwargs):
+    # pk_set после добавления — только действительно новые связи, о
+    # назначении узнают только они. Исполнителей меняет только владелец
+    # задачи: он и автор события
+    if action != 'post_add' or not pk_set:
+        return
+    if not reverse:
+        fanout.notify_assigned(
+            [(instance.pk, user_id) for user_id in pk_set], instance.owner_id)
+        return
+    by_owner = defaultdict(list)
+    for task_id, owner_id in Task.objects.filter(
+            pk__in=pk_set).values_list('id', 'owner_id'):
+        by_owner[owner_id].append((task_id, instance.pk))
+    for owner_id, pairs in by_owner.items():
+        fanout.notify_assigned(pairs, owner_id)
+
+
+@receiver(post_save, sender=Comment)
+def notify_commented(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        fanout.notify(Kind.COMMENTED, [instance.task_id], instance.author_id,
+                      instance)
+
+
+@receiver(tasks_marked_overdue)
+def notify_overdue(sender, task_ids, **kwargs):
+    fanout.notify(Kind.OVERDUE, task_ids)
+
+
+@receiver(pre_delete, sender=Task)
+def discard_task_notifications(sender, instance, **kwargs):
+    # Уведомления удалятся каскадом без сигналов — поправляем счётчики заранее
+    fanout.discard_unread(Notification.objects.filter(task=instance))
+
+
+@receiver(pre_delete, sender=Workspace)
+def discard_workspace_digests(sender, instance, **kwargs):
+    # Уведомления о задачах пространства учтёт discard_task_notifications
+    fanout.discard_unread(Notification.objects.filter(
+        workspace=instance, task__isnull=True))
@@ -1,3 +1,217 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from task_planner import search
+from task_planner.jobs import mark_overdue_tasks
+from task_planner.models import Comment, Task, Workspace, WorkspaceMembership
+from users.models import User
+from . import fanout
+from .models import Notification
+
+Kind = Notification.Kind
+
+
+class NotificationTests(TestCase):
+    """Рассылка, счётчик непрочитанных и отметка о прочтении"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='password')
+        cls.member = User.objects.create_user('member', password='password')
+        cls.assignee = User.objects.create_user('assignee', password='password')
+        cls.workspace = Workspace.objects.create(title='ws', owner=cls.owner)
+        for user, role in ((cls.owner, WorkspaceMembership.Role.OWNER),
+                           (cls.member, WorkspaceMembership.Role.MEMBER)):
+            WorkspaceMembership.objects.create(
+                user=user, workspace=cls.workspace, role=role)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def received(self, kind):
+        return sorted(Notification.objects.filter(kind=kind).values_list(
+            'recipient__username', flat=True))
+
+    def unread(self, user):
+        response = self.client_for(user).get(
+            '/api/notifications/unread_count/')
+        return response.data['unread']
+
+    def test_assignment_skips_actor(self):
+        client = self.client_for(self.owner)
+        response = client.post('/api/tasks/tasks/', {
+            'title': 'Одна', 'workspace': self.workspace.pk,
+            'assignees': [self.assignee.pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.received(Kind.ASSIGNED), ['assignee'])
+
+        response = client.post('/api/tasks/tasks/bulk/', [{'op': 'create', 'data': {
+            'title': 'Пачкой', 'workspace': self.workspace.pk,
+            'assignees': [self.assignee.pk],
+        }}], format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            self.received(Kind.ASSIGNED), ['assignee', 'assignee'])
+        self.assertEqual(self.unread(self.owner), 0)
+        self.assertEqual(self.unread(self.member), 0)
+        self.assertEqual(self.unread(self.assignee), 2)
+
+    def test_assignment_notifies_only_added_users(self):
+        task = Task.objects.create(
+            title='Задача', owner=self.owner, workspace=self.workspace)
+        task.assignees.add(self.assignee)
+        task.assignees.add(self.assignee, self.member)
+        self.assertEqual(
+            self.received(Kind.ASSIGNED), ['assignee', 'member'])
+
+        response = self.client_for(self.owner).post(
+            '/api/tasks/tasks/bulk/', [{'op': 'update', 'id': task.pk, 'data': {
+                'assignees': [self.assignee.pk, self.member.pk, self.owner.pk],
+            }}], format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            self.received(Kind.ASSIGNED), ['assignee', 'member'])
+
+        self.member.assigned_tasks.add(Task.objects.create(
+            title='Ещё', owner=self.owner, workspace=self.workspace))
+        self.assertEqual(
+            self.received(Kind.ASSIGNED), ['assignee', 'member', 'member'])
+
+    def test_comment_skips_author(self):
+        task = Task.objects.create(
+            title='Задача', owner=self.owner, workspace=self.workspace)
+        Comment.objects.create(task=task, author=self.member, text='готово')
+        self.assertEqual(self.received(Kind.COMMENTED), ['owner'])
+        self.assertEqual(self.unread(self.member), 0)
+
+    def test_comment_resolves_recipients_with_channels(self):
+        task = Task.objects.create(
+            title='Задача', owner=self.owner, workspace=self.workspace)
+        task.assignees.add(self.assignee)
+        task = Task.objects.get(pk=task.pk)
+        indexed = 2 if search.is_enabled() else 0
+        # Комментарий: SAVEPOINT, INSERT, счётчик, аудитория задачи, RELEASE;
+        # уведомления: SAVEPOINT, INSERT, строки и UPDATE счётчиков, RELEASE
+        with self.assertNumQueries(10 + indexed):
+            Comment.objects.create(task=task, author=self.member, text='готово')
+        self.assertEqual(self.received(Kind.COMMENTED), ['assignee', 'owner'])
+
+    def test_mark_read_updates_counter(self):
+        task = Task.objects.create(
+            title='Задача', owner=self.owner, workspace=self.workspace)
+        for text in ('раз', 'два', 'три'):
+            Comment.objects.create(task=task, author=self.owner, text=text)
+        client = self.client_for(self.member)
+        self.assertEqual(self.unread(self.member), 3)
+
+        first = Notification.objects.filter(recipient=self.member).first()
+        self.assertEqual(
+            client.post(f'/api/notifications/{first.pk}/read/').status_code, 204)
+        client.post(f'/api/notifications/{first.pk}/read/')
+        self.assertEqual(self.unread(self.member), 2)
+        response = client.get('/api/notifications/', {'unread': '1'})
+        self.assertEqual(len(response.data['results']), 2)
+
+        Comment.objects.create(task=task, author=self.member, text='чужое')
+        foreign = Notification.objects.get(recipient=self.owner)
+        response = client.post(f'/api/notifications/{foreign.pk}/read/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.unread(self.owner), 1)
+
+        self.assertEqual(client.post('/api/notifications/read-all/').data,
+                         {'updated': 2})
+        self.assertEqual(self.unread(self.member), 0)
+        self.assertEqual(list(fanout.drifted_unread()), [])
+
+    def test_task_deletion_discards_unread(self):
+        task = Task.objects.create(
+            title='Задача', owner=self.owner, workspace=self.workspace)
+        Comment.objects.create(task=task, author=self.owner, text='текст')
+        self.assertEqual(self.unread(self.member), 1)
+        task.delete()
+        self.assertEqual(self.unread(self.member), 0)
+        self.assertEqual(list(fanout.drifted_unread()), [])
+
+    def test_overdue_sweep_notifies_changed_rows_once(self):
+        yesterday = timezone.now().date() - timedelta(days=1)
+        due = Task.objects.create(
+            title='Срок вышел', owner=self.owner, workspace=self.workspace)
+        done = Task.objects.create(
+            title='Сделана', owner=self.owner, workspace=self.workspace,
+            status=Task.Status.COMPLETED)
+        Task.objects.filter(pk__in=[due.pk, done.pk]).update(
+            due_date=yesterday)
+
+        self.assertEqual(mark_overdue_tasks(), 1)
+        self.assertEqual(mark_overdue_tasks(), 0)
+        self.assertEqual(
+            set(Notification.objects.filter(kind=Kind.OVERDUE).values_list(
+                'task_id', flat=True)), {due.pk})
+        self.assertEqual(self.received(Kind.OVERDUE), ['member', 'owner'])
+        self.assertEqual(self.unread(self.owner), 1)
+
+    def test_overdue_sweep_notifies_personal_task_owner(self):
+        personal = Task.objects.create(title='Личная', owner=self.member)
+        Task.objects.filter(pk=personal.pk).update(
+            due_date=timezone.now().date() - timedelta(days=1))
+
+        self.assertEqual(mark_overdue_tasks(), 1)
+        self.assertEqual(self.received(Kind.OVERDUE), ['member'])
+        self.assertEqual(self.unread(self.member), 1)
+
+
+class DigestTests(TestCase):
+    """События в окне сводки копятся в буфере и пишутся одной строкой"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('digest_owner', password='password')
+        cls.member = User.objects.create_user('digest_member', password='password')
+        cls.workspace = Workspace.objects.create(title='ws', owner=cls.owner)
+        for user, role in ((cls.owner, WorkspaceMembership.Role.OWNER),
+                           (cls.member, WorkspaceMembership.Role.MEMBER)):
+            WorkspaceMembership.objects.create(
+                user=user, workspace=cls.workspace, role=role)
+
+    def setUp(self):
+        fanout.buffer.start(60)
+        self.addCleanup(fanout.buffer.drain, force=True)
+        self.addCleanup(setattr, fanout.buffer, 'window', None)
+
+    def test_flush_writes_one_notification_per_key(self):
+        tasks = [Task.objects.create(title=f'Задача {n}', owner=self.owner,
+                                     workspace=self.workspace)
+                 for n in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for task in tasks:
+                Comment.objects.create(task=task, author=self.owner, text='текст')
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(fanout.flush_digest(), 0)
+
+        self.assertEqual(fanout.flush_digest(force=True), 1)
+        digest = Notification.objects.get()
+        self.assertEqual(
+            (digest.recipient, digest.kind, digest.task, digest.events_count),
+            (self.member, Kind.COMMENTED, None, 3))
+        self.assertEqual(fanout.unread_count(self.member), 1)
+
+    def test_rolled_back_events_are_not_buffered(self):
+        task = Task.objects.create(
+            title='Задача', owner=self.owner, workspace=self.workspace)
+        with self.captureOnCommitCallbacks(execute=False):
+            Comment.objects.create(task=task, author=self.owner, text='текст')
+        self.assertEqual(len(fanout.buffer), 0)
 
-# Create your tests here.
+    def test_deleted_task_is_skipped(self):
+        task = Task.objects.create(
+            title='Задача', owner=self.owner, workspace=self.workspace)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(task=task, author=self.owner, text='текст')
+        task.delete()
+        self.assertEqual(fanout.flush_digest(force=True), 1)
+        self.assertFalse(Notification.objects.exists())
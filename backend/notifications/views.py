@@ -1,3 +1,45 @@
-from django.shortcuts import render
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from . import fanout
+from .models import Notification
+from .serializers import NotificationSerializer
 
-# Create your views here.
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Уведомления текущего пользователя, новые сверху, с пагинацией по
+    ключу; ?unread=1 — только непрочитанные
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(recipient=self.request.user)
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(is_read=False)
+        fields = self.get_serializer().fields
+        if 'task_title' in fields:
+            queryset = queryset.select_related('task')
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Число непрочитанных для значка — из счётчика, без COUNT"""
+        return Response({'unread': fanout.unread_count(request.user)})
+
+    @action(detail=False, methods=['post'], url_path='read-all')
+    def read_all(self, request):
+        updated = fanout.mark_read(request.user)
+        return Response({'updated': updated})
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        if not fanout.mark_read(request.user, [pk]):
+            if not self.get_queryset().filter(pk=pk).exists():
+                return Response(
+                    {'error': 'Уведомление не найдено'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        return Response(status=status.HTTP_204_NO_CONTENT)
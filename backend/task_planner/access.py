@@ -0,0 +1,145 @@
+from django.db import transaction
+from .models import Task, TaskAccess, WorkspaceMembership
+from . import realtime, response_cache, sync
+
+Reason = TaskAccess.Reason
+
+
+def _revoke(rows):
+    """Удалить строки доступа и записать надгробия потерянных задач"""
+    pairs = list(rows.values_list('user_id', 'task_id'))
+    if pairs:
+        rows.delete()
+        realtime.publish_revoked(sync.record_lost_access(pairs))
+        response_cache.bump(
+            response_cache.TASK_RESOURCES, [user_id for user_id, _ in pairs])
+
+
+def sync_task_owner(task):
+    """Привести строку доступа владельца в соответствие с task.owner"""
+    _revoke(TaskAccess.objects.filter(task=task, reason=Reason.OWNER).exclude(
+        user_id=task.owner_id))
+    TaskAccess.objects.bulk_create(
+        [TaskAccess(user_id=task.owner_id, task=task, reason=Reason.OWNER)],
+        ignore_conflicts=True
+    )
+
+
+def sync_task_members(task):
+    """Пересобрать строки доступа участников рабочего пространства задачи"""
+    rows = TaskAccess.objects.filter(task=task, reason=Reason.MEMBER)
+    if task.workspace_id is None:
+        _revoke(rows)
+        return
+    member_ids = WorkspaceMembership.objects.filter(
+        workspace_id=task.workspace_id).values('user_id')
+    _revoke(rows.exclude(user_id__in=member_ids))
+    TaskAccess.objects.bulk_create(
+        [
+            TaskAccess(user_id=user_id, task=task, reason=Reason.MEMBER)
+            for user_id in member_ids.values_list('user_id', flat=True)
+        ],
+        ignore_conflicts=True
+    )
+
+
+def grant_assignees(task_ids, user_ids):
+    grant_assignee_pairs(
+        (task_id, user_id) for task_id in task_ids for user_id in user_ids)
+
+
+def grant_assignee_pairs(pairs):
+    TaskAccess.objects.bulk_create(
+        [
+            TaskAccess(user_id=user_id, task_id=task_id,
+                       reason=Reason.ASSIGNEE)
+            for task_id, user_id in pairs
+        ],
+        ignore_conflicts=True
+    )
+
+
+def revoke_assignees(task_ids, user_ids=None):
+    rows = TaskAccess.objects.filter(
+        task_id__in=task_ids, reason=Reason.ASSIGNEE)
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    _revoke(rows)
+
+
+def grant_new_tasks(tasks):
+    """Доступ владельца и участников для задач, созданных через bulk_create"""
+    workspace_ids = {task.workspace_id for task in tasks if task.workspace_id}
+    members = {}
+    for workspace_id, user_id in WorkspaceMembership.objects.filter(
+            workspace_id__in=workspace_ids).values_list('workspace_id', 'user_id'):
+        members.setdefault(workspace_id, []).append(user_id)
+
+    rows = []
+    for task in tasks:
+        rows.append(TaskAccess(
+            user_id=task.owner_id, task_id=task.pk, reason=Reason.OWNER))
+        rows.extend(
+            TaskAccess(user_id=user_id, task_id=task.pk, reason=Reason.MEMBER)
+            for user_id in members.get(task.workspace_id, [])
+        )
+    TaskAccess.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+def grant_membership(user_id, workspace_id):
+    """Открыть пользователю все задачи рабочего пространства"""
+    task_ids = Task.objects.filter(
+        workspace_id=workspace_id).values_list('id', flat=True)
+    TaskAccess.objects.bulk_create(
+        [
+            TaskAccess(user_id=user_id, task_id=task_id, reason=Reason.MEMBER)
+            for task_id in task_ids.iterator()
+        ],
+        ignore_conflicts=True
+    )
+
+
+def revoke_membership(user_id, workspace_id):
+    _revoke(TaskAccess.objects.filter(
+        user_id=user_id,
+        reason=Reason.MEMBER,
+        task__workspace_id=workspace_id
+    ))
+
+
+@transaction.atomic
+def rebuild_task_access():
+    """Полностью пересобрать индекс доступа из исходных таблиц"""
+    TaskAccess.objects.all().delete()
+
+    owners = Task.objects.values_list('id', 'owner_id')
+    TaskAccess.objects.bulk_create(
+        (
+            TaskAccess(task_id=task_id, user_id=user_id, reason=Reason.OWNER)
+            for task_id, user_id in owners.iterator()
+        ),
+        batch_size=1000
+    )
+
+    assignees = Task.assignees.through.objects.values_list(
+        'task_id', 'user_id')
+    TaskAccess.objects.bulk_create(
+        (
+            TaskAccess(task_id=task_id, user_id=user_id,
+                       reason=Reason.ASSIGNEE)
+            for task_id, user_id in assignees.iterator()
+        ),
+        batch_size=1000
+    )
+
+    members = Task.objects.filter(
+        workspace__memberships__isnull=False
+    ).values_list('id', 'workspace__memberships__user_id')
+    TaskAccess.objects.bulk_create(
+        (
+            TaskAccess(task_id=task_id, user_id=user_id, reason=Reason.MEMBER)
+            for task_id, user_id in members.iterator()
+        ),
+        batch_size=1000
+    )
+    return TaskAccess.objects.count()
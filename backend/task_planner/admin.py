@@ -1,6 +1,20 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from .models import Tag, Workspace, WorkspaceMembership, Task, Subtask, Comment
+from . import search
+
+
+class FullTextSearchMixin:
+    """Поиск в списке объектов через индекс FTS5 вместо LIKE по тексту"""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term)
+        if search_term and search.is_enabled():
+            ids = search.match_ids(self.search_kind, search_term)
+            results = results | queryset.filter(pk__in=ids)
+        return results, may_have_duplicates
 
 
 @admin.register(Tag)
@@ -29,15 +43,11 @@ class WorkspaceAdmin(admin.ModelAdmin):
     list_display = ['title', 'owner', 'created_at', 'members_count']
     list_filter = ['created_at', 'owner']
     search_fields = ['title', 'description', 'owner__username']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'members_count']
     inlines = [WorkspaceMembershipInline]
     raw_id_fields = ['owner']
     list_per_page = 20
 
-    def members_count(self, obj):
-        return obj.memberships.count()
-    members_count.short_description = 'участников'
-
 
 @admin.register(WorkspaceMembership)
 class WorkspaceMembershipAdmin(admin.ModelAdmin):
@@ -73,7 +83,7 @@ class CommentInline(admin.TabularInline):
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = [
         'title',
         'owner',
@@ -93,11 +103,10 @@ class TaskAdmin(admin.ModelAdmin):
         'workspace'
     ]
 
+    # title, description и названия тегов ищутся через FTS5
+    search_kind = 'task'
     search_fields = [
-        'title',
-        'description',
         'owner__username',
-        'tags__title'
     ]
 
     readonly_fields = [
@@ -149,13 +158,9 @@ class TaskAdmin(admin.ModelAdmin):
         return '—'
     is_overdue_display.short_description = 'просрочена'
 
-    def assignees_count(self, obj):
-        return obj.assignees.count()
-    assignees_count.short_description = 'исполнителей'
-
 
 @admin.register(Subtask)
-class SubtaskAdmin(admin.ModelAdmin):
+class SubtaskAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = [
         'title',
         'parent_task',
@@ -170,9 +175,9 @@ class SubtaskAdmin(admin.ModelAdmin):
         'parent_task'
     ]
 
+    # title и description ищутся через FTS5
+    search_kind = 'subtask'
     search_fields = [
-        'title',
-        'description',
         'parent_task__title',
         'assignee__username'
     ]
@@ -198,7 +203,7 @@ class SubtaskAdmin(admin.ModelAdmin):
 
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = [
         'task',
         'author',
@@ -212,8 +217,9 @@ class CommentAdmin(admin.ModelAdmin):
         'task'
     ]
 
+    # text ищется через FTS5
+    search_kind = 'comment'
     search_fields = [
-        'text',
         'author__username',
         'task__title'
     ]
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
 
 
 class TaskPlannerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'task_planner'
+
+    def ready(self):
+        from . import jobs, signals  # noqa: F401
+        if getattr(settings, 'BACKGROUND_JOBS', None):
+            request_started.connect(jobs.start_configured)
@@ -0,0 +1,61 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def list_etag(request, components):
+    """ETag списка: зависит от пользователя, URL, формата и валидатора"""
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = repr((
+        request.user.pk,
+        request.get_full_path(),
+        getattr(renderer, 'format', None),
+        components,
+    ))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def first_seen(etag):
+    """
+    Момент, когда этот ETag впервые встретился процессу.
+
+    Используется как Last-Modified: любое изменение списка, в том числе
+    удаление строк, даёт новый ETag, а значит и более поздний Last-Modified.
+    Если запись вытеснена из кэша, получаем «сейчас» — это лишь отдаёт 200
+    вместо 304.
+    """
+    key = f'task_planner:etag:{etag}'
+    now = int(time.time())
+    if cache.add(key, now, timeout=60 * 60 * 24):
+        return now
+    return cache.get(key, now)
+
+
+def conditional_list(method):
+    """
+    Условный GET для действий со списками: до сериализации считает дешёвый
+    валидатор через view.get_list_validator() и отвечает 304, если клиент
+    прислал актуальные If-None-Match / If-Modified-Since.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        etag = list_etag(request, self.get_list_validator())
+        last_modified = first_seen(etag)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
+    return wrapper
@@ -0,0 +1,123 @@
+"""
+Денормализованные счётчики: Task.subtasks_count, comments_count,
+assignees_count и Workspace.members_count.
+
+Поштучные изменения увеличивают и уменьшают счётчик через F() в той же
+транзакции, что и запись строки (сигналы из signals.py). Пакетные пути
+без сигналов (bulk_create в сериализаторах и импорте) и сверка
+пересчитывают счётчики одним UPDATE с коррелированными подзапросами.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from .models import Task, Subtask, Comment, Workspace, WorkspaceMembership
+
+# Дочерняя модель -> (колонка родителя, модель родителя, поле счётчика)
+COUNTED = {
+    Subtask: ('parent_task_id', Task, 'subtasks_count'),
+    Comment: ('task_id', Task, 'comments_count'),
+    WorkspaceMembership: ('workspace_id', Workspace, 'members_count'),
+}
+
+# Поле счётчика -> (модель строк, связь на родителя)
+TASK_COUNTERS = {
+    'subtasks_count': (Subtask, 'parent_task'),
+    'comments_count': (Comment, 'task'),
+    'assignees_count': (Task.assignees.through, 'task'),
+}
+WORKSPACE_COUNTERS = {
+    'members_count': (WorkspaceMembership, 'workspace'),
+}
+
+
+def add(model, pks, field, delta):
+    """Изменить счётчик field у строк pks на delta одним UPDATE"""
+    pks = set(pks) - {None}
+    if pks and delta:
+        model.objects.filter(pk__in=pks).update(**{field: F(field) + delta})
+
+
+def remember(instance):
+    """Запомнить родителя, с которым строка загружена или создана"""
+    column = COUNTED[type(instance)][0]
+    instance._counter_parent = getattr(instance, column)
+
+
+def _add_cached(instance, delta):
+    # Родитель, уже загруженный в память вместе со строкой, получает то же
+    # изменение, чтобы ответ API не расходился с базой
+    column, parent, field = COUNTED[type(instance)]
+    relation = instance._meta.get_field(column[:-len('_id')])
+    cached = relation.get_cached_value(instance, None)
+    if cached is not None and cached.pk == getattr(instance, column):
+        setattr(cached, field, getattr(cached, field) + delta)
+
+
+def saved(instance, created):
+    column, parent, field = COUNTED[type(instance)]
+    current = getattr(instance, column)
+    previous = None if created else getattr(instance, '_counter_parent', current)
+    if previous != current:
+        add(parent, [previous], field, -1)
+        add(parent, [current], field, 1)
+        _add_cached(instance, 1)
+    instance._counter_moved_from = previous
+    instance._counter_parent = current
+
+
+def deleted(instance, origin=None):
+    column, parent, field = COUNTED[type(instance)]
+    parent_id = getattr(instance, column)
+    # Каскад от удаления самого родителя: его строка тоже удаляется
+    if isinstance(origin, parent) and origin.pk == parent_id:
+        return
+    if getattr(origin, 'model', None) is parent:
+        return
+    add(parent, [parent_id], field, -1)
+    _add_cached(instance, -1)
+
+
+def _count(model, field):
+    # Коррелированный подзапрос вместо JOIN: несколько Count по разным
+    # связям через JOIN перемножили бы строки
+    counts = model.objects.filter(**{field: OuterRef('pk')}).order_by(
+    ).values(field).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def _actual(counters):
+    return {name: _count(*source) for name, source in counters.items()}
+
+
+def refresh_tasks(task_ids=None):
+    """Пересчитать счётчики задач task_ids (None — всех)"""
+    tasks = Task.objects.all()
+    if task_ids is not None:
+        tasks = tasks.filter(pk__in=task_ids)
+    return tasks.update(**_actual(TASK_COUNTERS))
+
+
+def refresh_workspaces(workspace_ids=None):
+    """Пересчитать счётчики пространств workspace_ids (None — всех)"""
+    workspaces = Workspace.objects.all()
+    if workspace_ids is not None:
+        workspaces = workspaces.filter(pk__in=workspace_ids)
+    return workspaces.update(**_actual(WORKSPACE_COUNTERS))
+
+
+def _drifted(queryset, counters):
+    actual = {f'actual_{name}': value for name, value in _actual(counters).items()}
+    mismatch = Q()
+    for name in counters:
+        mismatch |= ~Q(**{name: F(f'actual_{name}')})
+    return queryset.order_by().annotate(**actual).filter(
+        mismatch).values_list('pk', flat=True)
+
+
+def drifted_tasks():
+    """id задач, чьи счётчики разошлись с фактическими"""
+    return _drifted(Task.objects.all(), TASK_COUNTERS)
+
+
+def drifted_workspaces():
+    """id пространств, чей счётчик участников разошёлся с фактическим"""
+    return _drifted(Workspace.objects.all(), WORKSPACE_COUNTERS)
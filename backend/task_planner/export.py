@@ -0,0 +1,161 @@
+"""
+Потоковая выгрузка задач с подзадачами и комментариями в NDJSON или CSV.
+
+Задачи читаются через QuerySet.iterator() пачками; для каждой пачки одним
+запросом на связь подгружаются теги, исполнители, подзадачи, комментарии
+и имена пользователей. В памяти одновременно держится только одна пачка.
+"""
+import csv
+import io
+import zlib
+from collections import defaultdict
+from datetime import date
+from itertools import islice
+
+from core.renderers import dumps
+from users.models import User
+from .models import Task, Subtask, Comment
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+TASK_FIELDS = [
+    'id', 'title', 'description', 'status', 'priority', 'owner_id',
+    'workspace_id', 'due_date', 'deadline', 'created_at', 'updated_at',
+]
+SUBTASK_FIELDS = [
+    'id', 'parent_task_id', 'title', 'description', 'status',
+    'assignee_id', 'created_at', 'updated_at',
+]
+COMMENT_FIELDS = [
+    'id', 'task_id', 'author_id', 'text', 'created_at', 'updated_at',
+]
+
+# Одна строка CSV на задачу, подзадачу или комментарий
+CSV_COLUMNS = [
+    'record', 'id', 'task_id', 'title', 'description', 'text', 'status',
+    'priority', 'owner', 'workspace', 'due_date', 'deadline', 'tags',
+    'assignees', 'author', 'created_at', 'updated_at',
+]
+CSV_LIST_SEPARATOR = ';'
+
+
+def iter_task_batches(queryset, subtask_task_ids=None, batch_size=1000):
+    """
+    Пачки задач в виде словарей со вложенными subtasks и comments.
+    subtask_task_ids ограничивает задачи, подзадачи которых выгружаются
+    (подзадачи видны только владельцу и исполнителям).
+    """
+    rows = queryset.values(*TASK_FIELDS).iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        yield _attach_related(batch, subtask_task_ids)
+
+
+def _attach_related(tasks, subtask_task_ids):
+    task_ids = [task['id'] for task in tasks]
+
+    tags = defaultdict(list)
+    for task_id, title in Task.tags.through.objects.filter(
+            task_id__in=task_ids
+    ).order_by('tag__title').values_list('task_id', 'tag__title'):
+        tags[task_id].append(title)
+
+    assignees = defaultdict(list)
+    for task_id, user_id in Task.assignees.through.objects.filter(
+            task_id__in=task_ids
+    ).order_by('user_id').values_list('task_id', 'user_id'):
+        assignees[task_id].append(user_id)
+
+    subtask_rows = Subtask.objects.filter(parent_task_id__in=task_ids)
+    if subtask_task_ids is not None:
+        subtask_rows = subtask_rows.filter(parent_task_id__in=subtask_task_ids)
+    subtasks = defaultdict(list)
+    for subtask in subtask_rows.values(*SUBTASK_FIELDS):
+        subtasks[subtask.pop('parent_task_id')].append(subtask)
+
+    comments = defaultdict(list)
+    for comment in Comment.objects.filter(
+            task_id__in=task_ids).values(*COMMENT_FIELDS):
+        comments[comment.pop('task_id')].append(comment)
+
+    user_ids = {task['owner_id'] for task in tasks}
+    user_ids.update(pk for pks in assignees.values() for pk in pks)
+    user_ids.update(subtask['assignee_id']
+                    for items in subtasks.values() for subtask in items)
+    user_ids.update(comment['author_id']
+                    for items in comments.values() for comment in items)
+    usernames = dict(User.objects.filter(
+        pk__in=user_ids - {None}).values_list('id', 'username'))
+
+    result = []
+    for task in tasks:
+        pk = task['id']
+        task['owner'] = usernames.get(task.pop('owner_id'))
+        task['workspace'] = task.pop('workspace_id')
+        task['tags'] = tags[pk]
+        task['assignees'] = [
+            usernames.get(user_id) for user_id in assignees[pk]]
+        for subtask in subtasks[pk]:
+            subtask['assignee'] = usernames.get(subtask.pop('assignee_id'))
+        for comment in comments[pk]:
+            comment['author'] = usernames.get(comment.pop('author_id'))
+        task['subtasks'] = subtasks[pk]
+        task['comments'] = comments[pk]
+        result.append(task)
+    return result
+
+
+def iter_ndjson(batches):
+    for batch in batches:
+        yield b''.join(dumps(task) + b'\n' for task in batch)
+
+
+def _csv_row(record, task_id, values):
+    row = {}
+    for column in CSV_COLUMNS:
+        value = values.get(column)
+        if isinstance(value, list):
+            value = CSV_LIST_SEPARATOR.join(str(item) for item in value)
+        elif isinstance(value, date):
+            value = value.isoformat()
+        row[column] = value
+    row.update(record=record, task_id=task_id)
+    return row
+
+
+def iter_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS)
+    writer.writeheader()
+    for batch in batches:
+        for task in batch:
+            writer.writerow(_csv_row('task', task['id'], task))
+            for subtask in task['subtasks']:
+                writer.writerow(_csv_row(
+                    'subtask', task['id'],
+                    dict(subtask, assignees=subtask['assignee'])))
+            for comment in task['comments']:
+                writer.writerow(_csv_row('comment', task['id'], comment))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def gzip_stream(chunks, level=6):
+    """Сжимать поток в gzip на лету"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_tasks(queryset, file_format='ndjson', compress=False,
+                 subtask_task_ids=None, batch_size=1000):
+    """Поток байтов выгрузки в формате file_format (ключ FORMATS)"""
+    batches = iter_task_batches(queryset, subtask_task_ids, batch_size)
+    chunks = iter_csv(batches) if file_format == 'csv' else iter_ndjson(batches)
+    return gzip_stream(chunks) if compress else chunks
@@ -0,0 +1,93 @@
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from .models import Task
+
+
+class TaskFilterBackend(BaseFilterBackend):
+    """
+    Фильтрация и сортировка задач параметрами запроса.
+
+    Каждый параметр превращается в предикат по индексируемому полю Task;
+    фильтры по тегам и исполнителям — полусоединения с промежуточными
+    таблицами, без JOIN и DISTINCT. Сортировка допускается только из
+    списка, для которого есть индекс.
+    """
+    orderings = {
+        '-priority': ('-priority', 'due_date', 'id'),
+        'priority': ('priority', '-due_date', '-id'),
+        'due_date': ('due_date', 'id'),
+        '-due_date': ('-due_date', '-id'),
+        'deadline': ('deadline', 'id'),
+        '-deadline': ('-deadline', '-id'),
+        'created_at': ('created_at', 'id'),
+        '-created_at': ('-created_at', '-id'),
+        'updated_at': ('updated_at', 'id'),
+        '-updated_at': ('-updated_at', '-id'),
+    }
+    date_ranges = {
+        'due_date_after': 'due_date__gte',
+        'due_date_before': 'due_date__lte',
+        'deadline_after': 'deadline__gte',
+        'deadline_before': 'deadline__lte',
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if 'status' in params:
+            queryset = queryset.filter(status__in=self.parse_choices(
+                params, 'status', Task.Status.values))
+        if 'priority' in params:
+            queryset = queryset.filter(priority__in=self.parse_choices(
+                params, 'priority', Task.Priority.values))
+
+        if 'workspace' in params:
+            if params['workspace'] == 'none':
+                queryset = queryset.filter(workspace__isnull=True)
+            else:
+                queryset = queryset.filter(
+                    workspace_id=self.parse_ids(params, 'workspace')[0])
+
+        if 'tag' in params:
+            tagged = Task.tags.through.objects.filter(
+                tag_id__in=self.parse_ids(params, 'tag'))
+            queryset = queryset.filter(id__in=tagged.values('task_id'))
+
+        if 'assignee' in params:
+            if params['assignee'] == 'me':
+                user_ids = [request.user.pk]
+            else:
+                user_ids = self.parse_ids(params, 'assignee')
+            assigned = Task.assignees.through.objects.filter(
+                user_id__in=user_ids)
+            queryset = queryset.filter(id__in=assigned.values('task_id'))
+
+        for param, lookup in self.date_ranges.items():
+            if param in params:
+                value = parse_date(params[param]) if params[param] else None
+                if value is None:
+                    raise ValidationError(
+                        {param: ['Ожидается дата в формате ГГГГ-ММ-ДД']})
+                queryset = queryset.filter(**{lookup: value})
+
+        ordering = params.get('ordering')
+        if ordering:
+            if ordering not in self.orderings:
+                raise ValidationError({'ordering': [
+                    f'Допустимые значения: {", ".join(self.orderings)}']})
+            queryset = queryset.order_by(*self.orderings[ordering])
+        return queryset
+
+    @staticmethod
+    def parse_ids(params, name):
+        try:
+            return [int(value) for value in params[name].split(',')]
+        except ValueError:
+            raise ValidationError({name: ['Ожидается список чисел через запятую']})
+
+    def parse_choices(self, params, name, allowed):
+        values = self.parse_ids(params, name)
+        if not set(values) <= set(allowed):
+            raise ValidationError({name: [f'Допустимые значения: {allowed}']})
+        return values
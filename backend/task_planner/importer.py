@@ -0,0 +1,407 @@
+"""
+Массовый импорт задач, тегов и членств из NDJSON или CSV.
+
+Формат совпадает с выгрузкой export.py: задача ссылается на владельца и
+исполнителей по username, на пространство — по id или названию, на теги —
+по названию (теги принадлежат владельцу задачи и создаются при нужде).
+Строки с record=tag или record=membership создают теги и членства; в CSV
+подзадачи и комментарии идут строками record=subtask/comment сразу после
+своей задачи и ссылаются на неё через task_id из файла.
+
+Пользователи, пространства и теги разрешаются по словарям в памяти, записи
+вставляются через bulk_create пачками. Сигналы при этом не срабатывают,
+поэтому индекс доступа, поисковый индекс, счётчики, кэш ролей и кэш ответов
+обновляются явно для каждой пачки.
+"""
+import csv
+import json
+import time
+from collections import Counter
+
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from users.models import User
+from . import access, counters, realtime, response_cache, roles, search, stats
+from .models import Tag, Workspace, WorkspaceMembership, Task, Subtask, Comment
+
+CSV_LIST_SEPARATOR = ';'
+MAX_REPORTED_ERRORS = 20
+
+
+class RowError(ValueError):
+    pass
+
+
+class PendingTask:
+    def __init__(self, task, tag_keys, assignee_ids):
+        self.task = task
+        self.tag_keys = tag_keys
+        self.assignee_ids = assignee_ids
+        self.subtasks = []
+        self.comments = []
+
+
+class Importer:
+    def __init__(self, batch_size=1000, on_progress=None):
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.started = time.monotonic()
+        self.counts = Counter()
+        self.errors = []
+
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.workspace_ids = set(
+            Workspace.objects.values_list('id', flat=True))
+        self.workspace_titles = {}
+        for pk, title in Workspace.objects.order_by('-id').values_list(
+                'id', 'title'):
+            self.workspace_titles[title] = pk
+        self.tags = {
+            (user_id, title): pk
+            for pk, user_id, title in Tag.objects.values_list(
+                'id', 'user_id', 'title')
+        }
+        self.memberships = set(WorkspaceMembership.objects.values_list(
+            'workspace_id', 'user_id'))
+
+        self.pending = []
+        self.pending_by_source = {}
+        self.pending_tags = {}
+        self.pending_memberships = []
+
+    # Чтение
+
+    def import_stream(self, stream, file_format):
+        """Импортировать текстовый поток в формате 'ndjson' или 'csv'"""
+        if file_format == 'csv':
+            reader = csv.DictReader(stream)
+            for line, row in enumerate(reader, start=2):
+                self.add({
+                    key: value for key, value in row.items()
+                    if key and value != ''
+                }, line)
+        else:
+            for line, text in enumerate(stream, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    record = json.loads(text)
+                except ValueError as exc:
+                    self.error(line, f'неверный JSON: {exc}')
+                    continue
+                self.add(record, line)
+        self.flush()
+
+    def add(self, record, line):
+        self.counts['rows'] += 1
+        handlers = {
+            'task': self.add_task,
+            'subtask': self.add_subtask,
+            'comment': self.add_comment,
+            'tag': self.add_tag,
+            'membership': self.add_membership,
+        }
+        try:
+            if not isinstance(record, dict):
+                raise RowError('ожидается объект')
+            kind = record.get('record') or 'task'
+            if kind not in handlers:
+                raise RowError(f'неизвестный тип записи {kind!r}')
+            handlers[kind](record)
+        except RowError as exc:
+            self.error(line, str(exc))
+
+    def error(self, line, message):
+        self.counts['errors'] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'строка {line}: {message}')
+
+    # Разбор значений
+
+    def user_id(self, username, field, required=True):
+        if username in (None, ''):
+            if required:
+                raise RowError(f'{field}: обязательное поле')
+            return None
+        if not isinstance(username, str):
+            raise RowError(f'{field}: ожидается username')
+        try:
+            return self.users[username]
+        except KeyError:
+            raise RowError(f'{field}: пользователь {username!r} не найден')
+
+    def workspace_id(self, value, required=False):
+        if value in (None, ''):
+            if required:
+                raise RowError('workspace: обязательное поле')
+            return None
+        if isinstance(value, int) or str(value).isdigit():
+            if int(value) in self.workspace_ids:
+                return int(value)
+        elif value in self.workspace_titles:
+            return self.workspace_titles[value]
+        raise RowError(f'workspace: пространство {value!r} не найдено')
+
+    @staticmethod
+    def text(record, field, model, required=False):
+        value = record.get(field)
+        if value in (None, ''):
+            if required:
+                raise RowError(f'{field}: обязательное поле')
+            return ''
+        value = str(value)
+        max_length = model._meta.get_field(field).max_length
+        if max_length and len(value) > max_length:
+            raise RowError(f'{field}: длиннее {max_length} символов')
+        return value
+
+    @staticmethod
+    def choice(record, field, choices, default):
+        value = record.get(field)
+        if value in (None, ''):
+            return default
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            value = None
+        if value not in choices.values:
+            raise RowError(f'{field}: допустимые значения {choices.values}')
+        return value
+
+    @staticmethod
+    def date(record, field):
+        value = record.get(field)
+        if value in (None, ''):
+            return None
+        try:
+            parsed = parse_date(str(value))
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise RowError(f'{field}: ожидается дата ГГГГ-ММ-ДД')
+        return parsed
+
+    @staticmethod
+    def items(record, field):
+        value = record.get(field)
+        if value in (None, ''):
+            return []
+        if isinstance(value, str):
+            return [item for item in value.split(CSV_LIST_SEPARATOR) if item]
+        if isinstance(value, list):
+            return value
+        raise RowError(f'{field}: ожидается список')
+
+    @staticmethod
+    def records(record, field):
+        """Вложенные записи: список объектов"""
+        value = record.get(field)
+        if value in (None, ''):
+            return []
+        if not isinstance(value, list) or not all(
+                isinstance(item, dict) for item in value):
+            raise RowError(f'{field}: ожидается список объектов')
+        return value
+
+    def tag_key(self, user_id, title):
+        key = (user_id, str(title))
+        if len(key[1]) > Tag._meta.get_field('title').max_length:
+            raise RowError(f'tags: слишком длинное название {title!r}')
+        if key not in self.tags and key not in self.pending_tags:
+            self.pending_tags[key] = Tag(user_id=user_id, title=key[1])
+        return key
+
+    # Записи
+
+    def add_task(self, record):
+        owner_id = self.user_id(record.get('owner'), 'owner')
+        task = Task(
+            title=self.text(record, 'title', Task, required=True),
+            description=self.text(record, 'description', Task),
+            owner_id=owner_id,
+            workspace_id=self.workspace_id(record.get('workspace')),
+            due_date=self.date(record, 'due_date'),
+            deadline=self.date(record, 'deadline'),
+            status=self.choice(
+                record, 'status', Task.Status, Task.Status.ACTIVE),
+            priority=self.choice(
+                record, 'priority', Task.Priority, Task.Priority.LOW),
+        )
+        assignee_ids = list(dict.fromkeys(
+            self.user_id(username, 'assignees')
+            for username in self.items(record, 'assignees')))
+        subtasks = [self.subtask(item)
+                    for item in self.records(record, 'subtasks')]
+        comments = [self.comment(item)
+                    for item in self.records(record, 'comments')]
+        # Теги последними: tag_key запоминает новые теги для создания
+        tag_keys = list(dict.fromkeys(
+            self.tag_key(owner_id, title)
+            for title in self.items(record, 'tags')))
+
+        # Сброс только перед новой задачей: её подзадачи и комментарии из
+        # следующих строк CSV попадут в ту же пачку
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        entry = PendingTask(task, tag_keys, assignee_ids)
+        entry.subtasks.extend(subtasks)
+        entry.comments.extend(comments)
+        self.pending.append(entry)
+        if record.get('id') not in (None, ''):
+            self.pending_by_source[str(record['id'])] = entry
+
+    def parent(self, record):
+        entry = self.pending_by_source.get(str(record.get('task_id')))
+        if entry is None:
+            raise RowError(
+                'task_id: задача должна идти в файле перед своими '
+                'подзадачами и комментариями')
+        return entry
+
+    def subtask(self, record):
+        return Subtask(
+            title=self.text(record, 'title', Subtask, required=True),
+            description=self.text(record, 'description', Subtask),
+            status=self.choice(
+                record, 'status', Task.Status, Task.Status.ACTIVE),
+            assignee_id=self.user_id(
+                record.get('assignee') or record.get('assignees'),
+                'assignee', required=False),
+        )
+
+    def comment(self, record):
+        return Comment(
+            author_id=self.user_id(record.get('author'), 'author'),
+            text=self.text(record, 'text', Comment, required=True),
+        )
+
+    def add_subtask(self, record):
+        self.parent(record).subtasks.append(self.subtask(record))
+
+    def add_comment(self, record):
+        self.parent(record).comments.append(self.comment(record))
+
+    def add_tag(self, record):
+        user_id = self.user_id(
+            record.get('user') or record.get('owner'), 'user')
+        key = self.tag_key(
+            user_id, self.text(record, 'title', Tag, required=True))
+        if key in self.pending_tags:
+            self.pending_tags[key].description = self.text(
+                record, 'description', Tag)
+        else:
+            self.counts['skipped'] += 1
+
+    def add_membership(self, record):
+        workspace_id = self.workspace_id(
+            record.get('workspace'), required=True)
+        user_id = self.user_id(record.get('user'), 'user')
+        role = self.choice(record, 'role', WorkspaceMembership.Role,
+                           WorkspaceMembership.Role.MEMBER)
+        if (workspace_id, user_id) in self.memberships:
+            self.counts['skipped'] += 1
+            return
+        self.memberships.add((workspace_id, user_id))
+        self.pending_memberships.append(WorkspaceMembership(
+            workspace_id=workspace_id, user_id=user_id, role=role))
+
+    # Запись в базу
+
+    @transaction.atomic
+    def flush(self):
+        batch_size = self.batch_size
+        if self.pending_tags:
+            created = Tag.objects.bulk_create(
+                self.pending_tags.values(), batch_size=batch_size)
+            self.tags.update(
+                ((tag.user_id, tag.title), tag.pk) for tag in created)
+            self.counts['tags'] += len(created)
+            self.pending_tags = {}
+
+        # Членства раньше задач: grant_new_tasks выдаст доступ новой пачке,
+        # grant_membership — задачам из прошлых пачек и существовавшим ранее
+        if self.pending_memberships:
+            WorkspaceMembership.objects.bulk_create(
+                self.pending_memberships, batch_size=batch_size)
+            for membership in self.pending_memberships:
+                access.grant_membership(
+                    membership.user_id, membership.workspace_id)
+            counters.refresh_workspaces({
+                membership.workspace_id
+                for membership in self.pending_memberships})
+            roles.invalidate(
+                (membership.user_id, membership.workspace_id)
+                for membership in self.pending_memberships)
+            response_cache.invalidate_workspaces({
+                membership.workspace_id
+                for membership in self.pending_memberships})
+            response_cache.bump(
+                response_cache.TASK_RESOURCES,
+                [membership.user_id for membership in self.pending_memberships])
+            for membership in self.pending_memberships:
+                realtime.publish_membership(
+                    'created', membership.user_id, membership.workspace_id)
+            self.counts['memberships'] += len(self.pending_memberships)
+            self.pending_memberships = []
+
+        if not self.pending:
+            return
+        tasks = [entry.task for entry in self.pending]
+        for entry in self.pending:
+            entry.task.update_overdue_status()
+            entry.task.subtasks_count = len(entry.subtasks)
+            entry.task.comments_count = len(entry.comments)
+            entry.task.assignees_count = len(entry.assignee_ids)
+        Task.objects.bulk_create(tasks, batch_size=batch_size)
+        access.grant_new_tasks(tasks)
+
+        Task.tags.through.objects.bulk_create(
+            [
+                Task.tags.through(
+                    task_id=entry.task.pk, tag_id=self.tags[key])
+                for entry in self.pending for key in entry.tag_keys
+            ],
+            batch_size=batch_size
+        )
+        pairs = [
+            (entry.task.pk, user_id)
+            for entry in self.pending for user_id in entry.assignee_ids
+        ]
+        Task.assignees.through.objects.bulk_create(
+            [Task.assignees.through(task_id=task_id, user_id=user_id)
+             for task_id, user_id in pairs],
+            batch_size=batch_size
+        )
+        access.grant_assignee_pairs(pairs)
+
+        subtasks, comments = [], []
+        for entry in self.pending:
+            for subtask in entry.subtasks:
+                subtask.parent_task_id = entry.task.pk
+                subtasks.append(subtask)
+            for comment in entry.comments:
+                comment.task_id = entry.task.pk
+                comments.append(comment)
+        Subtask.objects.bulk_create(subtasks, batch_size=batch_size)
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+
+        search.index_tasks(tasks)
+        search.index_subtasks(subtasks)
+        search.index_comments(comments)
+        stats.invalidate(task.workspace_id for task in tasks)
+        response_cache.invalidate_tasks([task.pk for task in tasks])
+        realtime.publish_tasks('created', [task.pk for task in tasks])
+
+        self.counts['tasks'] += len(tasks)
+        self.counts['subtasks'] += len(subtasks)
+        self.counts['comments'] += len(comments)
+        self.pending = []
+        self.pending_by_source = {}
+        if self.on_progress is not None:
+            self.on_progress(self)
+
+    @property
+    def rate(self):
+        """Обработанных строк входа в секунду"""
+        elapsed = time.monotonic() - self.started
+        return self.counts['rows'] / elapsed if elapsed else 0.0
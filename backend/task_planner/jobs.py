@@ -0,0 +1,207 @@
+"""
+Периодические задачи: разметка просроченных задач, удаление устаревших
+надгробий синхронизации и задачи других приложений (сброс сводок
+уведомлений).
+
+Задачи регистрируются через register() и сами не запускаются. Отдельным
+процессом их запускает команда run_jobs; задачи, которые обслуживают
+память процесса-воркера, запускаются в воркерах по настройке
+BACKGROUND_JOBS — при первом запросе, а не при импорте точек входа.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from . import realtime, response_cache, stats, sync
+from .models import Task
+from .signals import tasks_marked_overdue
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob(threading.Thread):
+    """Фоновый поток, выполняющий функцию раз в interval секунд"""
+
+    def __init__(self, name, interval, func):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self.func = func
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.func()
+            except Exception:
+                logger.exception('Ошибка в периодической задаче %s', self.name)
+            finally:
+                close_old_connections()
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+
+
+class ProcessLock:
+    """
+    Блокировка на файле между процессами одного сервера: её держит один
+    процесс, пока он жив; после его завершения блокировку берёт другой
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self):
+        """Взять блокировку без ожидания; True, если она у этого процесса"""
+        if self.file is not None:
+            return True
+        if fcntl is None:
+            # Без flock (Windows) разметка идёт в каждом процессе
+            return True
+        file = open(self.path, 'a')
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+        self.file = file
+        return True
+
+
+class Registration:
+    """Зарегистрированная периодическая задача, см. register()"""
+
+    def __init__(self, func, interval, setup=None, worker_only=False):
+        self.func = func
+        self.interval = interval
+        self.setup = setup
+        self.worker_only = worker_only
+
+
+_registry = {}
+_jobs = {}
+_lock = threading.Lock()
+
+
+def register(name, func, interval, setup=None, worker_only=False):
+    """
+    Зарегистрировать периодическую задачу name. interval — функция без
+    аргументов, возвращающая период в секундах (None или 0 отключают
+    задачу); setup вызывается в процессе один раз перед стартом потока.
+    worker_only — задача работает с памятью процесса-воркера, и запускать
+    её в run_jobs бессмысленно
+    """
+    _registry[name] = Registration(func, interval, setup, worker_only)
+
+
+def registered(worker_only=None):
+    """Имена зарегистрированных задач, при worker_only — только такие"""
+    return [
+        name for name, registration in _registry.items()
+        if worker_only is None or registration.worker_only == worker_only
+    ]
+
+
+def start(name):
+    """
+    Запустить поток задачи name, если он ещё не запущен в этом процессе;
+    None, если задача отключена настройками
+    """
+    registration = _registry[name]
+    interval = registration.interval()
+    if not interval:
+        return None
+    with _lock:
+        job = _jobs.get(name)
+        if job is None or not job.is_alive():
+            if registration.setup is not None and name not in _jobs:
+                registration.setup()
+            job = PeriodicJob(name, interval, registration.func)
+            job.start()
+            _jobs[name] = job
+    return job
+
+
+def start_configured(**kwargs):
+    """
+    Запустить в процессе-воркере задачи из BACKGROUND_JOBS. Подключена к
+    request_started: команды управления и импорт wsgi/asgi потоков не
+    запускают
+    """
+    request_started.disconnect(start_configured)
+    for name in getattr(settings, 'BACKGROUND_JOBS', ()):
+        if name not in _registry:
+            logger.error('Неизвестная периодическая задача %s', name)
+            continue
+        start(name)
+
+
+def mark_overdue_tasks():
+    """
+    Пометить просроченные задачи и разослать события и уведомления только
+    по действительно изменённым строкам. Чтение и UPDATE идут в одной
+    транзакции: параллельная разметка не уведомит о задаче второй раз, а
+    завершённая между чтением и UPDATE задача не попадёт в рассылку.
+    """
+    now = timezone.now()
+    today = now.date()
+    with transaction.atomic():
+        task_ids = list(Task.objects.select_for_update().filter(
+            status=Task.Status.ACTIVE, due_date__lt=today
+        ).values_list('id', flat=True))
+        if not task_ids:
+            return 0
+        tasks = Task.objects.filter(pk__in=task_ids)
+        updated = tasks.mark_overdue(today, now)
+        if updated != len(task_ids):
+            # Без блокировки строк часть задач могли изменить после чтения;
+            # изменённые этим UPDATE узнаются по метке updated_at
+            task_ids = list(tasks.filter(
+                status=Task.Status.OVERDUE, updated_at=now
+            ).values_list('id', flat=True))
+            tasks = Task.objects.filter(pk__in=task_ids)
+        workspace_ids = list(tasks.exclude(workspace=None).values_list(
+            'workspace_id', flat=True).distinct())
+        stats.invalidate(workspace_ids)
+        response_cache.bump(
+            response_cache.TASK_RESOURCES,
+            response_cache.task_user_ids(task_ids))
+        realtime.publish_tasks('updated', task_ids)
+        tasks_marked_overdue.send(sender=Task, task_ids=task_ids)
+    if updated:
+        logger.info('Помечено просроченными задач: %s', updated)
+    return updated
+
+
+def _sweep_interval():
+    return getattr(settings, 'TASK_OVERDUE_SWEEP_INTERVAL', None)
+
+
+_sweep_lock = None
+
+
+def sweep():
+    """
+    Разметка просроченных задач и удаление устаревших надгробий. Размечает
+    только процесс, взявший блокировку TASK_OVERDUE_SWEEP_LOCK; остальные
+    проверяют её на каждом шаге и подхватывают разметку, если держатель
+    завершился
+    """
+    global _sweep_lock
+    if _sweep_lock is None:
+        _sweep_lock = ProcessLock(settings.TASK_OVERDUE_SWEEP_LOCK)
+    if _sweep_lock.acquire():
+        mark_overdue_tasks()
+        sync.prune_tombstones()
+
+
+register('overdue', sweep, _sweep_interval)
@@ -0,0 +1,127 @@
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from task_planner.models import Tag, Task, Subtask, Comment
+from task_planner.rows import RowReader
+from task_planner.serializers import (
+    TaskSerializer, SubtaskSerializer, CommentSerializer
+)
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость сериализации списков через ModelSerializer '
+        'и через RowReader. Данные создаются в транзакции и откатываются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int, default=[100, 1000, 10000],
+            help='Количество строк в списке')
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Число повторов, берётся лучшее время')
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        with transaction.atomic():
+            querysets = self.create_data(sizes[-1])
+            self.stdout.write(
+                f'{"список":<10}{"строк":>8}{"DRF, мс":>12}'
+                f'{"rows, мс":>12}{"ускорение":>12}')
+            for name, serializer_class, queryset in querysets:
+                for size in sizes:
+                    self.compare(name, serializer_class, queryset, size,
+                                 options['repeat'])
+            transaction.set_rollback(True)
+
+    def create_data(self, count):
+        owner = User.objects.create_user('benchmark-owner')
+        users = [owner] + [
+            User.objects.create_user(f'benchmark-user-{i}') for i in range(4)]
+        tags = Tag.objects.bulk_create(
+            [Tag(title=f'benchmark-{i}', user=owner) for i in range(5)])
+        today = date.today()
+        tasks = Task.objects.bulk_create(
+            [
+                Task(title=f'Задача {i}', description='Описание ' * 10,
+                     owner=owner, priority=i % 3 + 1,
+                     due_date=today + timedelta(days=i % 30 - 10),
+                     subtasks_count=1, comments_count=1, assignees_count=2)
+                for i in range(count)
+            ],
+            batch_size=1000
+        )
+        Task.tags.through.objects.bulk_create(
+            [
+                Task.tags.through(task_id=task.pk, tag_id=tag.pk)
+                for i, task in enumerate(tasks)
+                for tag in (tags[i % 5], tags[(i + 1) % 5])
+            ],
+            batch_size=1000
+        )
+        Task.assignees.through.objects.bulk_create(
+            [
+                Task.assignees.through(task_id=task.pk, user_id=user.pk)
+                for i, task in enumerate(tasks)
+                for user in (users[i % 5], users[(i + 2) % 5])
+            ],
+            batch_size=1000
+        )
+        Subtask.objects.bulk_create(
+            [
+                Subtask(title=f'Подзадача {i}', parent_task=task,
+                        assignee=users[i % 5])
+                for i, task in enumerate(tasks)
+            ],
+            batch_size=1000
+        )
+        Comment.objects.bulk_create(
+            [
+                Comment(task=task, author=users[i % 5], text='Комментарий')
+                for i, task in enumerate(tasks)
+            ],
+            batch_size=1000
+        )
+        task_ids = Task.objects.filter(owner=owner).values('id')
+        return [
+            ('tasks', TaskSerializer,
+             Task.objects.filter(owner=owner).with_read_plan()),
+            ('subtasks', SubtaskSerializer,
+             Subtask.objects.filter(parent_task_id__in=task_ids)
+             .select_related('assignee')),
+            ('comments', CommentSerializer,
+             Comment.objects.filter(task_id__in=task_ids)
+             .select_related('author')),
+        ]
+
+    def compare(self, name, serializer_class, queryset, size, repeat):
+        def drf():
+            return serializer_class(queryset[:size], many=True).data
+
+        def rows():
+            reader = RowReader(serializer_class())
+            return reader.render(reader.values(queryset)[:size])
+
+        drf_time, drf_data = self.measure(drf, repeat)
+        rows_time, rows_data = self.measure(rows, repeat)
+        renderer = JSONRenderer()
+        if renderer.render(drf_data) != renderer.render(rows_data):
+            self.stderr.write(f'{name}: ответы двух путей различаются')
+        self.stdout.write(
+            f'{name:<10}{size:>8}{drf_time * 1000:>12.1f}'
+            f'{rows_time * 1000:>12.1f}{drf_time / rows_time:>11.1f}x')
+
+    @staticmethod
+    def measure(function, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            started = perf_counter()
+            result = function()
+            elapsed = perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
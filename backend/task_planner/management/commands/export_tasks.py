@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from task_planner import export
+from task_planner.models import Task, TaskAccess
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка задач с подзадачами и комментариями '
+        'в NDJSON или CSV, с необязательным сжатием gzip'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=list(export.FORMATS), default='ndjson')
+        parser.add_argument(
+            '--workspace', type=int, help='Только задачи пространства')
+        parser.add_argument(
+            '--user', help='Только задачи, видимые пользователю (username)')
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать вывод в gzip')
+        parser.add_argument(
+            '--output', default='-', help='Файл вывода, по умолчанию stdout')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.order_by('id')
+        subtask_task_ids = None
+        if options['workspace'] is not None:
+            tasks = tasks.filter(workspace_id=options['workspace'])
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(
+                    f'Пользователь {options["user"]} не найден')
+            tasks = tasks.visible_to(user)
+            subtask_task_ids = TaskAccess.task_ids_for(
+                user,
+                reasons=[TaskAccess.Reason.OWNER, TaskAccess.Reason.ASSIGNEE]
+            )
+
+        chunks = export.export_tasks(
+            tasks, options['format'], options['gzip'], subtask_task_ids,
+            options['batch_size'])
+        if options['output'] == '-':
+            self.write_chunks(sys.stdout.buffer, chunks)
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write_chunks(output, chunks)
+            self.stderr.write(self.style.SUCCESS(
+                f'Выгрузка записана в {options["output"]}'))
+
+    @staticmethod
+    def write_chunks(output, chunks):
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,81 @@
+import gzip
+import io
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from task_planner.importer import Importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Массовый импорт задач, тегов и членств из NDJSON или CSV '
+        '(в том числе .gz) пачками через bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+',
+            help='Файлы .ndjson, .jsonl или .csv, можно .gz; - — stdin')
+        parser.add_argument(
+            '--format', choices=['ndjson', 'csv'],
+            help='Формат входа, по умолчанию — по расширению файла')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Задач в одной пачке bulk_create')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        importer = Importer(options['batch_size'], self.report_progress)
+        for path in options['paths']:
+            file_format = options['format'] or self.detect_format(path)
+            with self.open(path) as stream:
+                importer.import_stream(stream, file_format)
+
+        counts = importer.counts
+        for error in importer.errors:
+            self.stderr.write(error)
+        if counts['errors'] > len(importer.errors):
+            self.stderr.write(
+                f'… и ещё {counts["errors"] - len(importer.errors)} ошибок')
+        self.stdout.write(self.style.SUCCESS(
+            f'Задач: {counts["tasks"]}, подзадач: {counts["subtasks"]}, '
+            f'комментариев: {counts["comments"]}, тегов: {counts["tags"]}, '
+            f'членств: {counts["memberships"]}; пропущено: '
+            f'{counts["skipped"]}, ошибок: {counts["errors"]}; '
+            f'{counts["rows"]} строк, {importer.rate:.0f} строк/с'))
+
+    progress_interval = 1.0
+    last_report = 0.0
+
+    def report_progress(self, importer):
+        now = time.monotonic()
+        if now - self.last_report < self.progress_interval:
+            return
+        self.last_report = now
+        self.stderr.write(
+            f'Импортировано задач: {importer.counts["tasks"]} '
+            f'({importer.rate:.0f} строк/с)')
+
+    @staticmethod
+    def detect_format(path):
+        name = path[:-3] if path.endswith('.gz') else path
+        if name.endswith('.csv'):
+            return 'csv'
+        if name.endswith(('.ndjson', '.jsonl', '.json')) or path == '-':
+            return 'ndjson'
+        raise CommandError(
+            f'Не удалось определить формат {path}, укажите --format')
+
+    @staticmethod
+    def open(path):
+        if path == '-':
+            return io.TextIOWrapper(
+                sys.stdin.buffer, encoding='utf-8', newline='')
+        try:
+            if path.endswith('.gz'):
+                return gzip.open(path, 'rt', encoding='utf-8', newline='')
+            return open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(f'Не удалось открыть {path}: {exc}')
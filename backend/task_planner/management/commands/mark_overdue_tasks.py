@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from task_planner.jobs import mark_overdue_tasks
+
+
+class Command(BaseCommand):
+    help = 'Помечает просроченными активные задачи с прошедшим сроком выполнения'
+
+    def handle(self, *args, **options):
+        updated = mark_overdue_tasks()
+        self.stdout.write(self.style.SUCCESS(
+            f'Помечено просроченными: {updated}'))
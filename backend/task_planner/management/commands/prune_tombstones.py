@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from task_planner import sync
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет записи об удалении старше SYNC_TOMBSTONE_RETENTION_DAYS; '
+        'клиенты с более старым курсором получат полную синхронизацию'
+    )
+
+    def handle(self, *args, **options):
+        deleted = sync.prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей об удалении: {deleted}'))
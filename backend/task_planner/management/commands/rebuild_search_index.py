@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from task_planner import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс FTS5 задач, подзадач и комментариев'
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            self.stderr.write('Полнотекстовый поиск доступен только на SQLite')
+            return
+        rows = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковый индекс пересобран: {rows} документов'))
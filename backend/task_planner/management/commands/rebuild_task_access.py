@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from task_planner.access import rebuild_task_access
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает денормализованный индекс доступа к задачам (TaskAccess)'
+
+    def handle(self, *args, **options):
+        rows = rebuild_task_access()
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс доступа пересобран: {rows} записей'))
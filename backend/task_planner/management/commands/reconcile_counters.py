@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from notifications import fanout
+from task_planner import counters
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит и исправляет расхождения счётчиков подзадач, комментариев, '
+        'исполнителей задач, участников рабочих пространств и '
+        'непрочитанных уведомлений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, не исправляя их')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            task_ids = list(counters.drifted_tasks())
+            workspace_ids = list(counters.drifted_workspaces())
+            user_ids = list(fanout.drifted_unread())
+            if not options['dry_run']:
+                for start in range(0, len(task_ids), BATCH_SIZE):
+                    counters.refresh_tasks(
+                        task_ids[start:start + BATCH_SIZE])
+                for start in range(0, len(workspace_ids), BATCH_SIZE):
+                    counters.refresh_workspaces(
+                        workspace_ids[start:start + BATCH_SIZE])
+                for start in range(0, len(user_ids), BATCH_SIZE):
+                    fanout.refresh_unread(user_ids[start:start + BATCH_SIZE])
+
+        for label, ids in (('задач', task_ids), ('пространств', workspace_ids),
+                           ('счётчиков уведомлений', user_ids)):
+            message = f'Расхождений у {label}: {len(ids)}'
+            if ids:
+                sample = ', '.join(str(pk) for pk in ids[:20])
+                message += f' (id: {sample}{", ..." if len(ids) > 20 else ""})'
+            self.stdout.write(message)
+        if options['dry_run']:
+            return
+        self.stdout.write(self.style.SUCCESS('Счётчики исправлены'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from task_planner import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает периодические задачи (разметка просроченных задач, '
+        'удаление устаревших надгробий) в этом процессе до остановки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'jobs', nargs='*',
+            help='Имена задач; по умолчанию все, кроме задач воркеров')
+
+    def handle(self, *args, **options):
+        names = options['jobs'] or jobs.registered(worker_only=False)
+        worker_only = set(jobs.registered(worker_only=True))
+        for name in names:
+            if name in worker_only:
+                raise CommandError(
+                    f'Задача {name} работает в памяти воркера: включите её '
+                    'настройкой BACKGROUND_JOBS')
+            if name not in jobs.registered():
+                raise CommandError(f'Неизвестная задача: {name}')
+
+        started = [job for job in map(jobs.start, names) if job is not None]
+        if not started:
+            raise CommandError('Все выбранные задачи отключены настройками')
+        self.stdout.write(', '.join(
+            f'{job.name} (раз в {job.interval} с)' for job in started))
+        try:
+            while any(job.is_alive() for job in started):
+                for job in started:
+                    job.join(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for job in started:
+                job.stop()
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_task_access(apps, schema_editor):
+    Task = apps.get_model('task_planner', 'Task')
+    TaskAccess = apps.get_model('task_planner', 'TaskAccess')
+    OWNER, ASSIGNEE, MEMBER = 1, 2, 3
+
+    rows = [
+        TaskAccess(task_id=task_id, user_id=user_id, reason=OWNER)
+        for task_id, user_id in Task.objects.values_list('id', 'owner_id')
+    ]
+    rows += [
+        TaskAccess(task_id=task_id, user_id=user_id, reason=ASSIGNEE)
+        for task_id, user_id in Task.assignees.through.objects.values_list(
+            'task_id', 'user_id')
+    ]
+    rows += [
+        TaskAccess(task_id=task_id, user_id=user_id, reason=MEMBER)
+        for task_id, user_id in Task.objects.filter(
+            workspace__memberships__isnull=False
+        ).values_list('id', 'workspace__memberships__user_id')
+    ]
+    TaskAccess.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_planner', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.IntegerField(choices=[(1, 'Владелец'), (2, 'Исполнитель'), (3, 'Участник рабочего пространства')], verbose_name='основание')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='task_planner.task', verbose_name='задача')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_access', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'доступ к задаче',
+                'verbose_name_plural': 'доступы к задачам',
+                'unique_together': {('user', 'task', 'reason')},
+            },
+        ),
+        migrations.RunPython(populate_task_access, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_planner', '0002_task_access'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['-created_at', 'id'], 'verbose_name': 'комментарий', 'verbose_name_plural': 'комментарии'},
+        ),
+        migrations.AlterModelOptions(
+            name='subtask',
+            options={'ordering': ['created_at', 'id'], 'verbose_name': 'подзадача', 'verbose_name_plural': 'подзадачи'},
+        ),
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['-priority', 'due_date', 'id'], 'verbose_name': 'задача', 'verbose_name_plural': 'задачи'},
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_planner', '0005_tag_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subtask',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='дата обновления'),
+        ),
+        migrations.AddField(
+            model_name='taskaccess',
+            name='granted_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='дата выдачи'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'Задача'), ('subtask', 'Подзадача'), ('comment', 'Комментарий'), ('tag', 'Тег')], max_length=10, verbose_name='тип объекта')),
+                ('object_id', models.BigIntegerField(verbose_name='id объекта')),
+                ('task_id', models.BigIntegerField(blank=True, null=True, verbose_name='id задачи')),
+                ('workspace_id', models.BigIntegerField(blank=True, null=True, verbose_name='id рабочего пространства')),
+                ('user_id', models.BigIntegerField(blank=True, null=True, verbose_name='id пользователя')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='дата удаления')),
+            ],
+            options={
+                'verbose_name': 'запись об удалении',
+                'verbose_name_plural': 'записи об удалении',
+                'indexes': [models.Index(fields=['user_id', 'id'], name='tombstone_user_idx'), models.Index(fields=['workspace_id', 'id'], name='tombstone_workspace_idx'), models.Index(fields=['task_id', 'id'], name='tombstone_task_idx')],
+            },
+        ),
+    ]
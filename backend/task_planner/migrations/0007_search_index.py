@@ -0,0 +1,49 @@
+from django.db import migrations
+
+TABLE = 'task_planner_search'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+        'kind UNINDEXED, task_id UNINDEXED, title, body, tags, '
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(f'''
+        INSERT INTO {TABLE} (rowid, kind, task_id, title, body, tags)
+        SELECT t.id << 2 | 1, 'task', t.id, t.title, t.description,
+               COALESCE((SELECT group_concat(g.title, ' ')
+                         FROM task_planner_task_tags tt
+                         JOIN task_planner_tag g ON g.id = tt.tag_id
+                         WHERE tt.task_id = t.id), '')
+        FROM task_planner_task t
+    ''')
+    schema_editor.execute(f'''
+        INSERT INTO {TABLE} (rowid, kind, task_id, title, body, tags)
+        SELECT id << 2 | 2, 'subtask', parent_task_id, title, description, ''
+        FROM task_planner_subtask
+    ''')
+    schema_editor.execute(f'''
+        INSERT INTO {TABLE} (rowid, kind, task_id, title, body, tags)
+        SELECT id << 2 | 3, 'comment', task_id, '', text, ''
+        FROM task_planner_comment
+    ''')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_planner', '0006_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field):
+    counts = model.objects.filter(**{field: OuterRef('pk')}).order_by(
+    ).values(field).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+
+def populate_counters(apps, schema_editor):
+    Task = apps.get_model('task_planner', 'Task')
+    Subtask = apps.get_model('task_planner', 'Subtask')
+    Comment = apps.get_model('task_planner', 'Comment')
+    Workspace = apps.get_model('task_planner', 'Workspace')
+    WorkspaceMembership = apps.get_model('task_planner', 'WorkspaceMembership')
+
+    Task.objects.update(
+        subtasks_count=_count(Subtask, 'parent_task'),
+        comments_count=_count(Comment, 'task'),
+        assignees_count=_count(Task.assignees.through, 'task'),
+    )
+    Workspace.objects.update(
+        members_count=_count(WorkspaceMembership, 'workspace'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_planner', '0008_task_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='assignees_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='исполнителей'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='comments_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='комментариев'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtasks_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='подзадач'),
+        ),
+        migrations.AddField(
+            model_name='workspace',
+            name='members_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='участников'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
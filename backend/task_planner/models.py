@@ -1,9 +1,29 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import BooleanField, Case, Prefetch, Q, Value, When
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from users.models import User
 
 
+class CounterFieldsMixin:
+    """
+    Колонки-счётчики меняются только через F() (counters.py). Обычное
+    сохранение загруженного объекта пишет все поля, кроме них, чтобы
+    устаревшие значения в памяти не затирали приращения
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
 class Tag(models.Model):
     """Модель для пользовательских тегов/меток"""
     title = models.CharField('название', max_length=50)
@@ -14,6 +34,7 @@ class Tag(models.Model):
         related_name='tags',
         verbose_name='пользователь'
     )
+    updated_at = models.DateTimeField('дата обновления', auto_now=True)
 
     class Meta:
         verbose_name = 'тег'
@@ -24,8 +45,10 @@ class Tag(models.Model):
         return self.title
 
 
-class Workspace(models.Model):
+class Workspace(CounterFieldsMixin, models.Model):
     """Модель рабочего пространства"""
+    counter_fields = ('members_count',)
+
     title = models.CharField('название', max_length=100)
     description = models.TextField('описание', blank=True)
     owner = models.ForeignKey(
@@ -36,6 +59,9 @@ class Workspace(models.Model):
     )
     created_at = models.DateTimeField('дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('дата обновления', auto_now=True)
+    # Счётчик поддерживается сигналами членств (counters.py)
+    members_count = models.IntegerField(
+        'участников', default=0, editable=False)
 
     class Meta:
         verbose_name = 'рабочее пространство'
@@ -77,13 +103,86 @@ class WorkspaceMembership(models.Model):
         verbose_name = 'членство в рабочем пространстве'
         verbose_name_plural = 'членства в рабочем пространстве'
         unique_together = ('user', 'workspace')
+        indexes = [
+            models.Index(
+                fields=['workspace', 'user', 'role'],
+                name='membership_ws_user_role_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} в {self.workspace.title} ({self.get_role_display()})"
 
+    def save(self, *args, **kwargs):
+        # Счётчик родителя меняется в post_save, в той же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class TaskQuerySet(models.QuerySet):
+    def visible_to(self, user, reasons=None):
+        """Задачи, доступные пользователю, по индексу TaskAccess"""
+        return self.filter(id__in=TaskAccess.task_ids_for(user, reasons))
+
+    def with_overdue(self):
+        """
+        Аннотировать overdue_now: просрочена ли задача на сегодня, даже если
+        периодическая разметка ещё не успела сменить её статус
+        """
+        today = timezone.now().date()
+        return self.annotate(overdue_now=Case(
+            When(status=Task.Status.OVERDUE, then=Value(True)),
+            When(status=Task.Status.ACTIVE, due_date__lt=today,
+                 then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        ))
+
+    def mark_overdue(self, today=None, now=None):
+        """
+        Пометить просроченными активные задачи одним UPDATE; now — метка
+        updated_at, по которой можно найти изменённые строки
+        """
+        today = today or timezone.now().date()
+        return self.filter(
+            status=Task.Status.ACTIVE,
+            due_date__lt=today
+        ).update(status=Task.Status.OVERDUE, updated_at=now or timezone.now())
+
+    def with_read_plan(self, fields=None, nested=None):
+        """
+        План запроса для TaskSerializer: без N+1 на каждую строку.
+
+        fields — отдаваемые поля, nested — раскрытые вложенными объектами
+        (None — все). Для неотдаваемых полей соединения, предвыборки и
+        аннотации не делаются; связи, отдаваемые как id, выбирают только id.
+        Количества подзадач и комментариев — колонки-счётчики (counters.py).
+        """
+        def rendered(name):
+            return fields is None or name in fields
 
-class Task(models.Model):
+        def expanded(name):
+            return rendered(name) and (nested is None or name in nested)
+
+        queryset = self
+        if expanded('owner'):
+            queryset = queryset.select_related('owner')
+        for name in ('assignees', 'tags'):
+            if expanded(name):
+                queryset = queryset.prefetch_related(name)
+            elif rendered(name):
+                model = Task._meta.get_field(name).related_model
+                queryset = queryset.prefetch_related(
+                    Prefetch(name, queryset=model.objects.only('id')))
+        if rendered('is_overdue'):
+            queryset = queryset.with_overdue()
+        return queryset
+
+
+class Task(CounterFieldsMixin, models.Model):
     """Основная модель задачи"""
+    counter_fields = ('subtasks_count', 'comments_count', 'assignees_count')
+
     class Status(models.IntegerChoices):
         ACTIVE = 1, 'Активна'
         COMPLETED = 2, 'Завершена'
@@ -137,22 +236,74 @@ class Task(models.Model):
         related_name='assigned_tasks',
         verbose_name='исполнители'
     )
+    # Счётчики поддерживаются сигналами подзадач, комментариев
+    # и исполнителей (counters.py)
+    subtasks_count = models.IntegerField(
+        'подзадач', default=0, editable=False)
+    comments_count = models.IntegerField(
+        'комментариев', default=0, editable=False)
+    assignees_count = models.IntegerField(
+        'исполнителей', default=0, editable=False)
+
+    objects = TaskQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'задача'
         verbose_name_plural = 'задачи'
-        ordering = ['-priority', 'due_date']
+        ordering = ['-priority', 'due_date', 'id']
+        indexes = [
+            models.Index(
+                fields=['-priority', 'due_date', 'id'],
+                name='task_ordering_idx'
+            ),
+            models.Index(
+                fields=['-priority', 'due_date', 'id'],
+                condition=Q(workspace__isnull=True),
+                name='task_personal_idx'
+            ),
+            models.Index(
+                fields=['workspace', '-priority', 'due_date', 'id'],
+                name='task_workspace_ordering_idx'
+            ),
+            models.Index(
+                fields=['status', 'due_date'],
+                name='task_status_due_idx'
+            ),
+            models.Index(fields=['due_date', 'id'], name='task_due_idx'),
+            models.Index(
+                fields=['deadline', 'id'],
+                name='task_deadline_idx'
+            ),
+            models.Index(
+                fields=['created_at', 'id'],
+                name='task_created_idx'
+            ),
+            models.Index(
+                fields=['updated_at', 'id'],
+                name='task_updated_idx'
+            ),
+            # Незавершённые задачи со сроком; 2 — Status.COMPLETED
+            models.Index(
+                fields=['due_date'],
+                condition=Q(due_date__isnull=False) & ~Q(status=2),
+                name='task_open_due_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
         """Автоматически обновляем статус на 'Просрочена' при сохранении"""
+        self.update_overdue_status()
+        super().save(*args, **kwargs)
+
+    def update_overdue_status(self):
+        """Пометить задачу просроченной, если срок выполнения прошёл"""
         if (self.due_date and
             timezone.now().date() > self.due_date and
                 self.status != self.Status.COMPLETED):
             self.status = self.Status.OVERDUE
-        super().save(*args, **kwargs)
 
     @property
     def is_overdue(self):
@@ -162,7 +313,60 @@ class Task(models.Model):
     @property
     def is_personal(self):
         """Проверка, является ли задача личной (не в workspace)"""
-        return self.workspace is None
+        return self.workspace_id is None
+
+
+class TaskAccess(models.Model):
+    """Денормализованный индекс доступа пользователей к задачам"""
+    class Reason(models.IntegerChoices):
+        OWNER = 1, 'Владелец'
+        ASSIGNEE = 2, 'Исполнитель'
+        MEMBER = 3, 'Участник рабочего пространства'
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='task_access',
+        verbose_name='пользователь'
+    )
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='access',
+        verbose_name='задача'
+    )
+    reason = models.IntegerField('основание', choices=Reason.choices)
+    granted_at = models.DateTimeField('дата выдачи', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'доступ к задаче'
+        verbose_name_plural = 'доступы к задачам'
+        unique_together = ('user', 'task', 'reason')
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.task_id} ({self.get_reason_display()})"
+
+    @classmethod
+    def task_ids_for(cls, user, reasons=None):
+        """Подзапрос id задач, доступных пользователю"""
+        rows = cls.objects.filter(user=user)
+        if reasons is not None:
+            rows = rows.filter(reason__in=reasons)
+        return rows.values('task_id')
+
+    @classmethod
+    def audience(cls, task_ids):
+        """
+        Кто видит задачи, одним запросом:
+        {id задачи: (id пространства, [(id пользователя, основание)])}
+        """
+        result = {}
+        rows = cls.objects.filter(task_id__in=task_ids).values_list(
+            'task_id', 'task__workspace_id', 'user_id', 'reason')
+        for task_id, workspace_id, user_id, reason in rows:
+            result.setdefault(task_id, (workspace_id, []))[1].append(
+                (user_id, reason))
+        return result
 
 
 class Subtask(models.Model):
@@ -175,6 +379,7 @@ class Subtask(models.Model):
         default=Task.Status.ACTIVE
     )
     created_at = models.DateTimeField('дата создания', auto_now_add=True)
+    updated_at = models.DateTimeField('дата обновления', auto_now=True)
     parent_task = models.ForeignKey(
         Task,
         on_delete=models.CASCADE,
@@ -193,11 +398,26 @@ class Subtask(models.Model):
     class Meta:
         verbose_name = 'подзадача'
         verbose_name_plural = 'подзадачи'
-        ordering = ['created_at']
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                name='subtask_ordering_idx'
+            ),
+            models.Index(
+                fields=['parent_task', 'created_at'],
+                name='subtask_task_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} (подзадача {self.parent_task.title})"
 
+    def save(self, *args, **kwargs):
+        # Счётчик родителя меняется в post_save, в той же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Модель комментария к задаче"""
@@ -220,7 +440,58 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
-        ordering = ['-created_at']
+        ordering = ['-created_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['-created_at', 'id'],
+                name='comment_ordering_idx'
+            ),
+            models.Index(
+                fields=['task', '-created_at'],
+                name='comment_task_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"Комментарий от {self.author.username} к задаче '{self.task.title}'"
+
+    def save(self, *args, **kwargs):
+        # Счётчик родителя меняется в post_save, в той же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """
+    Журнал удалений для дельта-синхронизации: удалённые объекты и задачи,
+    к которым пользователь потерял доступ. Ссылки хранятся числами, так как
+    сами объекты уже удалены.
+    """
+    class Kind(models.TextChoices):
+        TASK = 'task', 'Задача'
+        SUBTASK = 'subtask', 'Подзадача'
+        COMMENT = 'comment', 'Комментарий'
+        TAG = 'tag', 'Тег'
+
+    kind = models.CharField('тип объекта', max_length=10, choices=Kind.choices)
+    object_id = models.BigIntegerField('id объекта')
+    task_id = models.BigIntegerField('id задачи', null=True, blank=True)
+    workspace_id = models.BigIntegerField(
+        'id рабочего пространства', null=True, blank=True)
+    user_id = models.BigIntegerField('id пользователя', null=True, blank=True)
+    deleted_at = models.DateTimeField('дата удаления', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'запись об удалении'
+        verbose_name_plural = 'записи об удалении'
+        indexes = [
+            models.Index(fields=['user_id', 'id'],
+                         name='tombstone_user_idx'),
+            models.Index(fields=['workspace_id', 'id'],
+                         name='tombstone_workspace_idx'),
+            models.Index(fields=['task_id', 'id'],
+                         name='tombstone_task_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}"
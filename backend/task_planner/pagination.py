@@ -0,0 +1,176 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (keyset): страница N стоит столько же, сколько первая.
+
+    Порядок берётся из order_by запроса или Meta.ordering модели и всегда
+    дополняется первичным ключом, чтобы позиция курсора была однозначной.
+    Курсор хранит значения полей сортировки последней строки страницы.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() для асинхронных представлений"""
+        queryset = self.page_queryset(queryset, request)
+        return self.set_page([row async for row in queryset.aiterator()])
+
+    def page_queryset(self, queryset, request):
+        """Запрос страницы: строки после курсора и одна лишняя"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = self.get_ordering(queryset)
+        nulls_largest = connections[queryset.db].features.nulls_order_largest
+
+        values, self.reverse = self.decode_cursor(request)
+        self.has_cursor = values is not None
+
+        queryset = queryset.order_by(*[
+            ('-' if desc != self.reverse else '') + field.attname
+            for field, desc in self.fields
+        ])
+        if values is not None:
+            queryset = queryset.filter(
+                self.after(values, self.reverse, nulls_largest))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = self.has_cursor, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {
+                    'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """Список (поле модели, по убыванию) с первичным ключом в конце"""
+        opts = queryset.model._meta
+        ordering = queryset.query.order_by or opts.ordering
+        fields = []
+        for name in ordering:
+            if not isinstance(name, str):
+                raise ImproperlyConfigured(
+                    'KeysetPagination поддерживает только строковую сортировку')
+            desc = name.startswith('-')
+            name = name.lstrip('-')
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+            fields.append((field, desc))
+        if not any(field.primary_key for field, desc in fields):
+            fields.append((opts.pk, False))
+        return fields
+
+    def after(self, values, reverse, nulls_largest):
+        """Условие «строка идёт после курсора» для составного ключа"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, desc), value in zip(self.fields, values):
+            desc = desc != reverse
+            name = field.attname
+            nulls_last = nulls_largest != desc
+            if value is None:
+                # После NULL идут либо только непустые значения, либо ничего
+                step = (Q(pk__in=[]) if nulls_last
+                        else Q(**{f'{name}__isnull': False}))
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                lookup = 'lt' if desc else 'gt'
+                step = Q(**{f'{name}__{lookup}': value})
+                if nulls_last and field.null:
+                    step |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & step
+            equal &= same
+        return condition
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field, desc in self.fields:
+            if isinstance(row, dict):
+                value = row[field.attname]
+            else:
+                value = getattr(row, field.attname)
+            if isinstance(value, date):
+                value = value.isoformat()
+            values.append(value)
+        payload = json.dumps({'v': values, 'r': int(reverse)})
+        cursor = urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(cursor.encode()))
+            values = [
+                None if value is None else field.to_python(value)
+                for (field, desc), value in zip(self.fields, payload['v'])
+            ]
+            if len(values) != len(self.fields):
+                raise ValueError(cursor)
+            return values, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
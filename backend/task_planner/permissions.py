@@ -0,0 +1,32 @@
+from rest_framework import permissions
+from . import roles
+from .models import Workspace
+
+
+class WorkspaceRolePermission(permissions.BasePermission):
+    """
+    Доступ к объекту по роли автора запроса в его рабочем пространстве.
+    Объект — само пространство или модель с полем workspace_id.
+    """
+    required_role = roles.Role.MEMBER
+    message = 'Нет доступа к рабочему пространству'
+
+    def has_object_permission(self, request, view, obj):
+        workspace_id = obj.pk if isinstance(obj, Workspace) else obj.workspace_id
+        if workspace_id is None:
+            return False
+        return roles.has_role(request, workspace_id, self.required_role)
+
+
+class IsWorkspaceMember(WorkspaceRolePermission):
+    pass
+
+
+class IsWorkspaceAdmin(WorkspaceRolePermission):
+    required_role = roles.Role.ADMIN
+    message = 'Недостаточно прав'
+
+
+class IsWorkspaceOwner(WorkspaceRolePermission):
+    required_role = roles.Role.OWNER
+    message = 'Только владелец может выполнить это действие'
@@ -0,0 +1,325 @@
+"""
+Рассылка изменений клиентам через Server-Sent Events (events/).
+
+Сигналы моделей (signals.py) и пакетные пути публикуют компактные события
+после фиксации транзакции — тип и id, без данных объекта: клиент сам
+перечитывает то, что у него открыто. Каналы: workspace:<id> для всего, что
+видят участники пространства, и user:<id> для владельца и исполнителей
+задачи (личные задачи, исполнители не из пространства, подзадачи).
+Потерявший доступ к задаче пользователь получает task.revoked в свой канал.
+
+Backend доставляет события в хаб каждого процесса, хаб раскладывает их по
+ограниченным очередям подписчиков. Публикация никогда не ждёт клиента:
+если очередь медленного подписчика переполнена, накопленное отбрасывается,
+он получает событие resync и отключается, а клиент переподключается и
+перечитывает списки. LocalBackend работает в пределах процесса; для
+нескольких воркеров ASGI — RedisBackend (нужен пакет redis).
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+from core.renderers import dumps
+from .models import TaskAccess, WorkspaceMembership
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+DEFAULTS = {
+    'BACKEND': 'task_planner.realtime.LocalBackend',
+    'REDIS_URL': 'redis://localhost:6379/0',
+    'QUEUE_SIZE': 100,
+    'HEARTBEAT': 15,
+    'RETRY': 3000,
+}
+
+RESYNC = {'type': 'resync'}
+
+
+def options():
+    return {**DEFAULTS, **getattr(settings, 'REALTIME', {})}
+
+
+def frame(event):
+    """Кадр SSE с событием; кодируется один раз для всех подписчиков"""
+    return b'data: ' + dumps(event) + b'\n\n'
+
+
+class Subscriber:
+    """Подключённый клиент: каналы и ограниченная очередь кадров"""
+
+    def __init__(self, channels, loop, size):
+        self.channels = set(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(size)
+        self.overflowed = False
+
+    def offer(self, event, data):
+        """Положить событие в очередь; выполняется в цикле подписчика"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            # Клиент не успевает: всё равно придётся перечитать списки
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((RESYNC, frame(RESYNC)))
+
+
+class Hub:
+    """Подписчики процесса по каналам"""
+
+    def __init__(self):
+        self.channels = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, channels, size):
+        subscriber = Subscriber(channels, asyncio.get_running_loop(), size)
+        with self.lock:
+            for channel in subscriber.channels:
+                self.channels[channel].add(subscriber)
+        return subscriber
+
+    def update(self, subscriber, channels):
+        with self.lock:
+            self._remove(subscriber)
+            subscriber.channels = set(channels)
+            for channel in subscriber.channels:
+                self.channels[channel].add(subscriber)
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self._remove(subscriber)
+
+    def _remove(self, subscriber):
+        for channel in subscriber.channels:
+            members = self.channels.get(channel)
+            if members is not None:
+                members.discard(subscriber)
+                if not members:
+                    del self.channels[channel]
+
+    def dispatch(self, channels, event):
+        """
+        Разослать событие подписчикам каналов. Вызывается из любого
+        потока; каждый подписчик получает событие один раз.
+        """
+        with self.lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self.channels.get(channel, ()))
+        if not targets:
+            return
+        data = frame(event)
+        for subscriber in targets:
+            try:
+                subscriber.loop.call_soon_threadsafe(
+                    subscriber.offer, event, data)
+            except RuntimeError:
+                # Цикл подписчика уже закрыт; отписка произойдёт в stream()
+                pass
+
+
+class LocalBackend:
+    """Доставка только в хаб своего процесса"""
+
+    def __init__(self, hub, options):
+        self.hub = hub
+
+    def publish(self, channels, event):
+        self.hub.dispatch(channels, event)
+
+    def listen(self):
+        pass
+
+
+class RedisBackend:
+    """
+    Рассылка между процессами через pub/sub Redis: события уходят в один
+    канал Redis, фоновый поток каждого процесса передаёт их своему хабу
+    """
+    channel = 'task_planner:realtime'
+
+    def __init__(self, hub, options):
+        if redis is None:
+            raise ImproperlyConfigured(
+                'RedisBackend требует установленного пакета redis')
+        self.hub = hub
+        self.client = redis.Redis.from_url(options['REDIS_URL'])
+        self.listener = None
+        self.lock = threading.Lock()
+
+    def publish(self, channels, event):
+        self.client.publish(self.channel, dumps({
+            'channels': sorted(channels), 'event': event}))
+
+    def listen(self):
+        """Запустить поток-слушатель при первом подписчике процесса"""
+        with self.lock:
+            if self.listener is None:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.channel: self.receive})
+                self.listener = pubsub.run_in_thread(
+                    sleep_time=1, daemon=True)
+
+    def receive(self, message):
+        payload = json.loads(message['data'])
+        self.hub.dispatch(payload['channels'], payload['event'])
+
+
+hub = Hub()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            config = options()
+            _backend = import_string(config['BACKEND'])(hub, config)
+        return _backend
+
+
+# Публикация
+
+def publish(channels, event):
+    """Опубликовать событие в каналы после фиксации текущей транзакции"""
+    channels = set(channels)
+    if channels:
+        # Сбой доставки не должен ломать запись, только попасть в лог
+        transaction.on_commit(
+            lambda: backend().publish(channels, event), robust=True)
+
+
+def audience(task_ids, instance=None):
+    """
+    TaskAccess.audience(task_ids). С instance результат запоминается на
+    время одного сохранения или удаления объекта: каналы событий, поколения
+    кэша ответов и получатели уведомлений берутся из одного запроса.
+    signals.py сбрасывает запомненное в pre_save и pre_delete.
+    """
+    task_ids = frozenset(task_ids)
+    if instance is None:
+        return TaskAccess.audience(task_ids)
+    memo = instance.__dict__.setdefault('_audience', {})
+    if task_ids not in memo:
+        memo[task_ids] = TaskAccess.audience(task_ids)
+    return memo[task_ids]
+
+
+def task_channels(task_ids, instance=None):
+    """
+    Каналы задач: {id задачи: каналы}. Пространство задачи и пользователи
+    с прямым доступом (владелец и исполнители); участники пространства
+    получают события через его канал.
+    """
+    channels = {}
+    for task_id, (workspace_id, users) in audience(task_ids, instance).items():
+        channels[task_id] = {
+            f'user:{user_id}' for user_id, reason in users
+            if reason != TaskAccess.Reason.MEMBER
+        }
+        if workspace_id is not None:
+            channels[task_id].add(f'workspace:{workspace_id}')
+    return channels
+
+
+def publish_tasks(action, task_ids, extra_channels=(), instance=None):
+    """Событие task.<action> для каждой задачи в её каналы"""
+    for task_id, channels in task_channels(task_ids, instance).items():
+        publish(channels | set(extra_channels),
+                {'type': f'task.{action}', 'id': task_id})
+
+
+def publish_revoked(pairs):
+    """task.revoked пользователям, потерявшим последний доступ к задаче"""
+    for user_id, task_id in pairs:
+        publish([f'user:{user_id}'], {'type': 'task.revoked', 'id': task_id})
+
+
+def child_channels(kind, task_ids, instance=None):
+    """
+    Каналы подзадач или комментариев задач task_ids. Подзадачи видят только
+    владелец и исполнители задачи (SubtaskViewSet), поэтому их события
+    идут в личные каналы, а не в канал пространства.
+    """
+    channels = set().union(*task_channels(task_ids, instance).values())
+    if kind == 'subtask':
+        channels = {
+            channel for channel in channels if channel.startswith('user:')}
+    return channels
+
+
+def publish_child(kind, action, instance, task_id, previous_task_id=None):
+    """
+    Событие подзадачи или комментария в каналы его задачи (и прежней
+    задачи, если объект перенесли)
+    """
+    channels = child_channels(
+        kind, {task_id, previous_task_id} - {None}, instance)
+    publish(channels, {
+        'type': f'{kind}.{action}', 'id': instance.pk, 'task': task_id})
+
+
+def publish_workspace(action, workspace_id):
+    publish([f'workspace:{workspace_id}'],
+            {'type': f'workspace.{action}', 'id': workspace_id})
+
+
+def publish_membership(action, user_id, workspace_id):
+    """Членство видят участники пространства и сам пользователь"""
+    publish([f'workspace:{workspace_id}', f'user:{user_id}'], {
+        'type': f'membership.{action}',
+        'workspace': workspace_id, 'user': user_id,
+    })
+
+
+# Подписка
+
+async def user_channels(user_id):
+    workspace_ids = WorkspaceMembership.objects.filter(
+        user_id=user_id).values_list('workspace_id', flat=True)
+    return {f'user:{user_id}'} | {
+        f'workspace:{workspace_id}'
+        async for workspace_id in workspace_ids.aiterator()
+    }
+
+
+async def stream(user_id):
+    """
+    Поток кадров SSE для пользователя: подсказка переподключения, события
+    и комментарии-пинги раз в HEARTBEAT секунд, чтобы прокси не закрывали
+    простаивающее соединение. Смена членств пользователя пересобирает
+    подписку на каналы.
+    """
+    config = options()
+    subscriber = hub.subscribe(
+        await user_channels(user_id), config['QUEUE_SIZE'])
+    backend().listen()
+    try:
+        yield f'retry: {config["RETRY"]}\n\n'.encode()
+        while True:
+            try:
+                event, data = await asyncio.wait_for(
+                    subscriber.queue.get(), config['HEARTBEAT'])
+            except asyncio.TimeoutError:
+                yield b': ping\n\n'
+                continue
+            yield data
+            if event is RESYNC:
+                return
+            if (event['type'].startswith('membership.')
+                    and event['user'] == user_id):
+                hub.update(subscriber, await user_channels(user_id))
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,196 @@
+"""
+Кэш сериализованных ответов списков и карточек по пользователю и строке
+запроса.
+
+Ключ ответа включает поколение пары (ресурс, пользователь). Сигналы моделей
+(signals.py) и пакетные пути меняют поколение только у пользователей,
+которые видят изменённые объекты, — старые ответы просто перестают
+читаться и вытесняются по таймауту. Счётчики попаданий и промахов ведутся
+в памяти процесса и отдаются через cache_stats.
+
+Смена поколения должна быть видна всем воркерам, иначе удалённый из
+пространства участник продолжит получать закэшированные списки из других
+процессов. Поэтому с кэшем в памяти процесса (core.cache.is_shared)
+ответы не кэшируются.
+"""
+import hashlib
+import threading
+import uuid
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.response import Response
+from core.cache import is_shared
+from . import realtime
+from .models import (
+    Comment, Subtask, Task, TaskAccess, Workspace, WorkspaceMembership
+)
+
+# Списки и карточки задач, подзадач и комментариев зависят от доступа к задаче
+TASK_RESOURCES = ('tasks', 'subtasks', 'comments')
+WORKSPACE_RESOURCES = ('workspaces', 'memberships')
+
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+def _timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60 * 5)
+
+
+def _generation_key(resource, user_id):
+    return f'task_planner:response-gen:{resource}:{user_id}'
+
+
+def _response_key(resource, request):
+    generation = cache.get_or_set(
+        _generation_key(resource, request.user.pk),
+        lambda: uuid.uuid4().hex, None)
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return (f'task_planner:response:{resource}:{request.user.pk}:'
+            f'{generation}:{path}')
+
+
+def _count(resource, outcome):
+    with _metrics_lock:
+        _metrics[resource, outcome] += 1
+
+
+def metrics():
+    """Попадания и промахи по ресурсам с начала работы процесса"""
+    with _metrics_lock:
+        counts = dict(_metrics)
+    result = {}
+    for resource in sorted({resource for resource, outcome in counts}):
+        hits = counts.get((resource, 'hit'), 0)
+        misses = counts.get((resource, 'miss'), 0)
+        result[resource] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3),
+        }
+    return result
+
+
+def cached_response(method):
+    """
+    Кэшировать ответ действия по view.cache_resource, пользователю и
+    строке запроса. Кэшируются только обычные ответы 200; потоковые
+    ответы и ошибки проходят мимо, как и все ответы без общего кэша.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        if not is_shared():
+            return method(self, request, *args, **kwargs)
+        resource = self.cache_resource
+        key = _response_key(resource, request)
+        data = cache.get(key)
+        if data is not None:
+            _count(resource, 'hit')
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        _count(resource, 'miss')
+        response = method(self, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            cache.set(key, response.data, _timeout())
+            response['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+
+class ResponseCacheMixin:
+    """Кэширование list и retrieve; ресурс задаётся cache_resource"""
+    cache_resource = None
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+# Инвалидация
+
+def bump(resources, user_ids):
+    """Сменить поколение ответов resources у пользователей user_ids"""
+    user_ids = set(user_ids) - {None}
+    if not user_ids or not is_shared():
+        return
+    generation = uuid.uuid4().hex
+    cache.set_many({
+        _generation_key(resource, user_id): generation
+        for resource in resources for user_id in user_ids
+    }, None)
+
+
+def task_user_ids(task_ids):
+    """Пользователи, видящие хотя бы одну из задач"""
+    return set(TaskAccess.objects.filter(
+        task_id__in=task_ids).values_list('user_id', flat=True).distinct())
+
+
+def invalidate_tasks(task_ids, instance=None):
+    """
+    Сменить поколение у всех, кто видит задачи; с instance — по аудитории,
+    уже разрешённой для этого сохранения (realtime.audience)
+    """
+    if not is_shared():
+        return
+    if instance is None:
+        user_ids = task_user_ids(task_ids)
+    else:
+        user_ids = {
+            user_id
+            for workspace_id, users in realtime.audience(
+                task_ids, instance).values()
+            for user_id, reason in users
+        }
+    bump(TASK_RESOURCES, user_ids)
+
+
+def invalidate_workspaces(workspace_ids):
+    """Участники и владельцы пространств: карточки, списки и членства"""
+    workspace_ids = set(workspace_ids) - {None}
+    if not workspace_ids:
+        return
+    member_ids = WorkspaceMembership.objects.filter(
+        workspace_id__in=workspace_ids).values_list('user_id', flat=True)
+    owner_ids = Workspace.objects.filter(
+        pk__in=workspace_ids).values_list('owner_id', flat=True)
+    bump(WORKSPACE_RESOURCES, set(member_ids) | set(owner_ids))
+
+
+def invalidate_tag(tag, task_ids=None):
+    """Тег отдаётся в своём списке и внутри задач с этим тегом"""
+    bump(['tags'], [tag.user_id])
+    if task_ids is None:
+        task_ids = Task.tags.through.objects.filter(
+            tag_id=tag.pk).values('task_id')
+    bump(['tasks'], task_user_ids(task_ids))
+
+
+def invalidate_user(user_id):
+    """
+    Пользователь вложен в ответы задач (владелец, исполнитель, автор
+    комментария, исполнитель подзадачи) и пространств (владелец, участник)
+    """
+    if not is_shared():
+        return
+    assigned = Task.assignees.through.objects.filter(user_id=user_id)
+    task_ids = Task.objects.filter(
+        Q(owner_id=user_id)
+        | Q(id__in=assigned.values('task_id'))
+        | Q(id__in=Subtask.objects.filter(
+            assignee_id=user_id).values('parent_task_id'))
+        | Q(id__in=Comment.objects.filter(
+            author_id=user_id).values('task_id'))
+    ).values('id')
+    invalidate_tasks(task_ids)
+    invalidate_workspaces(Workspace.objects.filter(
+        Q(owner_id=user_id) | Q(memberships__user_id=user_id)
+    ).values_list('id', flat=True))
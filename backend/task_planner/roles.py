@@ -0,0 +1,62 @@
+"""
+Роли пользователей в рабочих пространствах для проверок прав.
+
+Роль (user_id, workspace_id) запоминается на время запроса в самом
+объекте запроса и между запросами — в кэше, если он общий для всех
+процессов (core.cache.is_shared). Сохранение и удаление членства
+сбрасывает запись кэша (signals.py); отсутствие членства кэшируется как
+NO_ROLE, чтобы повторные отказы тоже не ходили в базу. С кэшем в памяти
+процесса сброс не дошёл бы до других воркеров, и понижённый администратор
+сохранял бы права, поэтому роль читается из базы в каждом запросе.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from core.cache import is_shared
+from .models import WorkspaceMembership
+
+Role = WorkspaceMembership.Role
+
+CACHE_TIMEOUT = 60 * 5
+NO_ROLE = 0
+
+
+def _key(user_id, workspace_id):
+    return f'task_planner:workspace-role:{workspace_id}:{user_id}'
+
+
+def get_role(user_id, workspace_id):
+    """Роль пользователя в пространстве (Role) или None без членства"""
+    shared = is_shared()
+    key = _key(user_id, workspace_id)
+    role = cache.get(key) if shared else None
+    if role is None:
+        role = WorkspaceMembership.objects.filter(
+            user_id=user_id, workspace_id=workspace_id
+        ).values_list('role', flat=True).first() or NO_ROLE
+        if shared:
+            cache.set(key, role, CACHE_TIMEOUT)
+    return Role(role) if role != NO_ROLE else None
+
+
+def request_role(request, workspace_id):
+    """get_role для автора запроса с запоминанием на время запроса"""
+    roles = getattr(request, '_workspace_roles', None)
+    if roles is None:
+        roles = request._workspace_roles = {}
+    if workspace_id not in roles:
+        roles[workspace_id] = get_role(request.user.pk, workspace_id)
+    return roles[workspace_id]
+
+
+def has_role(request, workspace_id, required=Role.MEMBER):
+    role = request_role(request, workspace_id)
+    return role is not None and role >= required
+
+
+def invalidate(pairs):
+    """Сбросить кэш ролей для пар (user_id, workspace_id)"""
+    keys = [_key(*pair) for pair in set(pairs)]
+    cache.delete_many(keys)
+    # Повторно после фиксации: параллельный запрос мог успеть закэшировать
+    # роль, прочитанную до коммита
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,254 @@
+"""
+Быстрая сериализация списков на строках values().
+
+RowReader выдаёт ту же структуру JSON, что и ModelSerializer (с учётом
+?fields=/?omit=/?expand=), но не создаёт экземпляры моделей и не обходит
+поля DRF на каждую строку: колонки читаются одним values(), вложенные
+пользователи и теги собираются из словарей, загруженных одним запросом
+на связь. Поля DRF вызываются только для дат и файлов.
+
+Сборка написана генератором, который отдаёт наружу запросы связей и
+получает обратно их строки: render() выполняет их синхронно, arender() —
+через асинхронный ORM, не занимая поток на время ожидания базы.
+"""
+from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import F
+from rest_framework import serializers
+from users.models import User
+from users.serializers import UserSerializer
+from .serializers import TaskSerializer
+
+# Вычисляемые поля: имя -> (нужные колонки или аннотации, функция от строки)
+COMPUTED = {
+    UserSerializer: {
+        'photo_url': (['photo'], lambda row: _photo_url(row['photo'])),
+    },
+    TaskSerializer: {
+        'is_overdue': (['overdue_now'], itemgetter('overdue_now')),
+        'is_personal': (
+            ['workspace_id'], lambda row: row['workspace_id'] is None),
+    },
+}
+
+# Поля DRF, чьё представление отличается от значения из базы
+CONVERTED = (
+    serializers.DateTimeField, serializers.DateField,
+    serializers.TimeField, serializers.DecimalField,
+)
+
+
+def _photo_url(name):
+    if not name:
+        return None
+    return User._meta.get_field('photo').storage.url(name)
+
+
+def _placeholder(row):
+    return None
+
+
+def _run(steps):
+    """Выполнить генератор сборки, читая запросы синхронно"""
+    try:
+        queryset = next(steps)
+        while True:
+            queryset = steps.send(list(queryset))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _arun(steps):
+    """Выполнить генератор сборки через асинхронный ORM"""
+    try:
+        queryset = next(steps)
+        while True:
+            queryset = steps.send(
+                [row async for row in queryset.aiterator()])
+    except StopIteration as stop:
+        return stop.value
+
+
+class RowReader:
+    """Читает и собирает строки для полей, отдаваемых сериализатором"""
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        self.columns = {self.pk}
+        self.getters = []
+        self.relations = []
+        computed = {}
+        for cls in reversed(type(serializer).__mro__):
+            computed.update(COMPUTED.get(cls, {}))
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in computed:
+                columns, getter = computed[name]
+                self.columns.update(columns)
+                self.getters.append((name, getter))
+            else:
+                self.getters.append((name, self.add_field(name, field)))
+
+    def add_field(self, name, field):
+        """Зарегистрировать поле и вернуть функцию чтения его из строки"""
+        source = field.source or name
+        try:
+            model_field = self.model._meta.get_field(source)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(
+                f'RowReader: поле {type(self.serializer).__name__}.{name} '
+                'не является полем модели и не описано в COMPUTED')
+
+        if model_field.many_to_many:
+            child = getattr(field, 'child', None)
+            reader = RowReader(child) if child is not None else None
+            self.relations.append(ManyRelation(name, model_field, reader))
+            return _placeholder
+        if model_field.is_relation:
+            column = model_field.attname
+            self.columns.add(column)
+            if isinstance(field, serializers.BaseSerializer):
+                self.relations.append(
+                    ForeignRelation(name, column, RowReader(field)))
+                return _placeholder
+            return itemgetter(column)
+
+        column = model_field.attname
+        self.columns.add(column)
+        if isinstance(field, serializers.FileField):
+            def read_file(row, field=field, model_field=model_field):
+                value = row[column]
+                if not value:
+                    return None
+                return field.to_representation(
+                    model_field.attr_class(None, model_field, value))
+            return read_file
+        if isinstance(field, CONVERTED):
+            def convert(row, to_representation=field.to_representation):
+                value = row[column]
+                return None if value is None else to_representation(value)
+            return convert
+        return itemgetter(column)
+
+    def value_columns(self, queryset):
+        """
+        Нужные колонки; колонки сортировки тоже читаются, чтобы пагинация
+        могла построить курсор по строке
+        """
+        opts = queryset.model._meta
+        columns = set(self.columns)
+        for name in queryset.query.order_by or opts.ordering:
+            if isinstance(name, str):
+                name = name.lstrip('-')
+                field = opts.pk if name == 'pk' else opts.get_field(name)
+                columns.add(field.attname)
+        return sorted(columns)
+
+    def values(self, queryset):
+        return queryset.select_related(None).prefetch_related(None).values(
+            *self.value_columns(queryset))
+
+    def render(self, rows):
+        """Список словарей в порядке полей сериализатора"""
+        return _run(self.build(rows))
+
+    async def arender(self, rows):
+        """render() для асинхронных представлений; rows — уже список"""
+        return await _arun(self.build(rows))
+
+    def build(self, rows):
+        """
+        Генератор сборки: отдаёт запросы связей (yield queryset), получает
+        их строки и возвращает собранные словари
+        """
+        rows = list(rows)
+        items = [
+            {name: getter(row) for name, getter in self.getters}
+            for row in rows
+        ]
+        for relation in self.relations:
+            yield from relation.fill(self.pk, rows, items)
+        return items
+
+    def render_batches(self, queryset, batch_size=1000):
+        """Собранные строки пачками: для потоковой выдачи больших списков"""
+        rows = self.values(queryset).iterator(chunk_size=batch_size)
+        while batch := list(islice(rows, batch_size)):
+            yield self.render(batch)
+
+
+class ForeignRelation:
+    """Вложенный объект по внешнему ключу: один запрос на всю страницу"""
+
+    def __init__(self, name, column, reader):
+        self.name = name
+        self.column = column
+        self.reader = reader
+
+    def fill(self, pk, rows, items):
+        ids = {row[self.column] for row in rows} - {None}
+        related = {}
+        if ids:
+            reader = self.reader
+            related_rows = yield reader.values(
+                reader.model.objects.filter(pk__in=ids))
+            rendered = yield from reader.build(related_rows)
+            related = dict(zip(
+                [row[reader.pk] for row in related_rows], rendered))
+        for row, item in zip(rows, items):
+            item[self.name] = related.get(row[self.column])
+
+
+class ManyRelation:
+    """
+    Связь многие-ко-многим одним запросом: строки связанной модели с id
+    владельца связи в порядке её сортировки (или только пары id из
+    промежуточной таблицы, если поле не раскрыто)
+    """
+    owner_column = 'row_owner_id'
+
+    def __init__(self, name, model_field, reader):
+        self.name = name
+        self.field = model_field
+        self.reader = reader
+
+    def fill(self, pk, rows, items):
+        owner_ids = [row[pk] for row in rows]
+        grouped = defaultdict(list)
+        if self.reader is None:
+            source = self.field.m2m_field_name()
+            target = self.field.m2m_reverse_field_name()
+            links = self.field.remote_field.through.objects.filter(**{
+                f'{source}_id__in': owner_ids
+            }).order_by(*[
+                f'-{target}__{name[1:]}' if name.startswith('-')
+                else f'{target}__{name}'
+                for name in self.field.related_model._meta.ordering
+            ], f'{target}_id').values(f'{source}_id', f'{target}_id')
+            # values(), а не values_list(): aiterator() выполняет запрос
+            # values_list() синхронно
+            for link in (yield links):
+                grouped[link[f'{source}_id']].append(link[f'{target}_id'])
+        else:
+            reader = self.reader
+            lookup = self.field.related_query_name()
+            queryset = reader.model.objects.filter(**{
+                f'{lookup}__in': owner_ids
+            }).annotate(**{self.owner_column: F(f'{lookup}__id')})
+            related_rows = yield queryset.values(
+                *reader.value_columns(queryset), self.owner_column)
+            # Один и тот же объект связан со многими строками — собираем раз
+            unique = {row[reader.pk]: row for row in related_rows}
+            rendered = dict(zip(unique, (yield from reader.build(
+                list(unique.values())))))
+            for row in related_rows:
+                grouped[row[self.owner_column]].append(
+                    rendered[row[reader.pk]])
+        for row, item in zip(rows, items):
+            item[self.name] = grouped[row[pk]]
@@ -0,0 +1,190 @@
+"""
+Полнотекстовый поиск по задачам, подзадачам и комментариям на SQLite FTS5.
+
+Все документы лежат в одной виртуальной таблице. rowid кодирует тип и id
+объекта (id << 2 | код типа), поэтому обновление и удаление строки индекса
+идут по rowid, без сканирования. Индекс поддерживается сигналами.
+"""
+from django.db import connection
+from .models import Task, TaskAccess
+
+TABLE = 'task_planner_search'
+KIND_CODES = {'task': 1, 'subtask': 2, 'comment': 3}
+# Веса bm25 по колонкам: kind, task_id, title, body, tags
+WEIGHTS = '0.0, 0.0, 10.0, 1.0, 5.0'
+
+
+def is_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(kind, object_id):
+    return object_id << 2 | KIND_CODES[kind]
+
+
+def to_match_query(text):
+    """Превратить пользовательский ввод в безопасный запрос FTS5 по префиксам"""
+    words = [word.replace('"', '""') for word in text.split()]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _replace(rows):
+    """rows: (kind, object_id, task_id, title, body, tags)"""
+    if not rows or not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE rowid = %s',
+            [(_rowid(row[0], row[1]),) for row in rows]
+        )
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, kind, task_id, title, body, tags) '
+            'VALUES (%s, %s, %s, %s, %s, %s)',
+            [(_rowid(row[0], row[1]),) + (row[0],) + tuple(row[2:])
+             for row in rows]
+        )
+
+
+def remove(kind, object_id):
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid = %s', [_rowid(kind, object_id)])
+
+
+def index_tasks(tasks):
+    """Переиндексировать задачи вместе с названиями их тегов"""
+    tasks = list(tasks)
+    if not tasks:
+        return
+    tag_titles = {}
+    for task_id, title in Task.tags.through.objects.filter(
+            task_id__in=[task.pk for task in tasks]
+    ).values_list('task_id', 'tag__title'):
+        tag_titles.setdefault(task_id, []).append(title)
+    _replace([
+        ('task', task.pk, task.pk, task.title, task.description,
+         ' '.join(tag_titles.get(task.pk, [])))
+        for task in tasks
+    ])
+
+
+def reindex_task_ids(task_ids):
+    index_tasks(Task.objects.filter(pk__in=task_ids).only(
+        'id', 'title', 'description'))
+
+
+def index_subtask(subtask):
+    index_subtasks([subtask])
+
+
+def index_subtasks(subtasks):
+    _replace([
+        ('subtask', subtask.pk, subtask.parent_task_id,
+         subtask.title, subtask.description, '')
+        for subtask in subtasks
+    ])
+
+
+def index_comment(comment):
+    index_comments([comment])
+
+
+def index_comments(comments):
+    _replace([
+        ('comment', comment.pk, comment.task_id, '', comment.text, '')
+        for comment in comments
+    ])
+
+
+def search(user, text, limit=20):
+    """Найти видимые пользователю документы, лучшие по bm25 — первыми"""
+    query = to_match_query(text)
+    if not query:
+        return []
+    access = TaskAccess._meta.db_table
+    sql = f'''
+        SELECT kind, rowid >> 2, task_id, title,
+               snippet({TABLE}, -1, '[', ']', '…', 12),
+               bm25({TABLE}, {WEIGHTS}) AS rank
+        FROM {TABLE}
+        WHERE {TABLE} MATCH %s
+          AND task_id IN (SELECT task_id FROM {access} WHERE user_id = %s)
+          AND (kind <> 'subtask' OR task_id IN (
+              SELECT task_id FROM {access}
+              WHERE user_id = %s AND reason IN (%s, %s)))
+        ORDER BY rank
+        LIMIT %s
+    '''
+    params = [query, user.pk, user.pk, TaskAccess.Reason.OWNER,
+              TaskAccess.Reason.ASSIGNEE, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {
+            'type': kind,
+            'id': object_id,
+            'task_id': task_id,
+            'title': title,
+            'snippet': snippet,
+            'rank': rank,
+        }
+        for kind, object_id, task_id, title, snippet, rank in rows
+    ]
+
+
+def match_ids(kind, text, limit=1000):
+    """id объектов одного типа по запросу, без учёта прав (для админки)"""
+    query = to_match_query(text)
+    if not query:
+        return []
+    sql = (
+        f'SELECT rowid >> 2 FROM {TABLE} WHERE {TABLE} MATCH %s '
+        f'AND kind = %s ORDER BY bm25({TABLE}, {WEIGHTS}) LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [query, kind, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+CREATE_SQL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    'kind UNINDEXED, task_id UNINDEXED, title, body, tags, '
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+REBUILD_SQL = [
+    f'DELETE FROM {TABLE}',
+    f'''
+    INSERT INTO {TABLE} (rowid, kind, task_id, title, body, tags)
+    SELECT t.id << 2 | 1, 'task', t.id, t.title, t.description,
+           COALESCE((SELECT group_concat(g.title, ' ')
+                     FROM task_planner_task_tags tt
+                     JOIN task_planner_tag g ON g.id = tt.tag_id
+                     WHERE tt.task_id = t.id), '')
+    FROM task_planner_task t
+    ''',
+    f'''
+    INSERT INTO {TABLE} (rowid, kind, task_id, title, body, tags)
+    SELECT id << 2 | 2, 'subtask', parent_task_id, title, description, ''
+    FROM task_planner_subtask
+    ''',
+    f'''
+    INSERT INTO {TABLE} (rowid, kind, task_id, title, body, tags)
+    SELECT id << 2 | 3, 'comment', task_id, '', text, ''
+    FROM task_planner_comment
+    ''',
+]
+
+
+def rebuild():
+    if not is_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        for sql in REBUILD_SQL:
+            cursor.execute(sql)
+        cursor.execute(f'SELECT count(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
@@ -1,16 +1,45 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
+from core.serializers import SparseFieldsMixin
+from notifications import fanout
 from .models import Tag, Workspace, WorkspaceMembership, Task, Subtask, Comment
+from . import access, realtime, response_cache, search, stats
 from users.serializers import UserSerializer
 
 
-class TagSerializer(serializers.ModelSerializer):
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PK-поле, которое при пакетной валидации берёт объекты из общего
+    словаря, заполненного одним запросом на поле, а не запросом на элемент.
+    """
+
+    @property
+    def lookup_name(self):
+        return self.field_name or self.parent.field_name
+
+    def to_internal_value(self, data):
+        lookup = self.context.get('related_lookup', {}).get(self.lookup_name)
+        if lookup is None:
+            return super().to_internal_value(data)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in lookup:
+            self.fail('does_not_exist', pk_value=data)
+        return lookup[pk]
+
+
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'title', 'description', 'user']
         read_only_fields = ['id', 'user']
 
 
-class WorkspaceMembershipSerializer(serializers.ModelSerializer):
+class WorkspaceMembershipSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
     class Meta:
@@ -19,9 +48,8 @@ class WorkspaceMembershipSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'joined_at']
 
 
-class WorkspaceSerializer(serializers.ModelSerializer):
+class WorkspaceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
-    members_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Workspace
@@ -31,10 +59,6 @@ class WorkspaceSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
 
-    def get_members_count(self, obj):
-        return obj.memberships.count()
-
-
 class WorkspaceDetailSerializer(WorkspaceSerializer):
     members = WorkspaceMembershipSerializer(
         source='memberships', many=True, read_only=True)
@@ -43,14 +67,12 @@ class WorkspaceDetailSerializer(WorkspaceSerializer):
         fields = WorkspaceSerializer.Meta.fields + ['members']
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     owner = UserSerializer(read_only=True)
     assignees = UserSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    is_overdue = serializers.BooleanField(read_only=True)
+    is_overdue = serializers.SerializerMethodField()
     is_personal = serializers.BooleanField(read_only=True)
-    subtasks_count = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
@@ -62,14 +84,150 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
 
-    def get_subtasks_count(self, obj):
-        return obj.subtasks.count()
+    def get_is_overdue(self, obj):
+        if hasattr(obj, 'overdue_now'):
+            return obj.overdue_now
+        return obj.is_overdue
+
+
+class TaskBulkListSerializer(serializers.ListSerializer):
+    """Общая пакетная валидация для TaskCreateSerializer/TaskUpdateSerializer"""
+    batch_size = 500
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.context['related_lookup'] = self.prefetch_related(data)
+        return super().to_internal_value(data)
+
+    def prefetch_related(self, data):
+        lookup = {}
+        for name, field in self.child.fields.items():
+            relation = getattr(field, 'child_relation', field)
+            if field.read_only or not isinstance(
+                    relation, PrefetchedPrimaryKeyRelatedField):
+                continue
+            pk_field = relation.get_queryset().model._meta.pk
+            pks = set()
+            for item in data:
+                value = item.get(name) if isinstance(item, dict) else None
+                values = value if isinstance(value, list) else [value]
+                for pk in values:
+                    try:
+                        pks.add(pk_field.to_python(pk))
+                    except (TypeError, DjangoValidationError):
+                        continue
+            pks.discard(None)
+            lookup[name] = relation.get_queryset().in_bulk(pks)
+        return lookup
+
+    def write_relations(self, tasks, relations, replace=False):
+        """Записать теги и исполнителей пачкой через промежуточные таблицы"""
+        for name in ('tags', 'assignees'):
+            changed = [
+                (task, items[name]) for task, items in zip(tasks, relations)
+                if name in items
+            ]
+            if not changed:
+                continue
+            descriptor = getattr(Task, name)
+            through = descriptor.through
+            column = descriptor.field.m2m_reverse_field_name() + '_id'
+            task_ids = [task.pk for task, objs in changed]
+            previous = set()
+            if replace:
+                existing = through.objects.filter(task_id__in=task_ids)
+                if name == 'assignees':
+                    previous = set(existing.values_list('task_id', column))
+                existing.delete()
+            pairs = [(task.pk, obj.pk) for task, objs in changed for obj in objs]
+            through.objects.bulk_create(
+                [through(task_id=task_id, **{column: pk})
+                 for task_id, pk in pairs],
+                batch_size=self.batch_size,
+                ignore_conflicts=True
+            )
+            # bulk_create не отправляет m2m_changed, обновляем индекс доступа
+            # и счётчик исполнителей
+            if name == 'assignees':
+                if replace:
+                    access.revoke_assignees(task_ids)
+                access.grant_assignee_pairs(pairs)
+                fanout.notify_assigned(
+                    set(pairs) - previous, self.context['request'].user.pk)
+                for task, objs in changed:
+                    task.assignees_count = len({obj.pk for obj in objs})
+                Task.objects.bulk_update(
+                    [task for task, objs in changed], ['assignees_count'],
+                    batch_size=self.batch_size)
+
+    @staticmethod
+    def split_relations(validated_data):
+        return [
+            {name: item.pop(name) for name in ('tags', 'assignees')
+             if name in item}
+            for item in validated_data
+        ]
+
 
-    def get_comments_count(self, obj):
-        return obj.comments.count()
+class TaskBulkCreateListSerializer(TaskBulkListSerializer):
+    @transaction.atomic
+    def create(self, validated_data):
+        owner = self.context['request'].user
+        relations = self.split_relations(validated_data)
+        tasks = [Task(owner=owner, **item) for item in validated_data]
+        for task in tasks:
+            task.update_overdue_status()
+        Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+        access.grant_new_tasks(tasks)
+        self.write_relations(tasks, relations)
+        search.index_tasks(tasks)
+        stats.invalidate(task.workspace_id for task in tasks)
+        response_cache.invalidate_tasks([task.pk for task in tasks])
+        realtime.publish_tasks('created', [task.pk for task in tasks])
+        return tasks
+
+
+class TaskBulkUpdateListSerializer(TaskBulkListSerializer):
+    """Пакетное обновление; instance — словарь {id: Task}"""
+
+    def to_internal_value(self, data):
+        self.ids = [
+            item.get('id') if isinstance(item, dict) else None
+            for item in data
+        ] if isinstance(data, list) else []
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        pk = data.get('id') if isinstance(data, dict) else None
+        self.child.instance = self.instance.get(pk)
+        self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        tasks = [instance[pk] for pk in self.ids]
+        relations = self.split_relations(validated_data)
+        fields = {'updated_at', 'status'}
+        now = timezone.now()
+        for task, item in zip(tasks, validated_data):
+            for attr, value in item.items():
+                setattr(task, attr, value)
+            fields.update(item)
+            task.updated_at = now
+            task.update_overdue_status()
+        Task.objects.bulk_update(
+            tasks, sorted(fields), batch_size=self.batch_size)
+        self.write_relations(tasks, relations, replace=True)
+        search.index_tasks(tasks)
+        stats.invalidate(task.workspace_id for task in tasks)
+        response_cache.invalidate_tasks([task.pk for task in tasks])
+        realtime.publish_tasks('updated', [task.pk for task in tasks])
+        return tasks
 
 
 class TaskCreateSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     class Meta:
         model = Task
         fields = [
@@ -77,6 +235,7 @@ class TaskCreateSerializer(serializers.ModelSerializer):
             'due_date', 'deadline', 'priority',
             'tags', 'assignees'
         ]
+        list_serializer_class = TaskBulkCreateListSerializer
 
     def create(self, validated_data):
         validated_data['owner'] = self.context['request'].user
@@ -84,15 +243,18 @@ class TaskCreateSerializer(serializers.ModelSerializer):
 
 
 class TaskUpdateSerializer(serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
     class Meta:
         model = Task
         fields = [
             'title', 'description', 'due_date', 'deadline',
             'status', 'priority', 'tags', 'assignees'
         ]
+        list_serializer_class = TaskBulkUpdateListSerializer
 
 
-class SubtaskSerializer(serializers.ModelSerializer):
+class SubtaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     assignee = UserSerializer(read_only=True)
 
     class Meta:
@@ -114,7 +276,7 @@ class SubtaskCreateSerializer(serializers.ModelSerializer):
         return value
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
 
     class Meta:
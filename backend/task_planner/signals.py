@@ -0,0 +1,507 @@
+from django.db.models import DEFERRED
+from django.db.models.signals import (
+    post_init, pre_save, post_save, pre_delete, post_delete, m2m_changed
+)
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from users.models import User
+from . import (
+    access, counters, realtime, response_cache, roles, search, stats, sync
+)
+from .models import (
+    Tag, Task, Subtask, Comment, Tombstone, Workspace, WorkspaceMembership
+)
+
+
+# Задачи помечены просроченными разметкой (jobs.mark_overdue_tasks); в
+# аргументе task_ids — id действительно изменённых строк. Отправляется
+# внутри транзакции разметки
+tasks_marked_overdue = Signal()
+
+
+# Поля, от которых зависит работа приёмников ниже. Снимок делается в
+# post_init и сдвигается в pre_save: сохранение без изменений этих полей
+# не трогает доступ, поисковый индекс и сводку. Изменения в базе мимо
+# этого экземпляра снимок не видит — их правят пакетные пути и сверка
+TRACKED_FIELDS = {
+    Task: ('owner_id', 'workspace_id', 'title', 'description', 'status',
+           'priority', 'due_date'),
+    Subtask: ('parent_task_id', 'title', 'description'),
+    Comment: ('task_id', 'text'),
+}
+
+
+def _snapshot(instance):
+    # Через __dict__, чтобы отложенные поля не загружались запросом
+    return {name: instance.__dict__.get(name, DEFERRED)
+            for name in TRACKED_FIELDS[type(instance)]}
+
+
+def _changed(instance, *names):
+    """Изменилось ли при текущем сохранении хоть одно из полей names"""
+    changed = getattr(instance, '_changed_fields', None)
+    return changed is None or not changed.isdisjoint(names)
+
+
+@receiver(post_init, sender=Task)
+@receiver(post_init, sender=Subtask)
+@receiver(post_init, sender=Comment)
+def remember_tracked_fields(sender, instance, **kwargs):
+    instance._tracked_fields = _snapshot(instance)
+
+
+@receiver(pre_save, sender=Task)
+@receiver(pre_save, sender=Subtask)
+@receiver(pre_save, sender=Comment)
+def detect_changed_fields(sender, instance, **kwargs):
+    previous = instance._tracked_fields
+    current = _snapshot(instance)
+    instance._changed_fields = None if instance._state.adding else {
+        name for name, value in current.items() if previous[name] != value}
+    instance._tracked_fields = current
+    # Аудиторию задачи (realtime.audience) разрешаем заново на каждую запись
+    instance._audience = {}
+    if sender is Task:
+        instance._access_previous = None if instance._state.adding else (
+            previous['owner_id'], previous['workspace_id'])
+
+
+@receiver(pre_delete, sender=Task)
+@receiver(pre_delete, sender=Subtask)
+@receiver(pre_delete, sender=Comment)
+def reset_audience(sender, instance, **kwargs):
+    instance._audience = {}
+
+
+@receiver(post_save, sender=Task)
+def sync_task_access(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_access_previous', None)
+    if created or previous is None or previous[0] != instance.owner_id:
+        access.sync_task_owner(instance)
+    if created or previous is None or previous[1] != instance.workspace_id:
+        access.sync_task_members(instance)
+
+
+@receiver(m2m_changed, sender=Task.assignees.through)
+def sync_assignee_access(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # После очистки pk_set недоступен, поэтому запоминаем связи заранее
+        if reverse:
+            instance._access_cleared = list(
+                instance.assigned_tasks.values_list('id', flat=True))
+        return
+
+    if action in ('post_add', 'post_remove'):
+        if reverse:
+            task_ids, user_ids = pk_set, [instance.pk]
+        else:
+            task_ids, user_ids = [instance.pk], pk_set
+        if action == 'post_add':
+            access.grant_assignees(task_ids, user_ids)
+        else:
+            access.revoke_assignees(task_ids, user_ids)
+
+    elif action == 'post_clear':
+        if reverse:
+            access.revoke_assignees(
+                getattr(instance, '_access_cleared', []), [instance.pk])
+        else:
+            access.revoke_assignees([instance.pk])
+
+
+@receiver(pre_save, sender=WorkspaceMembership)
+def remember_membership_fields(sender, instance, **kwargs):
+    instance._access_previous = None
+    if instance.pk:
+        instance._access_previous = WorkspaceMembership.objects.filter(
+            pk=instance.pk).values_list('user_id', 'workspace_id').first()
+
+
+@receiver(post_save, sender=WorkspaceMembership)
+def grant_membership_access(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_access_previous', None)
+    current = (instance.user_id, instance.workspace_id)
+    if not created and previous == current:
+        return
+    if previous is not None:
+        access.revoke_membership(*previous)
+    access.grant_membership(*current)
+
+
+@receiver(post_delete, sender=WorkspaceMembership)
+def revoke_membership_access(sender, instance, **kwargs):
+    access.revoke_membership(instance.user_id, instance.workspace_id)
+
+
+@receiver(post_save, sender=WorkspaceMembership)
+@receiver(post_delete, sender=WorkspaceMembership)
+def invalidate_membership_role(sender, instance, **kwargs):
+    # Роль могла смениться и без смены пары пользователь/пространство
+    previous = getattr(instance, '_access_previous', None)
+    roles.invalidate(
+        [(instance.user_id, instance.workspace_id)] +
+        ([previous] if previous else []))
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+@receiver(m2m_changed, sender=Task.assignees.through)
+def touch_tasks_on_relation_change(sender, instance, action, reverse,
+                                   pk_set, **kwargs):
+    """Смена тегов или исполнителей обновляет updated_at задачи"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Task.objects.filter(pk=instance.pk).update(
+                updated_at=timezone.now())
+        return
+
+    if action == 'pre_clear':
+        column = f'{instance._meta.model_name}_id'
+        instance._touch_task_ids = list(sender.objects.filter(
+            **{column: instance.pk}).values_list('task_id', flat=True))
+        return
+    if action in ('post_add', 'post_remove'):
+        task_ids = pk_set
+    elif action == 'post_clear':
+        task_ids = getattr(instance, '_touch_task_ids', [])
+    else:
+        return
+    Task.objects.filter(pk__in=task_ids).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Task)
+def record_task_tombstone(sender, instance, **kwargs):
+    # До каскадного удаления, пока строки TaskAccess ещё существуют
+    sync.record_task_deleted(instance)
+
+
+@receiver(post_delete, sender=Subtask)
+def record_subtask_tombstone(sender, instance, **kwargs):
+    sync.record_child_deleted(
+        Tombstone.Kind.SUBTASK, instance, instance.parent_task_id)
+
+
+@receiver(post_delete, sender=Comment)
+def record_comment_tombstone(sender, instance, **kwargs):
+    sync.record_child_deleted(
+        Tombstone.Kind.COMMENT, instance, instance.task_id)
+
+
+@receiver(post_delete, sender=Tag)
+def record_tag_tombstone(sender, instance, **kwargs):
+    sync.record_tag_deleted(instance)
+
+
+@receiver(post_save, sender=Task)
+def index_task(sender, instance, raw=False, **kwargs):
+    if not raw and _changed(instance, 'title', 'description'):
+        search.index_tasks([instance])
+
+
+@receiver(post_save, sender=Subtask)
+def index_subtask(sender, instance, raw=False, **kwargs):
+    if not raw and _changed(
+            instance, 'parent_task_id', 'title', 'description'):
+        search.index_subtask(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw and _changed(instance, 'task_id', 'text'):
+        search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Task)
+def unindex_task(sender, instance, **kwargs):
+    search.remove('task', instance.pk)
+
+
+@receiver(post_delete, sender=Subtask)
+def unindex_subtask(sender, instance, **kwargs):
+    search.remove('subtask', instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.remove('comment', instance.pk)
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def reindex_task_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._search_task_ids = list(
+            instance.tasks.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            search.index_tasks([instance])
+        elif action == 'post_clear':
+            search.reindex_task_ids(getattr(instance, '_search_task_ids', []))
+        else:
+            search.reindex_task_ids(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+def reindex_renamed_tag(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        search.reindex_task_ids(instance.tasks.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_tasks(sender, instance, **kwargs):
+    instance._search_task_ids = list(
+        instance.tasks.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def reindex_deleted_tag(sender, instance, **kwargs):
+    search.reindex_task_ids(getattr(instance, '_search_task_ids', []))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_workspace_stats(sender, instance, signal, **kwargs):
+    if signal is post_save and not _changed(
+            instance, 'workspace_id', 'status', 'priority', 'due_date'):
+        return
+    previous = getattr(instance, '_access_previous', None)
+    stats.invalidate([
+        instance.workspace_id, previous[1] if previous else None])
+
+
+@receiver(m2m_changed, sender=Task.assignees.through)
+def invalidate_assignee_stats(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        stats.invalidate([instance.workspace_id])
+        return
+    if action == 'post_clear':
+        # Связи запомнены в sync_assignee_access на pre_clear
+        task_ids = getattr(instance, '_access_cleared', [])
+    else:
+        task_ids = pk_set
+    stats.invalidate(Task.objects.filter(
+        pk__in=task_ids).values_list('workspace_id', flat=True).distinct())
+
+
+@receiver(post_init, sender=Subtask)
+@receiver(post_init, sender=Comment)
+@receiver(post_init, sender=WorkspaceMembership)
+def remember_counted_parent(sender, instance, **kwargs):
+    counters.remember(instance)
+
+
+@receiver(post_save, sender=Subtask)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=WorkspaceMembership)
+def count_saved_child(sender, instance, created, raw=False, **kwargs):
+    # Фикстуры приносят счётчики с собой; расхождения правит reconcile_counters
+    if not raw:
+        counters.saved(instance, created)
+
+
+@receiver(post_delete, sender=Subtask)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=WorkspaceMembership)
+def count_deleted_child(sender, instance, origin=None, **kwargs):
+    counters.deleted(instance, origin)
+
+
+@receiver(m2m_changed, sender=Task.assignees.through)
+def count_assignees(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        # pk_set после добавления — только действительно новые связи
+        if reverse:
+            counters.add(Task, pk_set, 'assignees_count', 1)
+        else:
+            counters.add(Task, [instance.pk], 'assignees_count', len(pk_set))
+    elif action == 'post_remove':
+        # pk_set при удалении может содержать и несвязанные id — пересчёт
+        counters.refresh_tasks(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        if reverse:
+            # Связи запомнены в sync_assignee_access на pre_clear
+            counters.add(Task, getattr(instance, '_access_cleared', []),
+                         'assignees_count', -1)
+        else:
+            Task.objects.filter(pk=instance.pk).update(assignees_count=0)
+
+
+# Кэш ответов API: поколение меняется у тех, кто видит изменённые объекты.
+# Потеря доступа к задачам сбрасывает кэш в access._revoke.
+
+def _cascade_from(origin, model):
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+@receiver(post_save, sender=Task)
+@receiver(pre_delete, sender=Task)
+def invalidate_task_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        response_cache.invalidate_tasks([instance.pk], instance)
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+@receiver(m2m_changed, sender=Task.assignees.through)
+def invalidate_relation_responses(sender, instance, action, reverse, pk_set,
+                                  **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        task_ids = [instance.pk]
+    elif action == 'post_clear':
+        # Связи запомнены в touch_tasks_on_relation_change на pre_clear
+        task_ids = getattr(instance, '_touch_task_ids', [])
+    else:
+        task_ids = pk_set
+    response_cache.invalidate_tasks(task_ids)
+
+
+@receiver(post_save, sender=Subtask)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Subtask)
+@receiver(post_delete, sender=Comment)
+def invalidate_child_responses(sender, instance, raw=False, origin=None,
+                               **kwargs):
+    if raw or _cascade_from(origin, Task):
+        return
+    column = counters.COUNTED[sender][0]
+    response_cache.invalidate_tasks({
+        getattr(instance, column),
+        getattr(instance, '_counter_moved_from', None),
+    } - {None}, instance)
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_tag_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        response_cache.invalidate_tag(instance)
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_deleted_tag_responses(sender, instance, **kwargs):
+    # Задачи с тегом запомнены в remember_tag_tasks на pre_delete
+    response_cache.invalidate_tag(
+        instance, getattr(instance, '_search_task_ids', []))
+
+
+@receiver(post_save, sender=Workspace)
+@receiver(pre_delete, sender=Workspace)
+def invalidate_workspace_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        response_cache.invalidate_workspaces([instance.pk])
+
+
+@receiver(post_save, sender=WorkspaceMembership)
+@receiver(post_delete, sender=WorkspaceMembership)
+def invalidate_membership_responses(sender, instance, raw=False, origin=None,
+                                    **kwargs):
+    if raw or _cascade_from(origin, Workspace):
+        return
+    previous = getattr(instance, '_access_previous', None) or (None, None)
+    user_ids = {instance.user_id, previous[0]}
+    response_cache.invalidate_workspaces({instance.workspace_id, previous[1]})
+    # Бывший участник уже не найдётся среди участников пространства;
+    # видимость задач пространства тоже меняется
+    response_cache.bump(
+        response_cache.WORKSPACE_RESOURCES + response_cache.TASK_RESOURCES,
+        user_ids)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_responses(sender, instance, raw=False, **kwargs):
+    if not raw:
+        response_cache.invalidate_user(instance.pk)
+
+
+# Рассылка изменений подписчикам SSE (realtime.py); события уходят после
+# фиксации транзакции
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_access_previous', None)
+    # Участники прежнего пространства должны узнать, что задача ушла
+    moved_from = [f'workspace:{previous[1]}'] if (
+        previous and previous[1] not in (None, instance.workspace_id)) else []
+    realtime.publish_tasks(
+        'created' if created else 'updated', [instance.pk], moved_from,
+        instance)
+
+
+@receiver(pre_delete, sender=Task)
+def publish_task_deleted(sender, instance, **kwargs):
+    # До каскадного удаления, пока строки TaskAccess ещё существуют
+    realtime.publish_tasks('deleted', [instance.pk], instance=instance)
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+@receiver(m2m_changed, sender=Task.assignees.through)
+def publish_relation_change(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        task_ids = [instance.pk]
+    elif action == 'post_clear':
+        # Связи запомнены в touch_tasks_on_relation_change на pre_clear
+        task_ids = getattr(instance, '_touch_task_ids', [])
+    else:
+        task_ids = pk_set
+    realtime.publish_tasks('updated', task_ids)
+
+
+@receiver(post_save, sender=Subtask)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Subtask)
+@receiver(post_delete, sender=Comment)
+def publish_child_change(sender, instance, signal, created=False, raw=False,
+                         origin=None, **kwargs):
+    if raw or _cascade_from(origin, Task):
+        return
+    if signal is post_delete:
+        action = 'deleted'
+    else:
+        action = 'created' if created else 'updated'
+    realtime.publish_child(
+        sender._meta.model_name, action, instance,
+        getattr(instance, counters.COUNTED[sender][0]),
+        getattr(instance, '_counter_moved_from', None))
+
+
+@receiver(post_save, sender=Workspace)
+def publish_workspace_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        realtime.publish_workspace(
+            'created' if created else 'updated', instance.pk)
+
+
+@receiver(pre_delete, sender=Workspace)
+def publish_workspace_deleted(sender, instance, **kwargs):
+    realtime.publish_workspace('deleted', instance.pk)
+
+
+@receiver(post_save, sender=WorkspaceMembership)
+def publish_membership_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_access_previous', None)
+    current = (instance.user_id, instance.workspace_id)
+    if created or previous is None or previous == current:
+        realtime.publish_membership(
+            'created' if created else 'updated', *current)
+    else:
+        realtime.publish_membership('deleted', *previous)
+        realtime.publish_membership('created', *current)
+
+
+@receiver(post_delete, sender=WorkspaceMembership)
+def publish_membership_deleted(sender, instance, origin=None, **kwargs):
+    if not _cascade_from(origin, Workspace):
+        realtime.publish_membership(
+            'deleted', instance.user_id, instance.workspace_id)
@@ -0,0 +1,106 @@
+"""
+Сводка по рабочему пространству для главного экрана: количество задач по
+статусам, приоритетам и исполнителям, просроченные и со сроком на этой
+неделе.
+
+Считается двумя запросами: условная агрегация по задачам за один проход
+и GROUP BY по task_assignees. Результат кэшируется по пространству;
+запись задач увеличивает версию кэша пространства, и старая запись
+больше не читается.
+
+Версия должна меняться во всех воркерах сразу, поэтому с кэшем в памяти
+процесса (core.cache.is_shared) сводка не кэшируется и считается на
+каждый запрос.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+from core.cache import is_shared
+from .models import Task
+
+CACHE_TIMEOUT = 60 * 10
+
+
+def _key(workspace_id, suffix):
+    return f'task_planner:workspace-stats:{workspace_id}:{suffix}'
+
+
+def compute(workspace_id, today=None):
+    today = today or timezone.now().date()
+    week_end = today + timedelta(days=6 - today.weekday())
+    Status = Task.Status
+    is_open = ~Q(status=Status.COMPLETED)
+
+    aggregates = {
+        'total': Count('id'),
+        'overdue': Count('id', filter=(
+            Q(status=Status.OVERDUE) |
+            Q(status=Status.ACTIVE, due_date__lt=today))),
+        'due_this_week': Count('id', filter=is_open & Q(
+            due_date__gte=today, due_date__lte=week_end)),
+    }
+    for status in Status:
+        aggregates[f'status_{status.value}'] = Count(
+            'id', filter=Q(status=status))
+    for priority in Task.Priority:
+        aggregates[f'priority_{priority.value}'] = Count(
+            'id', filter=Q(priority=priority))
+    counts = Task.objects.filter(
+        workspace_id=workspace_id).aggregate(**aggregates)
+
+    by_assignee = Task.assignees.through.objects.filter(
+        task__workspace_id=workspace_id
+    ).values('user_id', 'user__username').annotate(
+        total=Count('id'),
+        open=Count('id', filter=~Q(task__status=Status.COMPLETED)),
+    ).order_by('-total', 'user_id')
+
+    return {
+        'workspace': workspace_id,
+        'date': today.isoformat(),
+        'total': counts['total'],
+        'overdue': counts['overdue'],
+        'due_this_week': counts['due_this_week'],
+        'by_status': [
+            {'status': status.value, 'label': status.label,
+             'count': counts[f'status_{status.value}']}
+            for status in Status
+        ],
+        'by_priority': [
+            {'priority': priority.value, 'label': priority.label,
+             'count': counts[f'priority_{priority.value}']}
+            for priority in Task.Priority
+        ],
+        'by_assignee': [
+            {'user': row['user_id'], 'username': row['user__username'],
+             'total': row['total'], 'open': row['open']}
+            for row in by_assignee
+        ],
+    }
+
+
+def workspace_stats(workspace_id):
+    """Сводка из кэша; пересчитывается после записи задач и со сменой дня"""
+    today = timezone.now().date()
+    if not is_shared():
+        return compute(workspace_id, today)
+    version = cache.get_or_set(_key(workspace_id, 'version'), 0, None)
+    key = _key(workspace_id, f'v{version}')
+    stats = cache.get(key)
+    if stats is None or stats['date'] != today.isoformat():
+        stats = compute(workspace_id, today)
+        cache.set(key, stats, CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate(workspace_ids):
+    if not is_shared():
+        return
+    for workspace_id in set(workspace_ids) - {None}:
+        key = _key(workspace_id, 'version')
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
@@ -0,0 +1,171 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import (
+    Tag, Task, TaskAccess, Subtask, Comment, Tombstone, WorkspaceMembership
+)
+
+Kind = Tombstone.Kind
+
+# Запас на запись, начатую до начала синхронизации и закоммиченную после:
+# такие строки придут повторно, но не потеряются
+SYNC_OVERLAP = timedelta(seconds=2)
+
+PRUNE_BATCH_SIZE = 5000
+
+
+def retention_cutoff():
+    """Момент, раньше которого надгробия удаляются, а курсоры устаревают"""
+    return timezone.now() - timedelta(
+        days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def record_task_deleted(task):
+    """Надгробия удалённой задачи: для пространства и для личного доступа"""
+    user_ids = TaskAccess.objects.filter(
+        task=task,
+        reason__in=[TaskAccess.Reason.OWNER, TaskAccess.Reason.ASSIGNEE]
+    ).values_list('user_id', flat=True).distinct()
+    rows = [
+        Tombstone(kind=Kind.TASK, object_id=task.pk, user_id=user_id)
+        for user_id in user_ids
+    ]
+    if task.workspace_id:
+        rows.append(Tombstone(kind=Kind.TASK, object_id=task.pk,
+                              workspace_id=task.workspace_id))
+    Tombstone.objects.bulk_create(rows)
+
+
+def record_child_deleted(kind, instance, task_id):
+    Tombstone.objects.create(kind=kind, object_id=instance.pk, task_id=task_id)
+
+
+def record_tag_deleted(tag):
+    Tombstone.objects.create(
+        kind=Kind.TAG, object_id=tag.pk, user_id=tag.user_id)
+
+
+def record_lost_access(pairs):
+    """
+    Надгробия задач, к которым пользователи потеряли последний доступ;
+    возвращает эти пары (user_id, task_id)
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return set()
+    remaining = set(TaskAccess.objects.filter(
+        user_id__in={user_id for user_id, task_id in pairs},
+        task_id__in={task_id for user_id, task_id in pairs}
+    ).values_list('user_id', 'task_id'))
+    lost = pairs - remaining
+    Tombstone.objects.bulk_create(
+        [
+            Tombstone(kind=Kind.TASK, object_id=task_id, user_id=user_id)
+            for user_id, task_id in lost
+        ],
+        batch_size=1000
+    )
+    return lost
+
+
+def prune_tombstones(cutoff=None):
+    """
+    Удалить надгробия старше срока хранения пачками по первичному ключу:
+    id растут вместе с deleted_at, поэтому старые строки идут первыми
+    """
+    cutoff = cutoff or retention_cutoff()
+    expired = Tombstone.objects.filter(deleted_at__lt=cutoff).order_by('id')
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:PRUNE_BATCH_SIZE])
+        if not ids:
+            return deleted
+        deleted += Tombstone.objects.filter(pk__in=ids).delete()[0]
+
+
+def encode_cursor(since, tombstone_id):
+    payload = json.dumps({'t': since.isoformat(), 's': tombstone_id})
+    return urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Вернуть (момент, id надгробия) или поднять ValueError"""
+    try:
+        payload = json.loads(urlsafe_b64decode(cursor.encode()))
+        since = parse_datetime(payload['t'])
+        tombstone_id = int(payload['s'])
+    except (TypeError, KeyError, ValueError):
+        raise ValueError(cursor)
+    if since is None:
+        raise ValueError(cursor)
+    return since, tombstone_id
+
+
+def changes_since(user, cursor=None):
+    """
+    Изменения, видимые пользователю с момента курсора.
+
+    Изменённые строки находятся по updated_at (и по дате выдачи доступа для
+    задач), удалённые — по журналу Tombstone. Без курсора или с курсором
+    старше срока хранения надгробий возвращается полный снимок с
+    full_resync: клиент заменяет им свои данные целиком.
+    """
+    started_at = timezone.now()
+    last_tombstone = Tombstone.objects.aggregate(last=Max('id'))['last'] or 0
+
+    access = TaskAccess.objects.filter(user=user)
+    task_ids = access.values('task_id')
+    child_task_ids = access.filter(reason__in=[
+        TaskAccess.Reason.OWNER, TaskAccess.Reason.ASSIGNEE
+    ]).values('task_id')
+
+    tasks = Task.objects.filter(id__in=task_ids)
+    subtasks = Subtask.objects.filter(parent_task_id__in=child_task_ids)
+    comments = Comment.objects.filter(task_id__in=task_ids)
+    tags = Tag.objects.filter(user=user)
+    deleted = {f'{kind}s': [] for kind in Kind.values}
+
+    if cursor is not None:
+        since, tombstone_id = decode_cursor(cursor)
+        since -= SYNC_OVERLAP
+        if since < retention_cutoff():
+            # Надгробия после курсора могли быть уже удалены
+            cursor = None
+
+    if cursor is not None:
+        granted = access.filter(granted_at__gte=since).values('task_id')
+        tasks = tasks.filter(Q(updated_at__gte=since) | Q(id__in=granted))
+        subtasks = subtasks.filter(
+            Q(updated_at__gte=since) | Q(parent_task_id__in=granted))
+        comments = comments.filter(
+            Q(updated_at__gte=since) | Q(task_id__in=granted))
+        tags = tags.filter(updated_at__gte=since)
+
+        workspace_ids = WorkspaceMembership.objects.filter(
+            user=user).values('workspace_id')
+        tombstones = Tombstone.objects.filter(
+            id__gt=tombstone_id, id__lte=last_tombstone
+        ).filter(
+            Q(user_id=user.pk) |
+            Q(workspace_id__in=workspace_ids) |
+            # Подзадачи видят только владелец и исполнители задачи
+            Q(task_id__in=task_ids) & ~Q(kind=Kind.SUBTASK) |
+            Q(task_id__in=child_task_ids, kind=Kind.SUBTASK)
+        ).values_list('kind', 'object_id').distinct()
+        for kind, object_id in tombstones:
+            deleted[f'{kind}s'].append(object_id)
+
+    return {
+        'tasks': tasks.with_read_plan(),
+        'subtasks': subtasks.select_related('assignee'),
+        'comments': comments.select_related('author'),
+        'tags': tags,
+        'deleted': deleted,
+        'full_resync': cursor is None,
+        'cursor': encode_cursor(started_at, last_tombstone),
+    }
@@ -1,3 +1,1000 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from users.models import User
+from . import jobs, realtime, roles, search, sync, views
+from .filters import TaskFilterBackend
+from .importer import Importer
+from .models import (
+    Comment, Subtask, Tag, Task, TaskAccess, Tombstone, Workspace,
+    WorkspaceMembership
+)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть только в SQLite')
+class QueryPlanTests(TestCase):
+    """Запросы вьюсетов должны идти по индексам, а не полным сканом"""
+    full_scan = re.compile(r'\bSCAN (?!.*\bUSING\b)\S+')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner', password='password')
+
+    def get_queryset(self, viewset, action='list'):
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        view = viewset(request=request, action=action,
+                       format_kwarg=None, kwargs={})
+        return view.get_queryset()
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertIsNone(self.full_scan.search(plan), plan)
+
+    def test_list_querysets(self):
+        for viewset in [
+            views.TagViewSet,
+            views.WorkspaceViewSet,
+            views.WorkspaceMembershipViewSet,
+            views.TaskViewSet,
+            views.SubtaskViewSet,
+            views.CommentViewSet,
+        ]:
+            with self.subTest(viewset=viewset.__name__):
+                self.assertUsesIndex(self.get_queryset(viewset))
+
+    def test_task_actions(self):
+        self.assertUsesIndex(
+            self.get_queryset(views.TaskViewSet, 'personal')
+            .filter(workspace__isnull=True))
+        self.assertUsesIndex(
+            self.get_queryset(views.TaskViewSet, 'workspace_tasks')
+            .filter(workspace_id=1))
+
+    def test_task_filters(self):
+        request = APIRequestFactory().get('/', {
+            'status': '1,3',
+            'priority': '2',
+            'tag': '1',
+            'assignee': '1',
+            'due_date_after': '2030-01-01',
+            'deadline_before': '2030-12-31',
+        })
+        queryset = TaskFilterBackend().filter_queryset(
+            Request(request), self.get_queryset(views.TaskViewSet), None)
+        self.assertUsesIndex(queryset)
+
+    def test_task_orderings(self):
+        queryset = self.get_queryset(views.TaskViewSet)
+        for ordering in TaskFilterBackend.orderings.values():
+            with self.subTest(ordering=ordering):
+                self.assertUsesIndex(queryset.order_by(*ordering))
+
+
+class BulkOperationTests(TestCase):
+    """
+    Пакетные операции обходят сигналы моделей; индекс доступа, счётчики,
+    поисковый индекс и журнал удалений должны совпадать с одиночными
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('bulk_owner', password='password')
+        cls.member = User.objects.create_user('bulk_member', password='password')
+        cls.assignee = User.objects.create_user(
+            'bulk_assignee', password='password')
+        cls.workspace = Workspace.objects.create(title='ws', owner=cls.owner)
+        for user, role in ((cls.owner, WorkspaceMembership.Role.OWNER),
+                           (cls.member, WorkspaceMembership.Role.MEMBER)):
+            WorkspaceMembership.objects.create(
+                user=user, workspace=cls.workspace, role=role)
+        cls.tag = Tag.objects.create(title='срочно', user=cls.owner)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def snapshot(self, task_id):
+        task = Task.objects.get(pk=task_id)
+        state = {
+            'access': set(TaskAccess.objects.filter(task_id=task_id)
+                          .values_list('user_id', 'reason')),
+            'counters': (task.subtasks_count, task.comments_count,
+                         task.assignees_count),
+        }
+        if search.is_enabled():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT title, body, tags FROM {search.TABLE} '
+                    'WHERE rowid = %s', [search._rowid('task', task_id)])
+                state['search'] = cursor.fetchall()
+        return state
+
+    def assertSameState(self, single_id, bulk_id):
+        single, bulk = self.snapshot(single_id), self.snapshot(bulk_id)
+        self.assertEqual(single, bulk)
+        return single
+
+    def bulk(self, operations):
+        response = self.client.post(
+            '/api/tasks/tasks/bulk/', operations, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [result['id'] for result in response.data]
+
+    def test_create_update_delete(self):
+        data = {
+            'title': 'Отчёт', 'description': 'квартальный',
+            'workspace': self.workspace.pk,
+            'tags': [self.tag.pk], 'assignees': [self.assignee.pk],
+        }
+        response = self.client.post('/api/tasks/tasks/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        single_id = Task.objects.latest('id').pk
+        [bulk_id] = self.bulk([{'op': 'create', 'data': data}])
+        state = self.assertSameState(single_id, bulk_id)
+        self.assertEqual(state['access'], {
+            (self.owner.pk, TaskAccess.Reason.OWNER),
+            (self.owner.pk, TaskAccess.Reason.MEMBER),
+            (self.member.pk, TaskAccess.Reason.MEMBER),
+            (self.assignee.pk, TaskAccess.Reason.ASSIGNEE),
+        })
+        self.assertEqual(state['counters'], (0, 0, 1))
+
+        changes = {'title': 'Итоги', 'assignees': [self.member.pk]}
+        response = self.client.patch(
+            f'/api/tasks/tasks/{single_id}/', changes, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.bulk([{'op': 'update', 'id': bulk_id, 'data': changes}])
+        state = self.assertSameState(single_id, bulk_id)
+        self.assertNotIn(
+            (self.assignee.pk, TaskAccess.Reason.ASSIGNEE), state['access'])
+        if search.is_enabled():
+            self.assertEqual(state['search'], [('Итоги', 'квартальный', 'срочно')])
+
+        tombstones = Tombstone.objects.values_list(
+            'kind', 'user_id', 'workspace_id')
+        lost = set(tombstones.filter(object_id=single_id))
+        bulk_lost = set(tombstones.filter(object_id=bulk_id))
+        self.assertEqual(lost, bulk_lost)
+
+        response = self.client.delete(f'/api/tasks/tasks/{single_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.bulk([{'op': 'delete', 'id': bulk_id}])
+        self.assertFalse(TaskAccess.objects.filter(
+            task_id__in=[single_id, bulk_id]).exists())
+        if search.is_enabled():
+            self.assertEqual(search.match_ids('task', 'Итоги'), [])
+        deleted = set(tombstones.filter(object_id=single_id)) - lost
+        self.assertEqual(
+            deleted, set(tombstones.filter(object_id=bulk_id)) - bulk_lost)
+        self.assertIn(
+            (Tombstone.Kind.TASK, None, self.workspace.pk), deleted)
+
+    def test_invalid_operation_writes_nothing(self):
+        response = self.client.post('/api/tasks/tasks/bulk/', [
+            {'op': 'create', 'data': {'title': 'ok'}},
+            {'op': 'create', 'data': {'title': ''}},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('errors', response.data[1])
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(TaskAccess.objects.exists())
+
+    def test_id_must_be_integer(self):
+        task = Task.objects.create(title='Задача', owner=self.owner)
+        response = self.client.post('/api/tasks/tasks/bulk/', [
+            {'op': 'update', 'id': str(task.pk), 'data': {'title': 'new'}},
+            {'op': 'delete', 'id': True},
+            {'op': 'delete', 'id': task.pk + 1000},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [result['errors'] for result in response.data], [
+                {'id': ['Ожидается целое число']},
+                {'id': ['Ожидается целое число']},
+                {'id': ['Задача не найдена']},
+            ])
+        task.refresh_from_db()
+        self.assertEqual(task.title, 'Задача')
+
+
+class SyncTests(TestCase):
+    """Дельта-синхронизация: изменения после курсора и надгробия"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('sync_owner', password='password')
+        cls.member = User.objects.create_user('sync_member', password='password')
+        cls.workspace = Workspace.objects.create(title='ws', owner=cls.owner)
+        for user in (cls.owner, cls.member):
+            WorkspaceMembership.objects.create(user=user, workspace=cls.workspace)
+        cls.task = Task.objects.create(
+            title='Задача', owner=cls.owner, workspace=cls.workspace)
+
+    def fetch(self, user, cursor=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(
+            '/api/tasks/sync/', {'since': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+
+    def ids(self, rows):
+        return [row['id'] for row in rows]
+
+    def test_delta(self):
+        other = Task.objects.create(
+            title='Другая', owner=self.owner, workspace=self.workspace)
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.update(updated_at=hour_ago)
+        TaskAccess.objects.update(granted_at=hour_ago)
+        snapshot = self.fetch(self.member)
+        self.assertTrue(snapshot['full_resync'])
+        self.assertCountEqual(
+            self.ids(snapshot['tasks']), [self.task.pk, other.pk])
+
+        comment = Comment.objects.create(
+            task=self.task, author=self.owner, text='первый')
+        comment_id = comment.pk
+        comment.delete()
+        other.title = 'Изменена'
+        other.save()
+        changes = self.fetch(self.member, snapshot['cursor'])
+        self.assertFalse(changes['full_resync'])
+        self.assertEqual(self.ids(changes['tasks']), [other.pk])
+        self.assertEqual(changes['deleted']['comments'], [comment_id])
+
+        task_id = self.task.pk
+        self.task.delete()
+        changes = self.fetch(self.member, changes['cursor'])
+        self.assertEqual(changes['deleted']['tasks'], [task_id])
+
+    def test_subtask_tombstones_follow_subtask_visibility(self):
+        cursor = self.fetch(self.member)['cursor']
+        subtask = Subtask.objects.create(title='Шаг', parent_task=self.task)
+        subtask_id = subtask.pk
+        subtask.delete()
+        self.assertEqual(
+            self.fetch(self.owner, cursor)['deleted']['subtasks'], [subtask_id])
+        self.assertEqual(self.fetch(self.member, cursor)['deleted']['subtasks'], [])
+
+    def test_expired_cursor_gets_full_resync(self):
+        cursor = self.fetch(self.member)['cursor']
+        Comment.objects.create(task=self.task, author=self.owner, text='x').delete()
+        expired = timezone.now() - timedelta(
+            days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+        Tombstone.objects.update(deleted_at=expired)
+        self.assertEqual(sync.prune_tombstones(), 1)
+        self.assertFalse(Tombstone.objects.exists())
+
+        self.assertFalse(self.fetch(self.member, cursor)['full_resync'])
+        old_cursor = sync.encode_cursor(expired, 0)
+        changes = self.fetch(self.member, old_cursor)
+        self.assertTrue(changes['full_resync'])
+        self.assertEqual(self.ids(changes['tasks']), [self.task.pk])
+
+
+@skipUnless(search.is_enabled(), 'FTS5 есть только в SQLite')
+class SearchTests(TestCase):
+    def test_limit_is_clamped(self):
+        user = User.objects.create_user('searcher', password='password')
+        for number in range(3):
+            Task.objects.create(title=f'отчёт {number}', owner=user)
+        client = APIClient()
+        client.force_authenticate(user)
+        for limit, expected in (('-1', 1), ('0', 1), ('2', 2), ('x', 3)):
+            with self.subTest(limit=limit):
+                response = client.get(
+                    '/api/tasks/search/', {'q': 'отчёт', 'limit': limit})
+                self.assertEqual(len(response.data['results']), expected)
+
+
+class ImporterTests(TestCase):
+    def test_malformed_nested_records_fail_only_their_row(self):
+        User.objects.create_user('importer', password='password')
+        rows = [
+            {'owner': 'importer', 'title': 'до', 'subtasks': [{'title': 'шаг'}]},
+            {'owner': 'importer', 'title': 'a', 'subtasks': ['oops']},
+            {'owner': 'importer', 'title': 'b', 'subtasks': 'abc'},
+            {'owner': 'importer', 'title': 'c', 'comments': {'text': 'x'}},
+            {'owner': 'importer', 'title': 'после'},
+        ]
+        importer = Importer()
+        importer.import_stream(
+            io.StringIO('\n'.join(json.dumps(row) for row in rows)), 'ndjson')
+        self.assertEqual(importer.counts['errors'], 3)
+        self.assertEqual(len(importer.errors), 3)
+        self.assertCountEqual(
+            Task.objects.values_list('title', flat=True), ['до', 'после'])
+        self.assertEqual(Subtask.objects.get().parent_task.title, 'до')
+
+
+class CounterTests(TestCase):
+    def test_stale_save_keeps_counters(self):
+        owner = User.objects.create_user('counter_owner', password='password')
+        workspace = Workspace.objects.create(title='ws', owner=owner)
+        task = Task.objects.create(title='Задача', owner=owner, workspace=workspace)
+        stale_task = Task.objects.get(pk=task.pk)
+        stale_workspace = Workspace.objects.get(pk=workspace.pk)
+
+        Subtask.objects.create(title='Шаг', parent_task=task)
+        Comment.objects.create(task=task, author=owner, text='текст')
+        task.assignees.add(owner)
+        WorkspaceMembership.objects.create(user=owner, workspace=workspace)
+
+        stale_task.title = 'Новое название'
+        stale_task.save()
+        stale_workspace.title = 'Новое пространство'
+        stale_workspace.save()
+
+        task.refresh_from_db()
+        workspace.refresh_from_db()
+        self.assertEqual(task.title, 'Новое название')
+        self.assertEqual(
+            (task.subtasks_count, task.comments_count, task.assignees_count),
+            (1, 1, 1))
+        self.assertEqual(workspace.title, 'Новое пространство')
+        self.assertEqual(workspace.members_count, 1)
+
+
+class RoleCacheTests(TestCase):
+    """Роли кэшируются между запросами только в общем кэше"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('role_user', password='password')
+        self.workspace = Workspace.objects.create(title='ws', owner=self.user)
+        WorkspaceMembership.objects.create(
+            user=self.user, workspace=self.workspace,
+            role=WorkspaceMembership.Role.ADMIN)
+
+    def demote(self):
+        # Мимо сигналов: так смена роли выглядит для другого процесса
+        WorkspaceMembership.objects.filter(user=self.user).update(
+            role=WorkspaceMembership.Role.MEMBER)
+
+    @override_settings(CACHE_SHARED=None)
+    def test_process_local_cache_is_not_used(self):
+        self.assertEqual(
+            roles.get_role(self.user.pk, self.workspace.pk), roles.Role.ADMIN)
+        self.demote()
+        self.assertEqual(
+            roles.get_role(self.user.pk, self.workspace.pk), roles.Role.MEMBER)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_shared_cache_is_used(self):
+        roles.get_role(self.user.pk, self.workspace.pk)
+        self.demote()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                roles.get_role(self.user.pk, self.workspace.pk),
+                roles.Role.ADMIN)
+
+
+class ResponseCacheTests(TestCase):
+    """Ответы кэшируются только там, где смену поколения видят все процессы"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('cache_owner', password='password')
+        self.member = User.objects.create_user('cache_member', password='password')
+        workspace = Workspace.objects.create(title='ws', owner=self.owner)
+        self.membership = WorkspaceMembership.objects.create(
+            user=self.member, workspace=workspace)
+        Task.objects.create(title='Задача', owner=self.owner, workspace=workspace)
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def workspace_tasks(self):
+        response = self.client.get(
+            '/api/tasks/tasks/workspace_tasks/',
+            {'workspace_id': self.membership.workspace_id})
+        return response.get('X-Cache'), len(response.data['results'])
+
+    @override_settings(CACHE_SHARED=None)
+    def test_process_local_cache_is_bypassed(self):
+        self.assertEqual(self.workspace_tasks(), (None, 1))
+        self.assertEqual(self.workspace_tasks(), (None, 1))
+
+    @override_settings(CACHE_SHARED=True)
+    def test_removed_member_misses_cache(self):
+        self.assertEqual(self.workspace_tasks(), ('MISS', 1))
+        self.assertEqual(self.workspace_tasks(), ('HIT', 1))
+        self.membership.delete()
+        self.assertEqual(self.workspace_tasks(), ('MISS', 0))
+
+    @override_settings(CACHE_SHARED=True)
+    def test_user_profile_change_misses_cache(self):
+        self.assertEqual(self.workspace_tasks(), ('MISS', 1))
+        self.owner.first_name = 'Иван'
+        self.owner.save()
+        response = self.client.get(
+            '/api/tasks/tasks/workspace_tasks/',
+            {'workspace_id': self.membership.workspace_id})
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(
+            response.data['results'][0]['owner']['first_name'], 'Иван')
+
+
+class RealtimeChannelTests(TestCase):
+    def test_subtask_events_skip_workspace_channel(self):
+        owner = User.objects.create_user('rt_owner', password='password')
+        assignee = User.objects.create_user('rt_assignee', password='password')
+        member = User.objects.create_user('rt_member', password='password')
+        workspace = Workspace.objects.create(title='ws', owner=owner)
+        WorkspaceMembership.objects.create(user=member, workspace=workspace)
+        task = Task.objects.create(title='Задача', owner=owner, workspace=workspace)
+        task.assignees.add(assignee)
+
+        self.assertEqual(
+            realtime.child_channels('subtask', [task.pk]),
+            {f'user:{owner.pk}', f'user:{assignee.pk}'})
+        self.assertIn(
+            f'workspace:{workspace.pk}',
+            realtime.child_channels('comment', [task.pk]))
+
+
+class ConditionalListTests(TestCase):
+    """ETag списка меняется вместе со вложенными пользователями и датой"""
+
+    def setUp(self):
+        self.owner = User.objects.create_user('etag_owner', password='password')
+        self.assignee = User.objects.create_user(
+            'etag_assignee', password='password')
+        workspace = Workspace.objects.create(title='ws', owner=self.owner)
+        task = Task.objects.create(title='Задача', owner=self.owner, workspace=workspace)
+        task.assignees.add(self.assignee)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def assertStale(self, url, change):
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_assignee_rename(self):
+        def rename():
+            self.assignee.username = 'renamed'
+            self.assignee.save()
+
+        response = self.assertStale('/api/tasks/tasks/', rename)
+        self.assertEqual(
+            response.data['results'][0]['assignees'][0]['username'], 'renamed')
+
+    def test_workspace_owner_profile(self):
+        def update_profile():
+            self.owner.first_name = 'Иван'
+            self.owner.save()
+
+        response = self.assertStale('/api/tasks/workspaces/', update_profile)
+        self.assertEqual(
+            response.data['results'][0]['owner']['first_name'], 'Иван')
+
+    def test_new_day(self):
+        tomorrow = timezone.now() + timedelta(days=1)
+
+        def midnight():
+            patcher = mock.patch.object(views.timezone, 'now', return_value=tomorrow)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.assertStale('/api/tasks/tasks/', midnight)
+
+
+class WorkspaceStatsTests(TestCase):
+    """Сводка пространства пересчитывается после записи задач"""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('stats_owner', password='password')
+        self.workspace = Workspace.objects.create(title='ws', owner=self.owner)
+        self.task = Task.objects.create(
+            title='Задача', owner=self.owner, workspace=self.workspace)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def completed(self):
+        response = self.client.get(
+            f'/api/tasks/workspaces/{self.workspace.pk}/stats/')
+        self.assertEqual(response.status_code, 200)
+        by_status = {row['status']: row['count']
+                     for row in response.data['by_status']}
+        return by_status[Task.Status.COMPLETED]
+
+    @override_settings(CACHE_SHARED=True)
+    def test_task_save_invalidates(self):
+        self.assertEqual(self.completed(), 0)
+        self.task.status = Task.Status.COMPLETED
+        self.task.save()
+        self.assertEqual(self.completed(), 1)
+        Task.objects.create(
+            title='Ещё', owner=self.owner, workspace=self.workspace,
+            status=Task.Status.COMPLETED)
+        self.assertEqual(self.completed(), 2)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_shared_cache_is_used(self):
+        self.completed()
+        # Мимо сигналов версия не меняется: ответ берётся из кэша
+        Task.objects.update(status=Task.Status.COMPLETED)
+        self.assertEqual(self.completed(), 0)
+
+    @override_settings(CACHE_SHARED=None)
+    def test_process_local_cache_is_not_used(self):
+        self.completed()
+        Task.objects.update(status=Task.Status.COMPLETED)
+        self.assertEqual(self.completed(), 1)
+        self.assertIsNone(cache.get(
+            f'task_planner:workspace-stats:{self.workspace.pk}:version'))
+
+
+class SignalQueryTests(TestCase):
+    """
+    Приёмники сигналов не пишут ничего лишнего: сохранение без изменений
+    отслеживаемых полей не трогает индексы, а каналы событий, поколения
+    кэша и получатели уведомлений разрешаются одним запросом на запись
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('signal_owner', password='password')
+        cls.workspace = Workspace.objects.create(title='ws', owner=cls.owner)
+        WorkspaceMembership.objects.create(
+            user=cls.owner, workspace=cls.workspace,
+            role=WorkspaceMembership.Role.OWNER)
+
+    def setUp(self):
+        self.task = Task.objects.get(pk=Task.objects.create(
+            title='Задача', owner=self.owner, workspace=self.workspace).pk)
+
+    def search_queries(self, count):
+        return count if search.is_enabled() else 0
+
+    def test_plain_task_save(self):
+        # UPDATE и аудитория задачи для события task.updated
+        with self.assertNumQueries(2):
+            self.task.save()
+
+    def test_task_rename(self):
+        self.task.title = 'Переименована'
+        # + тэги задачи, DELETE и INSERT в поисковом индексе
+        with self.assertNumQueries(2 + self.search_queries(3)):
+            self.task.save()
+
+    @override_settings(CACHE_SHARED=True)
+    def test_shared_cache_reuses_audience(self):
+        with self.assertNumQueries(2):
+            self.task.save()
+
+    def test_comment_create(self):
+        # SAVEPOINT, INSERT, счётчик задачи, аудитория, RELEASE
+        with self.assertNumQueries(5 + self.search_queries(2)):
+            Comment.objects.create(
+                task=self.task, author=self.owner, text='текст')
+
+
+class JobsTests(TestCase):
+    """Периодические задачи запускаются только явно"""
+
+    def test_registry(self):
+        self.assertIn('overdue', jobs.registered(worker_only=False))
+        self.assertIn('notification-digest', jobs.registered(worker_only=True))
+
+    def test_run_jobs_rejects_worker_jobs(self):
+        with self.assertRaises(CommandError):
+            call_command('run_jobs', 'notification-digest')
+        with self.assertRaises(CommandError):
+            call_command('run_jobs', 'missing')
+
+    @override_settings(TASK_OVERDUE_SWEEP_INTERVAL=None)
+    def test_disabled_job_is_not_started(self):
+        self.assertIsNone(jobs.start('overdue'))
+        with self.assertRaises(CommandError):
+            call_command('run_jobs')
+
+
+class ListQueryCountTests(TestCase):
+    """Число запросов списка не растёт с размером страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('list_owner', password='password')
+        cls.members = [
+            User.objects.create_user(f'list_member{n}', password='password')
+            for n in range(3)]
+        workspaces = [
+            Workspace.objects.create(title=f'ws {n}', owner=cls.owner)
+            for n in range(3)]
+        for workspace in workspaces:
+            for user in [cls.owner] + cls.members:
+                WorkspaceMembership.objects.create(user=user, workspace=workspace)
+        cls.workspace = workspaces[0]
+        tags = [Tag.objects.create(title=f'тег {n}', user=cls.owner)
+                for n in range(3)]
+        for n in range(12):
+            task = Task.objects.create(
+                title=f'Задача {n}', owner=cls.owner,
+                workspace=cls.workspace if n % 2 else None)
+            task.tags.set(tags[:n % 3 + 1])
+            task.assignees.set(cls.members[:n % 3 + 1])
+            Subtask.objects.create(
+                title='Подзадача', parent_task=task, assignee=cls.members[0])
+            Comment.objects.create(task=task, author=cls.members[n % 3], text='текст')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def assertFlat(self, url, params=None):
+        params = dict(params or {})
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(url, {**params, 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        with self.assertNumQueries(len(small)):
+            response = self.client.get(url, {**params, 'page_size': 100})
+        self.assertGreater(len(response.data['results']), 1)
+
+    def test_task_lists(self):
+        for url, params in (
+                ('/api/tasks/tasks/', {}),
+                ('/api/tasks/tasks/', {'ordering': '-due_date'}),
+                ('/api/tasks/tasks/personal/', {}),
+                ('/api/tasks/tasks/workspace_tasks/',
+                 {'workspace_id': self.workspace.pk})):
+            with self.subTest(url=url, **params):
+                self.assertFlat(url, params)
+
+    def test_child_lists(self):
+        for url in ('/api/tasks/subtasks/', '/api/tasks/comments/'):
+            with self.subTest(url=url):
+                self.assertFlat(url)
+
+    def test_workspace_lists(self):
+        for url in ('/api/tasks/workspaces/', '/api/tasks/workspace-memberships/'):
+            with self.subTest(url=url):
+                self.assertFlat(url)
+
+
+class KeysetPaginationTests(TestCase):
+    """Курсоры проходят список вперёд и назад без пропусков и повторов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('keyset_owner', password='password')
+        today = timezone.now().date()
+        for n in range(9):
+            # Повторы и NULL в полях сортировки: порядок решает id
+            task = Task.objects.create(
+                title=f'Задача {n}', owner=cls.owner,
+                priority=n % 3 + 1,
+                due_date=today + timedelta(days=n % 4) if n % 3 else None,
+                deadline=today + timedelta(days=n % 2) if n % 4 else None)
+            Comment.objects.create(task=task, author=cls.owner, text='текст')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def walk(self, url, params, link):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200, response.data)
+            pages.append([row['id'] for row in response.data['results']])
+            if response.data[link] is None:
+                return pages, response
+            response = self.client.get(response.data[link])
+
+    def assertPages(self, url, params, expected):
+        forward, last = self.walk(url, {**params, 'page_size': 2}, 'next')
+        self.assertEqual(sum(forward, []), expected)
+        self.assertTrue(all(len(page) == 2 for page in forward[:-1]))
+        self.assertIsNone(self.client.get(url, params).data['previous'])
+
+        backward, first = self.walk(last.data['previous'], {}, 'previous')
+        self.assertEqual(sum(reversed(backward), []) + forward[-1], expected)
+        self.assertIsNotNone(first.data['next'])
+
+    def test_every_task_ordering(self):
+        for ordering, fields in TaskFilterBackend.orderings.items():
+            with self.subTest(ordering=ordering):
+                expected = list(Task.objects.order_by(*fields).values_list(
+                    'id', flat=True))
+                self.assertPages(
+                    '/api/tasks/tasks/', {'ordering': ordering}, expected)
+
+    def test_default_orderings(self):
+        self.assertPages(
+            '/api/tasks/tasks/personal/', {},
+            list(Task.objects.values_list('id', flat=True)))
+        self.assertPages(
+            '/api/tasks/comments/', {},
+            list(Comment.objects.values_list('id', flat=True)))
+
+    def test_bad_cursor(self):
+        for cursor in ('garbage', 'e30=', 'eyJ2IjogWzFdfQ=='):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    '/api/tasks/tasks/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsTests(TestCase):
+    """?fields=, ?omit= и ?expand= меняют и ответ, и план запросов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('sparse_owner', password='password')
+        cls.assignee = User.objects.create_user(
+            'sparse_assignee', password='password')
+        cls.task = Task.objects.create(title='Задача', owner=cls.owner)
+        cls.task.assignees.add(cls.assignee)
+        cls.task.tags.add(Tag.objects.create(title='тег', user=cls.owner))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get_task(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/tasks/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0], len(queries)
+
+    def test_fields(self):
+        full, full_queries = self.get_task()
+        task, queries = self.get_task(fields='id,title,owner.username')
+        self.assertEqual(task, {
+            'id': self.task.pk, 'title': 'Задача',
+            'owner': {'username': 'sparse_owner'}})
+        # Без тегов и исполнителей их запросы не выполняются
+        self.assertLess(queries, full_queries)
+
+    def test_omit(self):
+        full, full_queries = self.get_task()
+        task, queries = self.get_task(omit='tags,assignees,owner.bio')
+        self.assertEqual(
+            set(task), set(full) - {'tags', 'assignees'})
+        self.assertNotIn('bio', task['owner'])
+        self.assertLess(queries, full_queries)
+
+    def test_expand(self):
+        task, queries = self.get_task(
+            fields='id,owner,assignees', expand='assignees')
+        self.assertEqual(task['owner'], self.owner.pk)
+        self.assertEqual(
+            [user['username'] for user in task['assignees']],
+            ['sparse_assignee'])
+
+    def test_writes_ignore_sparse_params(self):
+        response = self.client.post(
+            '/api/tasks/tasks/?fields=id', {'title': 'Новая'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertIn('title', response.data)
+
+
+class RowReaderParityTests(TestCase):
+    """RowReader собирает те же словари, что и сериализаторы DRF"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            'rows_owner', password='password', first_name='Иван',
+            photo='users/photos/owner.jpg')
+        cls.assignee = User.objects.create_user(
+            'rows_assignee', password='password', bio='о себе')
+        workspace = Workspace.objects.create(title='ws', owner=cls.owner)
+        tags = [Tag.objects.create(title=f'тег {n}', user=cls.owner)
+                for n in range(2)]
+        yesterday = timezone.now().date() - timedelta(days=1)
+        overdue = Task.objects.create(
+            title='Просрочена', description='текст', owner=cls.owner,
+            workspace=workspace, due_date=yesterday,
+            deadline=timezone.now())
+        overdue.tags.set(tags)
+        overdue.assignees.set([cls.owner, cls.assignee])
+        personal = Task.objects.create(title='Личная', owner=cls.owner)
+        for task in (overdue, personal):
+            Subtask.objects.create(title='С исполнителем', parent_task=task,
+                                   assignee=cls.assignee)
+            Subtask.objects.create(title='Без исполнителя', parent_task=task)
+            Comment.objects.create(task=task, author=cls.assignee, text='текст')
+
+    def assertParity(self, viewset, params):
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = self.owner
+        view = viewset(request=request, action='list',
+                       format_kwarg=None, kwargs={})
+        queryset = view.get_queryset().order_by('pk')
+        expected = view.get_serializer(queryset, many=True).data
+        reader = views.RowReader(view.get_serializer())
+        rendered = reader.render(reader.values(queryset))
+        self.assertEqual(len(rendered), queryset.count())
+        self.assertEqual([list(item) for item in rendered],
+                         [list(item) for item in expected])
+        self.assertEqual(json.loads(json.dumps(rendered)),
+                         json.loads(json.dumps(expected)))
+
+    def test_parity(self):
+        for viewset in (views.TaskViewSet, views.SubtaskViewSet,
+                        views.CommentViewSet):
+            for params in ({}, {'fields': 'id,title,text,owner.username,'
+                                          'assignee.photo_url,author.id'},
+                           {'omit': 'owner,tags'}, {'expand': 'assignees'}):
+                with self.subTest(viewset=viewset.__name__, **params):
+                    self.assertParity(viewset, params)
+
+
+class ExportTests(TestCase):
+    """Выгрузка NDJSON/CSV: видимые задачи, их связи и права на подзадачи"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('export_owner', password='password')
+        cls.member = User.objects.create_user('export_member', password='password')
+        workspace = Workspace.objects.create(title='ws', owner=cls.owner)
+        WorkspaceMembership.objects.create(user=cls.member, workspace=workspace)
+        tag = Tag.objects.create(title='срочно', user=cls.owner)
+        cls.tasks = []
+        for n in range(3):
+            task = Task.objects.create(
+                title=f'Задача {n}', owner=cls.owner, workspace=workspace,
+                due_date=date(2030, 1, n + 1))
+            task.tags.add(tag)
+            task.assignees.add(cls.owner)
+            Subtask.objects.create(title='Подзадача', parent_task=task)
+            Comment.objects.create(task=task, author=cls.member, text='текст')
+            cls.tasks.append(task)
+        Task.objects.create(title='Чужая личная', owner=cls.member)
+
+    def export(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/tasks/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson(self):
+        response, content = self.export(self.owner)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        tasks = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([task['id'] for task in tasks],
+                         [task.pk for task in self.tasks])
+        first = tasks[0]
+        self.assertEqual(
+            (first['owner'], first['tags'], first['assignees'],
+             first['due_date']),
+            ('export_owner', ['срочно'], ['export_owner'], '2030-01-01'))
+        self.assertEqual(len(first['subtasks']), 1)
+        self.assertEqual(first['comments'][0]['author'], 'export_member')
+
+    def test_member_gets_no_subtasks(self):
+        response, content = self.export(self.member, workspace=self.tasks[0].workspace_id)
+        tasks = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(tasks), 3)
+        self.assertTrue(all(task['subtasks'] == [] for task in tasks))
+        self.assertTrue(all(len(task['comments']) == 1 for task in tasks))
+
+    def test_csv(self):
+        response, content = self.export(self.owner, type='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(
+            [row['record'] for row in rows[:3]], ['task', 'subtask', 'comment'])
+        self.assertEqual(len(rows), 9)
+        self.assertEqual(rows[0]['tags'], 'срочно')
+        self.assertEqual(rows[2]['task_id'], str(self.tasks[0].pk))
+
+    def test_gzip(self):
+        response, content = self.export(self.owner, gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('tasks.ndjson.gz', response['Content-Disposition'])
+        plain = self.export(self.owner)[1]
+        self.assertEqual(gzip.decompress(content), plain)
+
+    def test_unknown_format(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.get('/api/tasks/export/', {'type': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_matches_api(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tasks.ndjson')
+            call_command('export_tasks', user='export_member', batch_size=1,
+                         output=path, stderr=io.StringIO())
+            with open(path, 'rb') as output:
+                self.assertEqual(output.read(), self.export(self.member)[1])
+
+
+class AsyncEndpointTests(TestCase):
+    """Асинхронные списки отдают то же, что и синхронные"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('async_owner', password='password')
+        cls.member = User.objects.create_user('async_member', password='password')
+        cls.workspace = Workspace.objects.create(title='ws', owner=cls.owner)
+        Workspace.objects.create(title='ещё', owner=cls.owner)
+        WorkspaceMembership.objects.create(user=cls.member, workspace=cls.workspace)
+        tag = Tag.objects.create(title='тег', user=cls.owner)
+        for n in range(5):
+            task = Task.objects.create(
+                title=f'Задача {n}', owner=cls.owner, priority=n % 3 + 1,
+                workspace=cls.workspace if n % 2 else None,
+                due_date=timezone.now().date() - timedelta(days=n - 2))
+            task.tags.add(tag)
+            task.assignees.add(cls.member)
+        cls.token = Token.objects.create(user=cls.owner)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get(self, path, params):
+        response = self.client.get(path, params)
+        content = (b''.join(response.streaming_content)
+                   if response.streaming else response.content)
+        return response.status_code, json.loads(content)
+
+    def cursor(self, link):
+        return link and parse_qs(urlparse(link).query).get('cursor')
+
+    def assertSame(self, sync_path, async_path, params):
+        sync_status, sync_data = self.get(sync_path, params)
+        async_status, async_data = self.get(async_path, params)
+        self.assertEqual(async_status, sync_status)
+        if sync_status != 200 or 'results' not in sync_data:
+            self.assertEqual(async_data, sync_data)
+            return
+        self.assertEqual(async_data['results'], sync_data['results'])
+        for link in ('next', 'previous'):
+            self.assertEqual(self.cursor(async_data[link]),
+                             self.cursor(sync_data[link]))
+
+    def test_task_lists(self):
+        for action, params in (
+                ('', {}),
+                ('', {'ordering': '-due_date', 'page_size': 2}),
+                ('', {'fields': 'id,title,assignees.username', 'status': '1'}),
+                ('', {'ordering': 'bad'}),
+                ('personal/', {'page_size': 1}),
+                ('workspace_tasks/', {'workspace_id': self.workspace.pk}),
+                ('workspace_tasks/', {})):
+            with self.subTest(action=action, **params):
+                self.assertSame(f'/api/tasks/tasks/{action}',
+                                f'/api/tasks/async/tasks/{action}', params)
+
+    def test_workspaces_and_profile(self):
+        self.assertSame('/api/tasks/workspaces/', '/api/tasks/async/workspaces/',
+                        {'page_size': 1})
+        self.assertSame('/api/auth/profile/', '/api/auth/async/profile/',
+                        {'omit': 'bio'})
+
+    def test_anonymous(self):
+        self.client.credentials()
+        self.assertSame('/api/tasks/tasks/', '/api/tasks/async/tasks/', {})
@@ -12,5 +12,17 @@ router.register('subtasks', views.SubtaskViewSet, basename='subtask')
 router.register('comments', views.CommentViewSet, basename='comment')
 
 urlpatterns = [
+    path('sync/', views.sync_changes, name='sync'),
+    path('search/', views.search_tasks, name='search'),
+    path('export/', views.export_tasks, name='export'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
+    path('events/', views.events_stream, name='events'),
+    path('async/tasks/', views.async_task_list, name='async_task_list'),
+    path('async/tasks/personal/', views.async_personal_tasks,
+         name='async_personal_tasks'),
+    path('async/tasks/workspace_tasks/', views.async_workspace_tasks,
+         name='async_workspace_tasks'),
+    path('async/workspaces/', views.async_workspace_list,
+         name='async_workspace_list'),
     path('', include(router.urls)),
 ]
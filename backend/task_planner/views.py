@@ -1,10 +1,28 @@
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from core.async_views import async_api_view, json_response
+from core.cache import is_shared
+from core.renderers import JSONStream, StreamingJSONResponse
+from core.serializers import rendered_fields
 from users.models import User
-from .models import Tag, Workspace, WorkspaceMembership, Task, Subtask, Comment
+from . import export, realtime, response_cache, search, stats, sync
+from .conditional import conditional_list
+from .filters import TaskFilterBackend
+from .pagination import KeysetPagination
+from .permissions import IsWorkspaceAdmin
+from .response_cache import ResponseCacheMixin, cached_response
+from .rows import RowReader
+from .models import (
+    Tag, Workspace, WorkspaceMembership, Task, TaskAccess, Subtask, Comment
+)
 from .serializers import (
     TagSerializer, WorkspaceSerializer, WorkspaceDetailSerializer,
     WorkspaceMembershipSerializer, TaskSerializer, TaskCreateSerializer,
@@ -13,32 +31,106 @@ from .serializers import (
 )
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class RowListMixin:
+    """
+    Списки отдаются через RowReader: строки values() вместо экземпляров
+    моделей и полей сериализатора. Структура ответа та же. Список без
+    пагинации в JSON отдаётся потоком, пачками строк.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.paginated_response(queryset)
+
+    def paginated_response(self, queryset):
+        reader = RowReader(self.get_serializer())
+        page = self.paginate_queryset(reader.values(queryset))
+        if page is not None:
+            return self.get_paginated_response(reader.render(page))
+        if isinstance(self.request.accepted_renderer, JSONRenderer):
+            return StreamingJSONResponse(
+                JSONStream(reader.render_batches(queryset)))
+        return Response(reader.render(reader.values(queryset)))
+
+
+def users_validator(*user_ids):
+    """
+    Часть валидатора списка для пользователей, вложенных в ответ через
+    UserSerializer: правка профиля меняет updated_at, вход — last_login
+    """
+    shown = Q()
+    for ids in user_ids:
+        shown |= Q(id__in=ids)
+    return User.objects.filter(shown).aggregate(
+        updated=Max('updated_at'), login=Max('last_login'))
+
+
+def visible_workspaces(user):
+    """Пространства, где пользователь владелец или участник"""
+    member_of = WorkspaceMembership.objects.filter(
+        user=user).values('workspace_id')
+    return Workspace.objects.filter(Q(owner=user) | Q(id__in=member_of))
+
+
+class TagViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_resource = 'tags'
 
     def get_queryset(self):
         return Tag.objects.filter(user=self.request.user)
 
+    def get_list_validator(self):
+        return self.get_queryset().aggregate(
+            count=Count('id'), updated=Max('updated_at'))
+
+    @conditional_list
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class WorkspaceViewSet(viewsets.ModelViewSet):
+class WorkspaceViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     serializer_class = WorkspaceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_resource = 'workspaces'
 
     def get_queryset(self):
-        return Workspace.objects.filter(
-            Q(owner=self.request.user) |
-            Q(memberships__user=self.request.user)
-        ).distinct()
+        queryset = visible_workspaces(self.request.user)
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        fields, nested = rendered_fields(self.get_serializer())
+        if 'owner' in nested:
+            queryset = queryset.select_related('owner')
+        if 'members' in nested:
+            queryset = queryset.prefetch_related('memberships__user')
+        elif 'members' in fields:
+            queryset = queryset.prefetch_related('memberships')
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return WorkspaceDetailSerializer
         return WorkspaceSerializer
 
+    def get_list_validator(self):
+        workspaces = self.get_queryset()
+        memberships = WorkspaceMembership.objects.filter(
+            workspace__in=workspaces)
+        return (
+            workspaces.aggregate(
+                count=Count('id'), updated=Max('updated_at')),
+            memberships.aggregate(
+                count=Count('id'), joined=Max('joined_at')),
+            users_validator(workspaces.values('owner_id')),
+        )
+
+    @conditional_list
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         workspace = serializer.save(owner=self.request.user)
         WorkspaceMembership.objects.create(
@@ -54,17 +146,16 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
             )
         instance.delete()
 
-    @action(detail=True, methods=['post'])
-    def add_member(self, request, pk=None):
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Сводка по задачам пространства для главного экрана"""
         workspace = self.get_object()
+        return Response(stats.workspace_stats(workspace.pk))
 
-        membership = workspace.memberships.filter(user=request.user).first()
-        if not membership or membership.role < WorkspaceMembership.Role.ADMIN:
-            return Response(
-                {'error': 'Недостаточно прав для добавления участников'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
+    @action(detail=True, methods=['post'],
+            permission_classes=[permissions.IsAuthenticated, IsWorkspaceAdmin])
+    def add_member(self, request, pk=None):
+        workspace = self.get_object()
         user_id = request.data.get('user_id')
         role = request.data.get('role', WorkspaceMembership.Role.MEMBER)
 
@@ -93,17 +184,10 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
-    @action(detail=True, methods=['delete'], url_path='remove_member/(?P<user_id>[^/.]+)')
+    @action(detail=True, methods=['delete'], url_path='remove_member/(?P<user_id>[^/.]+)',
+            permission_classes=[permissions.IsAuthenticated, IsWorkspaceAdmin])
     def remove_member(self, request, pk=None, user_id=None):
         workspace = self.get_object()
-
-        membership = workspace.memberships.filter(user=request.user).first()
-        if not membership or membership.role < WorkspaceMembership.Role.ADMIN:
-            return Response(
-                {'error': 'Недостаточно прав'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
         target = get_object_or_404(
             WorkspaceMembership,
             workspace=workspace,
@@ -120,15 +204,21 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class WorkspaceMembershipViewSet(viewsets.ModelViewSet):
+class WorkspaceMembershipViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     serializer_class = WorkspaceMembershipSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_resource = 'memberships'
 
     def get_queryset(self):
-        return WorkspaceMembership.objects.filter(
-            Q(workspace__owner=self.request.user) |
+        owned = Workspace.objects.filter(
+            owner=self.request.user).values('id')
+        queryset = WorkspaceMembership.objects.filter(
+            Q(workspace_id__in=owned) |
             Q(user=self.request.user)
         )
+        if 'user' in rendered_fields(self.get_serializer())[1]:
+            queryset = queryset.select_related('user')
+        return queryset
 
     def perform_destroy(self, instance):
         if instance.role == WorkspaceMembership.Role.OWNER:
@@ -138,8 +228,12 @@ class WorkspaceMembershipViewSet(viewsets.ModelViewSet):
         instance.delete()
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ResponseCacheMixin, RowListMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    cache_resource = 'tasks'
+    filter_backends = [TaskFilterBackend]
+    read_actions = ['list', 'retrieve', 'personal', 'workspace_tasks']
+    bulk_max_operations = 5000
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -149,12 +243,40 @@ class TaskViewSet(viewsets.ModelViewSet):
         return TaskSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        return Task.objects.filter(
-            Q(owner=user) |
-            Q(assignees=user) |
-            Q(workspace__memberships__user=user)
-        ).distinct()
+        queryset = Task.objects.visible_to(self.request.user)
+        if self.action in self.read_actions:
+            queryset = queryset.with_read_plan(
+                *rendered_fields(self.get_serializer()))
+        return queryset
+
+    def get_list_validator(self):
+        """
+        Валидатор для условного GET: задачи, их теги, суммы счётчиков
+        подзадач и комментариев, владельцы и исполнители. Удаление меняет
+        количество, правка — updated_at; изменения тегов и исполнителей
+        обновляют updated_at задачи. Дата входит в валидатор, потому что
+        is_overdue меняется в полночь без записи в строку задачи.
+        """
+        task_ids = TaskAccess.task_ids_for(self.request.user)
+        tasks = Task.objects.filter(id__in=task_ids)
+        task_tags = Task.tags.through.objects.filter(task_id__in=task_ids)
+        assignees = Task.assignees.through.objects.filter(
+            task_id__in=task_ids)
+        return (
+            tasks.aggregate(
+                count=Count('id'), updated=Max('updated_at'),
+                subtasks=Sum('subtasks_count'),
+                comments=Sum('comments_count')),
+            task_tags.aggregate(
+                count=Count('id'), updated=Max('tag__updated_at')),
+            users_validator(
+                tasks.values('owner_id'), assignees.values('user_id')),
+            timezone.now().date(),
+        )
+
+    @conditional_list
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -178,23 +300,127 @@ class TaskViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
     @action(detail=False, methods=['get'])
+    @conditional_list
+    @cached_response
     def personal(self, request):
-        tasks = self.get_queryset().filter(workspace__isnull=True)
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
+        tasks = self.filter_queryset(self.get_queryset()).filter(
+            workspace__isnull=True)
+        return self.paginated_response(tasks)
 
     @action(detail=False, methods=['get'])
+    @conditional_list
+    @cached_response
     def workspace_tasks(self, request):
         workspace_id = request.query_params.get('workspace_id')
         if workspace_id:
-            tasks = self.get_queryset().filter(workspace_id=workspace_id)
-            serializer = self.get_serializer(tasks, many=True)
-            return Response(serializer.data)
+            tasks = self.filter_queryset(self.get_queryset()).filter(
+                workspace_id=workspace_id)
+            return self.paginated_response(tasks)
         return Response(
             {'error': 'workspace_id parameter required'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Пакетные операции над задачами в одной транзакции.
+
+        Принимает список вида [{"op": "create", "data": {...}},
+        {"op": "update", "id": 1, "data": {...}}, {"op": "delete", "id": 2}].
+        Если хотя бы одна операция невалидна, ничего не записывается.
+        """
+        operations = request.data
+        if not isinstance(operations, list) or not operations:
+            return Response(
+                {'error': 'Ожидается непустой список операций'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(operations) > self.bulk_max_operations:
+            return Response(
+                {'error': f'Не более {self.bulk_max_operations} операций за запрос'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [{'index': index} for index in range(len(operations))]
+        creates, updates, deletes = [], [], []
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            results[index]['op'] = op
+            if not isinstance(operation.get('data', {}) if op else {}, dict):
+                results[index]['errors'] = {'data': ['Ожидается объект']}
+            elif op == 'create':
+                creates.append(index)
+            elif op in ('update', 'delete'):
+                (updates if op == 'update' else deletes).append(index)
+            else:
+                results[index]['errors'] = {
+                    'op': ['Допустимые операции: create, update, delete']}
+
+        for index in updates + deletes:
+            pk = operations[index].get('id')
+            # bool — подкласс int, строку "12" не приводим: тип id — часть API
+            if not isinstance(pk, int) or isinstance(pk, bool):
+                results[index]['errors'] = {'id': ['Ожидается целое число']}
+        updates = [index for index in updates if 'errors' not in results[index]]
+        deletes = [index for index in deletes if 'errors' not in results[index]]
+
+        tasks = self.get_queryset().in_bulk(
+            [operations[index]['id'] for index in updates + deletes])
+        for index in updates + deletes:
+            task = tasks.get(operations[index]['id'])
+            if task is None:
+                results[index]['errors'] = {'id': ['Задача не найдена']}
+            elif task.owner_id != request.user.id:
+                results[index]['errors'] = {
+                    'id': ['Только владелец может изменять задачу']}
+        updates = [index for index in updates if 'errors' not in results[index]]
+        deletes = [index for index in deletes if 'errors' not in results[index]]
+
+        create_serializer = TaskCreateSerializer(
+            data=[operations[index].get('data', {}) for index in creates],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        update_serializer = TaskUpdateSerializer(
+            tasks,
+            data=[
+                dict(operations[index].get('data', {}),
+                     id=operations[index]['id'])
+                for index in updates
+            ],
+            many=True,
+            partial=True,
+            context=self.get_serializer_context()
+        )
+        for serializer, indexes in ((create_serializer, creates),
+                                    (update_serializer, updates)):
+            if not indexes or serializer.is_valid():
+                continue
+            errors = serializer.errors
+            if isinstance(errors, list):
+                errors = dict(enumerate(errors))
+            for position, item_errors in errors.items():
+                if item_errors:
+                    results[indexes[position]]['errors'] = item_errors
+
+        if any('errors' in result for result in results):
+            return Response(results, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            created = create_serializer.save() if creates else []
+            updated = update_serializer.save() if updates else []
+            deleted_ids = [operations[index]['id'] for index in deletes]
+            Task.objects.filter(id__in=deleted_ids).delete()
+
+        for index, task in zip(creates, created):
+            results[index].update(id=task.pk, status='created')
+        for index, task in zip(updates, updated):
+            results[index].update(id=task.pk, status='updated')
+        for index in deletes:
+            results[index].update(id=operations[index]['id'], status='deleted')
+        return Response(results)
+
     @action(detail=True, methods=['post'])
     def change_status(self, request, pk=None):
         task = self.get_object()
@@ -220,8 +446,9 @@ class TaskViewSet(viewsets.ModelViewSet):
         return Response({'status': 'Статус обновлён'})
 
 
-class SubtaskViewSet(viewsets.ModelViewSet):
+class SubtaskViewSet(ResponseCacheMixin, RowListMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    cache_resource = 'subtasks'
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -229,10 +456,15 @@ class SubtaskViewSet(viewsets.ModelViewSet):
         return SubtaskSerializer
 
     def get_queryset(self):
-        return Subtask.objects.filter(
-            Q(parent_task__owner=self.request.user) |
-            Q(parent_task__assignees=self.request.user)
-        ).distinct()
+        queryset = Subtask.objects.filter(
+            parent_task_id__in=TaskAccess.task_ids_for(
+                self.request.user,
+                reasons=[TaskAccess.Reason.OWNER, TaskAccess.Reason.ASSIGNEE]
+            )
+        )
+        if 'assignee' in rendered_fields(self.get_serializer())[1]:
+            queryset = queryset.select_related('assignee')
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save()
@@ -247,8 +479,9 @@ class SubtaskViewSet(viewsets.ModelViewSet):
         return super().update(request, *args, **kwargs)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ResponseCacheMixin, RowListMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    cache_resource = 'comments'
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -256,11 +489,12 @@ class CommentViewSet(viewsets.ModelViewSet):
         return CommentSerializer
 
     def get_queryset(self):
-        return Comment.objects.filter(
-            Q(task__owner=self.request.user) |
-            Q(task__assignees=self.request.user) |
-            Q(task__workspace__memberships__user=self.request.user)
-        ).distinct()
+        queryset = Comment.objects.filter(
+            task_id__in=TaskAccess.task_ids_for(self.request.user)
+        )
+        if 'author' in rendered_fields(self.get_serializer())[1]:
+            queryset = queryset.select_related('author')
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -282,3 +516,180 @@ class CommentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         return super().destroy(request, *args, **kwargs)
+
+
+@api_view(['GET'])
+def sync_changes(request):
+    """
+    Дельта-синхронизация: задачи, подзадачи, комментарии и теги, изменённые
+    с момента курсора ?since=, и id удалённых объектов. Клиент сначала
+    применяет deleted, затем обновления, и сохраняет новый cursor. При
+    full_resync ответ — полный снимок, и локальные данные заменяются им.
+    """
+    try:
+        changes = sync.changes_since(
+            request.user, request.query_params.get('since') or None)
+    except ValueError:
+        return Response(
+            {'error': 'Неверный курсор синхронизации'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    context = {'request': request}
+    collections = {
+        'tasks': TaskSerializer,
+        'subtasks': SubtaskSerializer,
+        'comments': CommentSerializer,
+        'tags': TagSerializer,
+    }
+    extra = {name: changes[name]
+             for name in ('deleted', 'full_resync', 'cursor')}
+    if not isinstance(request.accepted_renderer, JSONRenderer):
+        return Response(dict({
+            name: serializer_class(
+                changes[name], many=True, context=context).data
+            for name, serializer_class in collections.items()
+        }, **extra))
+
+    # Полный снимок может быть большим: отдаём потоком, пачками строк
+    return StreamingJSONResponse(dict({
+        name: JSONStream(RowReader(serializer_class(context=context))
+                         .render_batches(changes[name]))
+        for name, serializer_class in collections.items()
+    }, **extra))
+
+
+@api_view(['GET'])
+def search_tasks(request):
+    """Полнотекстовый поиск по задачам, подзадачам и комментариям"""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response(
+            {'error': 'Параметр q обязателен'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+    except ValueError:
+        limit = 20
+    if not search.is_enabled():
+        return Response(
+            {'error': 'Полнотекстовый поиск недоступен'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    return Response({'results': search.search(request.user, query, limit)})
+
+
+@api_view(['GET'])
+def export_tasks(request):
+    """
+    Потоковая выгрузка видимых задач с подзадачами и комментариями.
+
+    ?type=ndjson|csv, ?gzip=1 — сжатие на лету; принимает те же фильтры,
+    что и список задач (например, ?workspace=3 или ?workspace=none).
+    """
+    file_format = request.query_params.get('type', 'ndjson')
+    if file_format not in export.FORMATS:
+        return Response(
+            {'error': f'Допустимые форматы: {", ".join(export.FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    compress = request.query_params.get('gzip') in ('1', 'true')
+
+    tasks = TaskFilterBackend().filter_queryset(
+        request, Task.objects.visible_to(request.user), None)
+    if 'ordering' not in request.query_params:
+        tasks = tasks.order_by('id')
+    subtask_task_ids = TaskAccess.task_ids_for(
+        request.user,
+        reasons=[TaskAccess.Reason.OWNER, TaskAccess.Reason.ASSIGNEE]
+    )
+
+    filename = f'tasks.{file_format}' + ('.gz' if compress else '')
+    response = StreamingHttpResponse(
+        export.export_tasks(tasks, file_format, compress, subtask_task_ids),
+        content_type=(
+            'application/gzip' if compress else export.FORMATS[file_format])
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request):
+    """Попадания и промахи кэша ответов в этом процессе"""
+    return Response({
+        'backend': settings.CACHES['default']['BACKEND'],
+        'shared': is_shared(),
+        'responses': response_cache.metrics(),
+    })
+
+
+# Асинхронные версии горячих списков для ASGI: те же ответы, что у
+# TaskViewSet и WorkspaceViewSet, но ожидание базы не держит поток
+
+async def _keyset_page(request, serializer, queryset):
+    reader = RowReader(serializer)
+    paginator = KeysetPagination()
+    page = await paginator.apaginate_queryset(
+        reader.values(queryset), request)
+    return paginator.get_paginated_data(await reader.arender(page))
+
+
+def _visible_tasks(request):
+    serializer = TaskSerializer(context={'request': request})
+    tasks = Task.objects.visible_to(request.user).with_read_plan(
+        *rendered_fields(serializer))
+    return serializer, TaskFilterBackend().filter_queryset(
+        request, tasks, None)
+
+
+@async_api_view
+async def async_task_list(request):
+    """Список задач, как GET tasks/"""
+    return await _keyset_page(request, *_visible_tasks(request))
+
+
+@async_api_view
+async def async_personal_tasks(request):
+    """Личные задачи, как GET tasks/personal/"""
+    serializer, tasks = _visible_tasks(request)
+    return await _keyset_page(
+        request, serializer, tasks.filter(workspace__isnull=True))
+
+
+@async_api_view
+async def async_workspace_tasks(request):
+    """Задачи пространства, как GET tasks/workspace_tasks/?workspace_id="""
+    if not request.query_params.get('workspace_id'):
+        return json_response(
+            {'error': 'workspace_id parameter required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    workspace_id = TaskFilterBackend.parse_ids(
+        request.query_params, 'workspace_id')[0]
+    serializer, tasks = _visible_tasks(request)
+    return await _keyset_page(
+        request, serializer, tasks.filter(workspace_id=workspace_id))
+
+
+@async_api_view
+async def async_workspace_list(request):
+    """Список пространств, как GET workspaces/"""
+    return await _keyset_page(
+        request, WorkspaceSerializer(context={'request': request}),
+        visible_workspaces(request.user))
+
+
+@async_api_view
+async def events_stream(request):
+    """
+    Server-Sent Events: изменения задач, подзадач, комментариев, пространств
+    и членств, видимых пользователю (realtime.py). Только под ASGI.
+    """
+    return StreamingHttpResponse(
+        realtime.stream(request.user.pk),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
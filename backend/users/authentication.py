@@ -0,0 +1,166 @@
+"""
+Аутентификация без запросов к базе на горячем пути.
+
+Снимки пользователей и соответствие токен -> пользователь хранятся в
+кэше со сроком жизни AUTH_CACHE['TTL'] секунд. Смена профиля и пароля,
+деактивация, удаление пользователя и удаление токена сбрасывают записи
+явно (signals.py), поэтому кэш используется, только если он общий для
+всех процессов (core.cache.is_shared): иначе выход или смена пароля в
+одном воркере не доходили бы до остальных, и каждый запрос читает
+пользователя из базы.
+
+Снимок годится только для чтения: представления, которые пишут
+пользователя, перечитывают его из базы (views.py), чтобы не вернуть
+устаревшие пароль или is_active, изменённые в другом процессе.
+
+aauthenticate() — та же проверка токена и сессии для асинхронных
+представлений: при промахе кэша запросы идут через асинхронный ORM.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    TokenAuthentication, get_authorization_header
+)
+from rest_framework.authtoken.models import Token
+from core.cache import is_shared
+from .models import User
+
+DEFAULTS = {'TTL': 60}
+
+
+def _ttl():
+    return {**DEFAULTS, **getattr(settings, 'AUTH_CACHE', {})}['TTL']
+
+
+def _user_key(user_id):
+    return f'users:snapshot:{user_id}'
+
+
+def _token_key(key):
+    return f'users:token:{key}'
+
+
+def get_user(user_id):
+    """Снимок пользователя; None, если пользователя нет"""
+    shared = is_shared()
+    user = cache.get(_user_key(user_id)) if shared else None
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None and shared:
+            cache.set(_user_key(user_id), user, _ttl())
+    return user
+
+
+async def aget_user(user_id):
+    """get_user() через асинхронный ORM"""
+    shared = is_shared()
+    user = await cache.aget(_user_key(user_id)) if shared else None
+    if user is None:
+        user = await User.objects.filter(pk=user_id).afirst()
+        if user is not None and shared:
+            await cache.aset(_user_key(user_id), user, _ttl())
+    return user
+
+
+def token_user_id(key):
+    """id владельца токена; None, если токена нет"""
+    shared = is_shared()
+    user_id = cache.get(_token_key(key)) if shared else None
+    if user_id is None:
+        user_id = Token.objects.filter(
+            key=key).values_list('user_id', flat=True).first()
+        if user_id is not None and shared:
+            cache.set(_token_key(key), user_id, _ttl())
+    return user_id
+
+
+async def atoken_user_id(key):
+    """token_user_id() через асинхронный ORM"""
+    shared = is_shared()
+    user_id = await cache.aget(_token_key(key)) if shared else None
+    if user_id is None:
+        user_id = await Token.objects.filter(
+            key=key).values_list('user_id', flat=True).afirst()
+        if user_id is not None and shared:
+            await cache.aset(_token_key(key), user_id, _ttl())
+    return user_id
+
+
+def _delete(key):
+    cache.delete(key)
+    # Повторно после фиксации: параллельный запрос мог успеть закэшировать
+    # снимок, прочитанный до коммита
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_user(user_id):
+    """
+    Сбросить снимок пользователя; токены удалённого пользователя
+    отсеиваются при чтении снимка
+    """
+    _delete(_user_key(user_id))
+
+
+def invalidate_token(key):
+    _delete(_token_key(key))
+
+
+async def aauthenticate(request):
+    """
+    Пользователь асинхронного запроса: по заголовку «Authorization: Token»,
+    как CachedTokenAuthentication, иначе по сессии. None — анонимный
+    запрос; неверный токен — AuthenticationFailed.
+    """
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        user = await request.auser()
+        return user if user.is_authenticated else None
+    if len(auth) != 2:
+        raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+    user_id = await atoken_user_id(key)
+    if user_id is None:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    user = await aget_user(user_id)
+    if user is None:
+        await cache.adelete(_token_key(key))
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication со снимками из кэша вместо JOIN Token + User"""
+
+    def authenticate_credentials(self, key):
+        user_id = token_user_id(key)
+        if user_id is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        user = get_user(user_id)
+        if user is None:
+            invalidate_token(key)
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, Token(key=key, user=user))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из снимков"""
+
+    def get_user(self, user_id):
+        user = get_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await aget_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
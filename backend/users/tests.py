@@ -1,3 +1,51 @@
-from django.test import TestCase
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .models import User
 
-# Create your tests here.
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('snapshot', password='password')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    @override_settings(CACHE_SHARED=True)
+    def test_profile_update_keeps_changes_made_elsewhere(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        # Изменения другого процесса, которые снимок в кэше ещё не видит
+        User.objects.filter(pk=self.user.pk).update(
+            password=make_password('changed-elsewhere'), is_active=False)
+
+        response = self.client.put(
+            '/api/auth/profile/update/', {'first_name': 'Имя'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Имя')
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(self.user.check_password('changed-elsewhere'))
+
+    @override_settings(CACHE_SHARED=None)
+    def test_process_local_cache_is_not_used(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        self.assertIsNone(cache.get(f'users:token:{self.token.key}'))
+        self.assertIsNone(cache.get(f'users:snapshot:{self.user.pk}'))
+        with self.assertNumQueries(2):
+            self.client.get('/api/auth/profile/')
+
+
+class SparseFieldsTests(TestCase):
+    def test_profile_fields_and_omit(self):
+        user = User.objects.create_user('sparse', password='password')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/auth/profile/', {'fields': 'id,username'})
+        self.assertEqual(response.data, {'id': user.pk, 'username': 'sparse'})
+        response = client.get('/api/auth/profile/', {'omit': 'bio,photo_url'})
+        self.assertNotIn('bio', response.data)
+        self.assertNotIn('photo_url', response.data)
+        self.assertIn('username', response.data)
@@ -7,6 +7,8 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.user_profile, name='user_profile'),
+    path('async/profile/', views.async_user_profile,
+         name='async_user_profile'),
     path('profile/update/', views.update_profile, name='update_profile'),
     path('change-password/', views.change_password, name='change_password'),
     path('account/delete/', views.delete_account, name='delete_account'), 
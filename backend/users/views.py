@@ -5,6 +5,8 @@ from rest_framework.authtoken.models import Token
 from django.contrib.auth import login, logout
 from django.middleware.csrf import get_token
 from django.db import transaction
+from core.async_views import async_api_view
+from . import authentication
 from .models import User
 from .serializers import (
     UserSerializer, UserCreateSerializer, UserUpdateSerializer,
@@ -52,30 +54,41 @@ def login_view(request):
 @api_view(['POST'])
 def logout_view(request):
     """Выход из системы"""
+    user = request.user
     logout(request)
-    if hasattr(request, 'user') and request.user.is_authenticated:
-        Token.objects.filter(user=request.user).delete()
+    if user.is_authenticated:
+        Token.objects.filter(user=user).delete()
+        authentication.invalidate_user(user.pk)
     return Response({'detail': 'Successfully logged out'})
 
 
 @api_view(['GET'])
 def user_profile(request):
     """Получить профиль текущего пользователя"""
-    serializer = UserSerializer(request.user)
+    serializer = UserSerializer(request.user, context={'request': request})
     return Response(serializer.data)
 
 
+@async_api_view
+async def async_user_profile(request):
+    """Профиль текущего пользователя для ASGI: без потока на запрос"""
+    return UserSerializer(request.user, context={'request': request}).data
+
+
 @api_view(['PUT'])
 def update_profile(request):
     """Обновить профиль пользователя"""
+    # request.user может быть снимком из кэша: сохраняем свежую строку,
+    # чтобы не вернуть пароль и is_active, изменённые в другом процессе
+    user = User.objects.get(pk=request.user.pk)
     serializer = UserUpdateSerializer(
-        request.user,
+        user,
         data=request.data,
         partial=True
     )
     if serializer.is_valid():
         serializer.save()
-        return Response(UserSerializer(request.user).data)
+        return Response(UserSerializer(user).data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -84,14 +97,16 @@ def change_password(request):
     """Сменить пароль"""
     serializer = ChangePasswordSerializer(data=request.data)
     if serializer.is_valid():
-        if not request.user.check_password(serializer.validated_data['old_password']):
+        user = User.objects.get(pk=request.user.pk)
+        if not user.check_password(serializer.validated_data['old_password']):
             return Response(
                 {'old_password': ['Неверный текущий пароль']},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        request.user.set_password(serializer.validated_data['new_password'])
-        request.user.save()
+        user.set_password(serializer.validated_data['new_password'])
+        user.save(update_fields=['password'])
+        authentication.invalidate_user(user.pk)
         return Response({'detail': 'Пароль успешно изменен'})
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -109,6 +124,7 @@ def delete_account(request):
 
             user_id = user.id
             user.delete()
+            authentication.invalidate_user(user_id)
 
             return Response(
                 {'detail': 'Аккаунт успешно удален'},
@@ -127,7 +143,8 @@ def delete_account(request):
 def user_list(request):
     """Список всех пользователей (только для админов)"""
     users = User.objects.all()
-    serializer = UserSerializer(users, many=True)
+    serializer = UserSerializer(
+        users, many=True, context={'request': request})
     return Response(serializer.data)
 
 
@@ -137,7 +154,7 @@ def user_detail(request, pk):
     """Детальная информация о пользователе (только для админов)"""
     try:
         user = User.objects.get(pk=pk)
-        serializer = UserSerializer(user)
+        serializer = UserSerializer(user, context={'request': request})
         return Response(serializer.data)
     except User.DoesNotExist:
         return Response(
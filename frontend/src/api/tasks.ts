@@ -4,12 +4,15 @@ import { Tag } from '@/types/tasks'
 import { Workspace } from '@/types/tasks'
 import { Task } from '@/types/tasks'
 import { Subtask } from '@/types/tasks'
+import { Comment } from '@/types/tasks'
+import { Page, PageParams } from '@/types/tasks'
 
 // Работа с API задач
 export const tasksApi = {
     // Tags
     // Получение тегов
-    getTags: () => api.get<Tag[]>('/tasks/tags/'),
+    getTags: (params?: PageParams) =>
+        api.get<Page<Tag>>('/tasks/tags/', { params }),
 
     // Создание тега
     createTag: (data: Omit<Tag, 'id' | 'user'>) =>
@@ -24,7 +27,8 @@ export const tasksApi = {
 
     // Workspaces
     // Получение всех рабочих пространств
-    getWorkspaces: () => api.get<Workspace[]>('/tasks/workspaces/'),
+    getWorkspaces: (params?: PageParams) =>
+        api.get<Page<Workspace>>('/tasks/workspaces/', { params }),
 
     // Получение рабочего пространства по id
     getWorkspace: (id: number) => api.get<Workspace>(`/tasks/workspaces/${id}/`),
@@ -35,14 +39,18 @@ export const tasksApi = {
 
     // Tasks
     // Получение задач
-    getTasks: () => api.get<Task[]>('/tasks/tasks/'),
+    getTasks: (params?: PageParams) =>
+        api.get<Page<Task>>('/tasks/tasks/', { params }),
 
     // Получение личных задач пользователя
-    getPersonalTasks: () => api.get<Task[]>('/tasks/tasks/personal/'),
+    getPersonalTasks: (params?: PageParams) =>
+        api.get<Page<Task>>('/tasks/tasks/personal/', { params }),
 
     // Получение задач из рабочего пространства
-    getWorkspaceTasks: (workspaceId: number) =>
-        api.get<Task[]>(`/tasks/tasks/workspace_tasks/?workspace_id=${workspaceId}`),
+    getWorkspaceTasks: (workspaceId: number, params?: PageParams) =>
+        api.get<Page<Task>>('/tasks/tasks/workspace_tasks/', {
+            params: { ...params, workspace_id: workspaceId },
+        }),
 
     // Получение задачи по id
     getTask: (id: number) => api.get<Task>(`/tasks/tasks/${id}/`),
@@ -64,7 +72,8 @@ export const tasksApi = {
 
     // Subtasks
     // Получение подзадач
-    getSubtasks: () => api.get<Subtask[]>('/tasks/subtasks/'),
+    getSubtasks: (params?: PageParams) =>
+        api.get<Page<Subtask>>('/tasks/subtasks/', { params }),
 
     // Создание подзадачи
     createSubtask: (data: Omit<Subtask, 'id' | 'created_at'>) =>
@@ -72,7 +81,8 @@ export const tasksApi = {
 
     // Comments
     // Получение комментариев
-    getComments: () => api.get<Comment[]>('/tasks/comments/'),
+    getComments: (params?: PageParams) =>
+        api.get<Page<Comment>>('/tasks/comments/', { params }),
 
     // Создание комментария
     createComment: (data: Omit<Comment, 'id' | 'author' | 'created_at' | 'updated_at'>) =>
@@ -1,3 +1,16 @@
+// Страница списка с пагинацией по курсору
+export interface Page<T> {
+    next: string | null
+    previous: string | null
+    results: T[]
+}
+
+// Параметры страницы: курсор из ссылки next/previous и размер (до 100)
+export interface PageParams {
+    cursor?: string
+    page_size?: number
+}
+
 export interface Tag {
     id: number
     title: string